@@ -1,6 +1,14 @@
 import streamlit as st
 from bigquery_client import BigQueryClient
 from web_scraper import scrape_article_data_fast, extract_domain_from_url, scrape_metadata_only, scrape_light
+from scrape_engine import scrape_many, scrape_many_light
+from brand_snippets import ANTLER, build_matcher
+import near_duplicates
+import id_allocator
+import batch_writer
+from batch_writer import BatchWriter
+from bulk_ingest import load_rows
+import enrichment_dispatcher
 from datetime import datetime
 from google.cloud import bigquery
 import json
@@ -307,6 +315,9 @@ def main():
     # Initialize BigQuery
     try:
         bq_client = BigQueryClient()
+        connected, message = bq_client.validate()
+        if not connected:
+            raise Exception(message)
     except Exception as e:
         st.error(f"❌ BigQuery connection failed: {e}")
         return
@@ -371,6 +382,8 @@ def main():
                                     result = bq_client.process_next_url_from_queue()
                                     if not result:
                                         break
+                                # Enrich the processed URLs together
+                                enrichment_dispatcher.get_dispatcher().flush()
                                 st.rerun()
         
         if st.button("🔄 Refresh", key="refresh_updates"):
@@ -391,20 +404,31 @@ def main():
                 
                 success_count = 0
                 fail_count = 0
+                scraped_so_far = [0]
                 
-                for i, article in enumerate(unscraped):
-                    progress = (i + 1) / unscraped_count
-                    progress_bar.progress(progress)
-                    status_text.text(f"Scraping {i+1}/{unscraped_count}: {article['domain']}")
-                    
-                    success, msg = bq_client.light_scrape_article(article['id'], article['url'])
-                    if success:
-                        success_count += 1
-                    else:
-                        fail_count += 1
-                    
-                    # Small delay to avoid rate limiting
-                    time.sleep(0.5)
+                def show_light_progress(index, url, data):
+                    scraped_so_far[0] += 1
+                    progress_bar.progress(scraped_so_far[0] / unscraped_count)
+                    status_text.text(f"Scraping {scraped_so_far[0]}/{unscraped_count}: {unscraped[index]['domain']}")
+                
+                # Scrape concurrently - per-domain limits replace the old fixed delay
+                scraped_results = scrape_many_light([article['url'] for article in unscraped],
+                                                    on_result=show_light_progress)
+                
+                status_text.text("Saving scraped content...")
+                saved_ids = []
+                with BatchWriter(bq_client.client) as writer:
+                    for article, data in zip(unscraped, scraped_results):
+                        success, msg = bq_client.save_light_scrape(article['id'], data, writer=writer)
+                        if success:
+                            success_count += 1
+                            saved_ids.append(int(article['id']))
+                        else:
+                            fail_count += 1
+                # Updates the writer could not apply were not saved
+                unsaved = [article_id for article_id in saved_ids if article_id in set(writer.failed)]
+                success_count -= len(unsaved)
+                fail_count += len(unsaved)
                 
                 progress_bar.progress(1.0)
                 status_text.text(f"Done! {success_count} scraped, {fail_count} failed")
@@ -526,16 +550,6 @@ def main():
                 # Data ingestion button
                 if st.button("Import Articles", type="primary"):
                     try:
-                        # Get the current MAX ID from BigQuery first
-                        max_id_query = f"""
-                        SELECT IFNULL(MAX(id), 0) as max_id
-                        FROM `{bq_client.project_id}.{bq_client.dataset_id}.{bq_client.table_id}`
-                        """
-                        max_id_result = list(bq_client.client.query(max_id_query).result())
-                        next_id = max_id_result[0].max_id + 1
-                        
-                        st.info(f"🔢 Starting ID assignment from: {next_id}")
-                        
                         # Check for duplicate URLs (case-insensitive column name)
                         url_col = next((col for col in df.columns if col.lower() == 'url'), None)
                         if not url_col:
@@ -591,6 +605,15 @@ def main():
                         rows_to_insert = []
                         errors = []
                         
+                        # One matcher over every tracked brand; one scrape per URL serves all its rows
+                        brand_matcher = build_matcher(bq_client)
+                        scraped_by_url = {}
+                        scraped_brand_by_url = {}
+                        
+                        # Syndicated copies of one release share a near-duplicate cluster
+                        clusters_by_url = {}
+                        copies = 0
+                        
                         # Helper function to parse dates like "08 Jan 2026"
                         def parse_csv_date(date_str):
                             if not date_str:
@@ -616,15 +639,37 @@ def main():
                             
                             try:
                                 # LIGHT scraping - just title, domain, date, key sentences (fast)
-                                scraped = scrape_light(url_val, brand_val)
+                                if url_val not in scraped_by_url:
+                                    scraped_by_url[url_val] = scrape_light(url_val, brand_val, matcher=brand_matcher)
+                                    scraped_brand_by_url[url_val] = (brand_val or '').strip().lower()
+                                    if scraped_by_url[url_val]:
+                                        cluster = near_duplicates.add(url_val, simhash=scraped_by_url[url_val].get('fingerprint'))
+                                        clusters_by_url[url_val] = cluster['cluster_id'] if cluster else None
+                                        if cluster and cluster['is_copy']:
+                                            copies += 1
+                                scraped = scraped_by_url[url_val]
                                 
                                 # For light scraping, accept if we got at least domain (always extractable from URL)
                                 if scraped:
                                     # Stagger timestamps
                                     row_timestamp = base_timestamp + timedelta(seconds=idx)
                                     
+                                    # Snippet for this row's brand (the scrape may have been for another row's brand)
+                                    content = scraped.get('content') or ''
+                                    if (brand_val or '').strip().lower() != scraped_brand_by_url.get(url_val):
+                                        snippets = scraped.get('snippets', {})
+                                        brand_name = brand_matcher.canonical(brand_val) if brand_val else ANTLER
+                                        if brand_name in snippets:
+                                            content = snippets[brand_name]
+                                        elif brand_name and ANTLER in snippets:
+                                            # Tracked brand not mentioned - build_snippet would pick Antler's sentences
+                                            content = snippets[ANTLER]
+                                        else:
+                                            # Untracked or unmentioned brand - no text of its own to show
+                                            content = ''
+                                    
                                     # Determine tagged_antler based on Brand field OR content
-                                    content_lower = scraped.get('content', '').lower()
+                                    content_lower = content.lower()
                                     title_lower = (csv_headline or scraped.get('title', '')).lower()
                                     tagged_antler = ('antler' in brand_val.lower() if brand_val else False) or \
                                                    'antler' in content_lower or 'antler' in title_lower
@@ -643,12 +688,12 @@ def main():
                                     
                                     # Create row for BigQuery with ALL fields - NO NULLs allowed
                                     bq_row = {
-                                        'id': next_id,
+                                        'id': None,  # Assigned for the whole import below
                                         'url': url_val,
                                         'title': title,
                                         'publish_date': pub_date if pub_date else None,
                                         'domain': domain,
-                                        'content': scraped.get('content', ''),
+                                        'content': content,
                                         'updated_at': row_timestamp.isoformat(),
                                         'data_ingestion': True,
                                         'tagged_antler': tagged_antler,
@@ -678,6 +723,7 @@ def main():
                                         'text_scraped': False,
                                         'is_complete': False,
                                         'cleaned_url': url_val.split('?')[0].split('#')[0],
+                                        'duplicate_cluster_id': clusters_by_url.get(url_val),
                                         'page_rank': 0,
                                         'social_shares_count': 0,
                                         'backlinks': 0.0,
@@ -692,7 +738,6 @@ def main():
                                     }
                                     
                                     rows_to_insert.append(bq_row)
-                                    next_id += 1
                                 else:
                                     errors.append(f"Failed to scrape: {url_val[:50]}")
                                     
@@ -703,8 +748,18 @@ def main():
                         
                         # Insert to BigQuery
                         if rows_to_insert:
+                            if copies:
+                                st.info(f"🧬 {copies} articles are near-duplicate copies of another article - they will reuse its full text")
+                            if not bq_client.ensure_duplicate_cluster_column():
+                                for bq_row in rows_to_insert:
+                                    bq_row.pop('duplicate_cluster_id', None)
+                            # One id lease for the whole import
+                            new_ids = id_allocator.allocate('mediatracker', len(rows_to_insert))
+                            for bq_row, new_id in zip(rows_to_insert, new_ids):
+                                bq_row['id'] = new_id
+                            # Load job, not streaming - the rows can be enriched and edited right away
                             table_ref = f"{bq_client.project_id}.{bq_client.dataset_id}.{bq_client.table_id}"
-                            insert_errors = bq_client.client.insert_rows_json(table_ref, rows_to_insert)
+                            insert_errors = load_rows(rows_to_insert, table_ref, client=bq_client.client)
                             
                             if insert_errors:
                                 st.error(f"❌ Some rows failed to insert:")
@@ -728,9 +783,7 @@ def main():
                                             st.write(f"- {err}")
                                 
                                 # MANDATORY: Run enrichment on ALL rows - no exceptions
-                                import time
-                                with st.spinner("⏳ Waiting for BigQuery to process (20 sec)..."):
-                                    time.sleep(20)
+                                # The load job has finished, so the rows are already visible - no wait
                                 with st.spinner("🔄 Running enrichment on ALL rows..."):
                                     bq_client.run_full_enrichment()
                                 st.success("✅ Enrichment completed - all fields filled!")
@@ -974,6 +1027,15 @@ def main():
             
             st.info(f"🚀 **Starting batch processing:** {len(urls_to_process)} URLs")
             
+            # Scrape every URL concurrently first, then save them one by one
+            scraped_count = [0]
+            
+            def show_scrape_progress(index, url, data):
+                scraped_count[0] += 1
+                status_text.text(f"Scraped {scraped_count[0]}/{len(urls_to_process)}: {url[:60]}...")
+            
+            scraped_batch = scrape_many(urls_to_process, on_result=show_scrape_progress)
+            
             for i, url in enumerate(urls_to_process):
                 try:
                     # Update progress display
@@ -981,8 +1043,7 @@ def main():
                     progress_bar.progress(progress_percent)
                     status_text.text(f"Processing {i+1}/{len(urls_to_process)}: {url[:60]}...")
                     
-                    # Scrape article data
-                    data = scrape_article_data_fast(url)
+                    data = scraped_batch[i]
                     
                     if data and data.get('content'):
                         # Auto-save each successful extraction to BigQuery
@@ -1077,9 +1138,7 @@ def main():
             if successful_count > 0:
                 st.success(f"🎉 **Chunk Complete:** {successful_count}/{total_processed} URLs processed successfully!")
                 # MANDATORY: Run enrichment on ALL rows
-                import time
-                with st.spinner("⏳ Waiting for BigQuery to process (20 sec)..."):
-                    time.sleep(20)
+                # Each insert waited for its DML job, so the rows are already visible - no wait
                 with st.spinner("🔄 Running enrichment on ALL rows..."):
                     bq_client.run_full_enrichment()
                 st.success("✅ Enrichment completed - all fields filled!")
@@ -1469,23 +1528,17 @@ def main():
                             saved = 0
                             for change in changes_to_save:
                                 try:
-                                    update_query = """
-                                    UPDATE `media-455519.mediatracker.mediatracker`
-                                    SET matched_portcos = @portco,
-                                        matched_spokespeople = @spokesperson,
-                                        content = @content,
-                                        updated_at = CURRENT_TIMESTAMP()
-                                    WHERE id = @id
-                                    """
-                                    job_config = bigquery.QueryJobConfig(
-                                        query_parameters=[
-                                            bigquery.ScalarQueryParameter("portco", "STRING", change['matched_portcos']),
-                                            bigquery.ScalarQueryParameter("spokesperson", "STRING", change['matched_spokespeople']),
-                                            bigquery.ScalarQueryParameter("content", "STRING", change['content']),
-                                            bigquery.ScalarQueryParameter("id", "INT64", int(change['id']))
-                                        ]
-                                    )
-                                    bq_client.client.query(update_query, job_config=job_config).result()
+                                    fields = {
+                                        'matched_portcos': ('STRING', change['matched_portcos']),
+                                        'matched_spokespeople': ('STRING', change['matched_spokespeople']),
+                                        'updated_at': ('TIMESTAMP', batch_writer.now()),
+                                    }
+                                    if change['content'] != original_data[change['id']]['Content']:
+                                        # Edited text replaces the stored full text (and its hash/length)
+                                        bq_client.save_full_content(change['content'], article_id=int(change['id']),
+                                                                    mark_scraped=False, extra_fields=fields)
+                                    else:
+                                        bq_client.update_row(fields, article_id=int(change['id']))
                                     saved += 1
                                 except Exception as e:
                                     st.error(f"Failed to save ID {change['id']}: {str(e)[:100]}")
@@ -1603,62 +1656,55 @@ def main():
                     success_count = 0
                     fail_count = 0
                     
-                    for idx, article_id in enumerate(selected_ids):
-                        article = articles_by_id.get(article_id)
-                        if not article:
-                            continue
-                            
-                        url = article.url
-                        title = article.title[:30] + '...' if article.title and len(article.title) > 30 else article.title or 'No title'
-                        status_text.text(f"Scraping {idx+1}/{len(selected_ids)}: {title}")
-                        
-                        try:
-                            result = scrape_article_data_fast(url)
+                    # Scrape all selected articles concurrently, then save them
+                    selected_articles = [articles_by_id[article_id] for article_id in selected_ids if article_id in articles_by_id]
+                    status_text.text(f"Scraping {len(selected_articles)} articles...")
+                    scraped_selected = scrape_many([article.url for article in selected_articles])
+                    
+                    saved_ids = []
+                    # Row updates are buffered and applied with one MERGE when the loop ends
+                    with BatchWriter(bq_client.client) as writer:
+                        for idx, (article, result) in enumerate(zip(selected_articles, scraped_selected)):
+                            article_id = article.id
+                            title = article.title[:30] + '...' if article.title and len(article.title) > 30 else article.title or 'No title'
+                            status_text.text(f"Saving {idx+1}/{len(selected_articles)}: {title}")
                             
-                            if result and result.get('content') and len(result['content'].strip()) > 50:
-                                content = result['content']
-                                max_content_length = 1000000
-                                if len(content) > max_content_length:
-                                    content = content[:max_content_length] + "... [Content truncated]"
-                                
-                                # Ensure domain exists in media_data
-                                bq_client.ensure_domain_in_media_data(article.domain)
-                                
-                                update_query = """
-                                UPDATE `media-455519.mediatracker.mediatracker`
-                                SET content = @content,
-                                    text_scraped = true,
-                                    text_scraped_at = CURRENT_TIMESTAMP(),
-                                    data_ingestion = true
-                                WHERE id = @id
-                                """
-                                
-                                job_config = bigquery.QueryJobConfig(
-                                    query_parameters=[
-                                        bigquery.ScalarQueryParameter("content", "STRING", content),
-                                        bigquery.ScalarQueryParameter("id", "INT64", int(article_id))
-                                    ]
-                                )
-                                bq_client.client.query(update_query, job_config=job_config).result()
-                                success_count += 1
-                            else:
+                            try:
+                                if result and result.get('content') and len(result['content'].strip()) > 50:
+                                    content = result['content']
+                                    max_content_length = 1000000
+                                    if len(content) > max_content_length:
+                                        content = content[:max_content_length] + "... [Content truncated]"
+                                    
+                                    # Ensure domain exists in media_data
+                                    bq_client.ensure_domain_in_media_data(article.domain)
+                                    
+                                    # Full text goes to the content store; the row keeps preview, length and hash
+                                    bq_client.save_full_content(content, article_id=article_id,
+                                                                extra_fields={'data_ingestion': ('BOOL', True)},
+                                                                writer=writer)
+                                    success_count += 1
+                                    saved_ids.append(article_id)
+                                else:
+                                    fail_count += 1
+                                    
+                            except Exception as e:
                                 fail_count += 1
-                                
-                        except Exception as e:
-                            fail_count += 1
-                            st.warning(f"Failed to scrape ID {article_id}: {str(e)[:150]}")
-                        
-                        progress_bar.progress((idx + 1) / len(selected_ids))
-                        time.sleep(0.5)
+                                st.warning(f"Failed to scrape ID {article_id}: {str(e)[:150]}")
+                            
+                            progress_bar.progress((idx + 1) / len(selected_articles))
+                    
+                    # Updates the writer could not apply were not saved
+                    unsaved = [article_id for article_id in saved_ids if article_id in set(writer.failed)]
+                    success_count -= len(unsaved)
+                    fail_count += len(unsaved)
                     
                     status_text.empty()
                     progress_bar.empty()
                     
                     # MANDATORY: Run enrichment on ALL rows after scraping
                     if success_count > 0:
-                        import time
-                        status_text.text("⏳ Waiting for BigQuery to process (20 sec)...")
-                        time.sleep(20)
+                        # The batch writer's MERGE has finished, so the rows are already visible - no wait
                         status_text.text("🔄 Running enrichment on ALL rows...")
                         try:
                             bq_client.run_full_enrichment()
@@ -1681,7 +1727,7 @@ def main():
     st.subheader("3. Add Portfolio Company")
     
     try:
-        portco_client = BigQueryClient()
+        portco_client = bq_client
         
         col1, col2, col3, col4 = st.columns(4)
         
@@ -1696,10 +1742,7 @@ def main():
         
         if st.button("Add Company"):
             if new_name and new_name.strip():
-                # Get next ID
-                max_id_query = "SELECT COALESCE(MAX(id), 0) as max_id FROM `media-455519.mediatracker.portcos`"
-                max_id_result = list(portco_client.client.query(max_id_query).result())
-                next_id = (max_id_result[0].max_id or 0) + 1
+                next_id = id_allocator.next_id('portcos')
                 
                 # Auto-fill fields
                 sync_key = str(uuid.uuid4())[:8]
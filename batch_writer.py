@@ -0,0 +1,190 @@
+"""
+Write-behind row updates for mediatracker.
+
+Scrape loops used to send one UPDATE ... WHERE id = ... per article, failure
+rows included - thousands of DML jobs per backfill, and BigQuery only runs a
+few DML statements against a table at once (the rest queue, then fail).
+BatchWriter buffers the updates in memory instead and applies them in bulk:
+
+- update(id, {column: (type, value)}) records the new values for a row;
+  a later update to the same row merges into the buffered one
+- every BATCH_WRITER_ROWS rows or BATCH_WRITER_SECONDS seconds (and on
+  flush() / close() / leaving a `with` block) the buffer is loaded into a
+  staging table with a load job, which costs no DML quota, and applied with
+  one MERGE per set of columns, normally one for saved articles and one for
+  failures
+- staging tables are dropped after the MERGE and expire after an hour if a
+  process dies in between
+
+Updates that still fail when the writer is closed are dropped, and their
+keys are left in writer.failed (close() returns them too) so callers can
+take those rows out of their success counts.
+
+Rows are keyed by id, or by url for rows saved without an id. Values are
+set as given, so timestamps are taken when the update is recorded, not
+when it is flushed. Columns listed in keep_if_empty keep their current value
+when the new one is empty (COALESCE(NULLIF(new, ''), old)).
+"""
+
+import os
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from google.cloud import bigquery
+
+TARGET_TABLE = "media-455519.mediatracker.mediatracker"
+
+# Flush once this many rows are buffered, or the oldest has waited this long
+FLUSH_ROWS = int(os.environ.get('BATCH_WRITER_ROWS', '500'))
+FLUSH_SECONDS = float(os.environ.get('BATCH_WRITER_SECONDS', '30'))
+
+# Staging tables left behind by a crashed flush are removed by BigQuery after this
+STAGING_EXPIRY = timedelta(hours=1)
+
+
+def now():
+    """Timestamp for updated_at / text_scraped_at values"""
+    return datetime.now(timezone.utc)
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class BatchWriter:
+    """Buffers per-row updates and applies them with a staging table + MERGE"""
+
+    def __init__(self, client=None, table_id: str = TARGET_TABLE,
+                 max_rows: int = FLUSH_ROWS, max_seconds: float = FLUSH_SECONDS):
+        if client is None:
+            from bigquery_client import get_client
+            client = get_client()
+        self.client = client
+        self.table_id = table_id
+        self.dataset_ref = table_id.rsplit('.', 1)[0]
+        self.max_rows = max(1, max_rows)
+        self.max_seconds = max_seconds
+        self._rows = {}  # (key column, key value) -> {'fields': {...}, 'keep_if_empty': set()}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        self.applied = 0
+        self.merges = 0
+        self.failed = []  # keys (id or url) of updates dropped by close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self._rows)
+
+    def update(self, key_value, fields: dict, key: str = 'id', keep_if_empty=()):
+        """Buffer new values for the row where key = key_value; fields is {column: (BigQuery type, value)}"""
+        if key not in ('id', 'url'):
+            raise ValueError(f"Rows are keyed by id or url, not {key}")
+        if key == 'id':
+            key_value = int(key_value)
+        with self._lock:
+            row = self._rows.setdefault((key, key_value), {'fields': {}, 'keep_if_empty': set()})
+            row['fields'].update(fields)
+            row['keep_if_empty'] = (row['keep_if_empty'] - set(fields)) | set(keep_if_empty)
+            full = len(self._rows) >= self.max_rows
+            if not full and self._timer is None and self.max_seconds:
+                self._timer = threading.Timer(self.max_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def flush(self) -> int:
+        """Apply everything buffered; returns the number of rows applied"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not rows:
+                return 0
+
+            # One MERGE per distinct set of columns - a staging table has one schema
+            groups = {}
+            for (key, key_value), row in rows.items():
+                signature = (key, tuple(sorted(row['fields'])), tuple(sorted(row['keep_if_empty'])))
+                groups.setdefault(signature, []).append((key_value, row))
+
+            applied = 0
+            for signature, members in groups.items():
+                try:
+                    self._merge(signature, members)
+                    applied += len(members)
+                except Exception as e:
+                    # Keep the rows for the next flush; values buffered meanwhile win
+                    print(f"⚠️ Batch update of {len(members)} rows failed, will retry: {str(e)[:200]}")
+                    with self._lock:
+                        for key_value, row in members:
+                            newer = self._rows.get((signature[0], key_value))
+                            if newer:
+                                row['fields'].update(newer['fields'])
+                                row['keep_if_empty'] = (row['keep_if_empty'] - set(newer['fields'])) | newer['keep_if_empty']
+                            self._rows[(signature[0], key_value)] = row
+            self.applied += applied
+            return applied
+
+    def close(self) -> list:
+        """
+        Flush what is left. Rows that still fail are dropped; returns their
+        keys (ids or urls), which are also kept in self.failed.
+        """
+        self.flush()
+        with self._lock:
+            lost, self._rows = [key_value for _, key_value in self._rows], {}
+        if lost:
+            self.failed.extend(lost)
+            print(f"❌ {len(lost)} buffered row updates could not be written")
+        return lost
+
+    def _merge(self, signature, members):
+        key, columns, keep_if_empty = signature
+        types = {column: members[0][1]['fields'][column][0] for column in columns}
+        schema = [bigquery.SchemaField(key, 'INT64' if key == 'id' else 'STRING')] + \
+                 [bigquery.SchemaField(column, types[column]) for column in columns]
+        records = [dict({key: key_value},
+                        **{column: _json_value(row['fields'][column][1]) for column in columns})
+                   for key_value, row in members]
+
+        staging_id = f"{self.dataset_ref}._staging_updates_{uuid.uuid4().hex[:12]}"
+        table = bigquery.Table(staging_id, schema=schema)
+        table.expires = now() + STAGING_EXPIRY
+        self.client.create_table(table)
+        try:
+            load_config = bigquery.LoadJobConfig(
+                schema=schema,
+                source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            )
+            self.client.load_table_from_json(records, staging_id, job_config=load_config).result()
+
+            assignments = ',\n                '.join(
+                f"{column} = COALESCE(NULLIF(S.{column}, ''), T.{column})" if column in keep_if_empty
+                else f"{column} = S.{column}"
+                for column in columns
+            )
+            merge_query = f"""
+            MERGE `{self.table_id}` T
+            USING `{staging_id}` S
+            ON T.{key} = S.{key}
+            WHEN MATCHED THEN UPDATE SET
+                {assignments}
+            """
+            self.client.query(merge_query).result()
+            self.merges += 1
+        finally:
+            self.client.delete_table(staging_id, not_found_ok=True)
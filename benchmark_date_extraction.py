@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark publish-date extraction against the fixture corpus in fixtures/dates.
+
+Compares the previous extract_publish_date (copied below unchanged: two
+trafilatura passes first, regexes last) with the current probe-first
+ParsedPage.found_publish_date, reporting accuracy against
+fixtures/dates/expected.json and time per page.
+
+Usage: python benchmark_date_extraction.py [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+import dateutil.parser
+import trafilatura
+
+from date_extraction import find_publish_date_with_source
+from web_scraper import ParsedPage
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'dates')
+
+
+def legacy_extract_publish_date(html_content: str, url: str) -> str:
+    """
+    Extract publish date from HTML content using multiple methods
+    """
+    try:
+        # Method 1: Try trafilatura's date extraction
+        date = trafilatura.extract_metadata(html_content)
+        if date and hasattr(date, 'date') and date.date:
+            try:
+                # Parse and format the date
+                parsed_date = dateutil.parser.parse(date.date)
+                return parsed_date.strftime('%Y-%m-%d')
+            except:
+                pass
+        
+        # Method 2: Extract with full metadata context
+        extracted_data = trafilatura.extract(html_content, include_comments=False, 
+                                           include_tables=False, include_formatting=False,
+                                           include_links=False, favor_precision=True,
+                                           with_metadata=True, output_format='python')
+        
+        if extracted_data and isinstance(extracted_data, dict):
+            # Check for date in metadata
+            date_value = extracted_data.get('date') if hasattr(extracted_data, 'get') else None
+            if date_value and isinstance(date_value, str):
+                try:
+                    parsed_date = dateutil.parser.parse(date_value)
+                    return parsed_date.strftime('%Y-%m-%d')
+                except:
+                    pass
+        
+        # Method 3: Search for common date patterns in HTML
+        import re
+        # Look for JSON-LD structured data
+        json_ld_pattern = r'"datePublished"\s*:\s*"([^"]+)"'
+        match = re.search(json_ld_pattern, html_content)
+        if match:
+            try:
+                parsed_date = dateutil.parser.parse(match.group(1))
+                return parsed_date.strftime('%Y-%m-%d')
+            except:
+                pass
+        
+        # Look for meta tags
+        meta_patterns = [
+            r'<meta[^>]*property=["\']article:published_time["\'][^>]*content=["\']([^"\'>]+)["\']',
+            r'<meta[^>]*name=["\']pubdate["\'][^>]*content=["\']([^"\'>]+)["\']',
+            r'<meta[^>]*name=["\']date["\'][^>]*content=["\']([^"\'>]+)["\']',
+            r'<time[^>]*datetime=["\']([^"\'>]+)["\']'
+        ]
+        
+        for pattern in meta_patterns:
+            match = re.search(pattern, html_content, re.IGNORECASE)
+            if match:
+                try:
+                    parsed_date = dateutil.parser.parse(match.group(1))
+                    return parsed_date.strftime('%Y-%m-%d')
+                except:
+                    continue
+        
+        # Return today's date as fallback
+        return datetime.now().strftime('%Y-%m-%d')
+    
+    except Exception as e:
+        return datetime.now().strftime('%Y-%m-%d')
+
+
+def legacy_date(html: str, url: str):
+    """Old function, with its today's-date fallback read as 'no date'"""
+    found = legacy_extract_publish_date(html, url)
+    return None if found == datetime.now().strftime('%Y-%m-%d') else found
+
+
+def current_date(html: str, url: str):
+    return ParsedPage(html, url).found_publish_date
+
+
+def load_fixtures():
+    with open(os.path.join(FIXTURE_DIR, 'expected.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+    fixtures = []
+    for name, info in sorted(expected.items()):
+        with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+            fixtures.append((name, info['url'], info['date'], f.read()))
+    return fixtures
+
+
+def time_per_page(fn, html: str, url: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(html, url)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    fixtures = load_fixtures()
+    totals = {'legacy': [0, 0.0], 'current': [0, 0.0]}
+
+    print(f"{'fixture':<32} {'expected':<11} {'legacy':<11} {'ms':>7}  {'current':<11} {'ms':>7}  probe")
+    for name, url, expected, html in fixtures:
+        row = [f"{name:<32} {str(expected):<11}"]
+        for label, fn in (('legacy', legacy_date), ('current', current_date)):
+            found = fn(html, url)
+            elapsed = time_per_page(fn, html, url, args.repeat)
+            totals[label][0] += found == expected
+            totals[label][1] += elapsed
+            mark = '' if found == expected else ' x'
+            row.append(f"{str(found) + mark:<11} {elapsed * 1000:>7.2f}")
+        _, probe = find_publish_date_with_source(html, fallback=lambda: None)
+        row.append(probe or 'trafilatura/none')
+        print(' '.join(row[:2]) + '  ' + '  '.join(row[2:]))
+
+    print()
+    count = len(fixtures)
+    for label, (correct, elapsed) in totals.items():
+        print(f"{label:<8} accuracy {correct}/{count}   mean {elapsed / count * 1000:.2f} ms/page")
+    print(f"speedup  {totals['legacy'][1] / max(totals['current'][1], 1e-9):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Benchmark extraction speed and accuracy on the saved corpus in fixtures/extraction.
+
+golden.json lists every document: a saved page (pages/*.html) or a raw
+Firecrawl result (pages/*.firecrawl.json), with its URL, expected title,
+publish date, tracked brand and snippet phrases. The expected main text
+is in golden/<name>.txt. For each document this times
+
+- full extraction: ParsedPage title + content + publish date for HTML,
+  _firecrawl_result for Firecrawl markdown
+- extract_publish_date (HTML)
+- clean_markdown_content (Firecrawl markdown)
+- scrape_light's snippet logic: build_snippet for the document's brand plus
+  the tracked-brand snippets from brand_snippets
+
+and scores title and date (exact match), content (token precision / recall
+/ F1 against the golden text) and the snippet (contains every golden phrase).
+
+Results are JSON (stdout, or --output) so runs can be kept per commit;
+--compare an earlier file to print what changed.
+
+Usage: python benchmark_extraction.py [--repeat 5] [--output results.json] [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import trafilatura
+
+from brand_snippets import get_matcher
+from near_duplicates import TOKEN
+from web_scraper import ParsedPage, build_snippet, clean_markdown_content, extract_publish_date, _firecrawl_result
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'extraction')
+
+# Accuracy changes smaller than this are noise in --compare
+SCORE_EPSILON = 0.005
+# Timing changes smaller than this fraction are noise in --compare
+TIMING_TOLERANCE = 0.10
+
+
+def load_corpus():
+    with open(os.path.join(FIXTURE_DIR, 'golden.json'), encoding='utf-8') as f:
+        golden = json.load(f)
+    documents = []
+    for name, expected in sorted(golden.items()):
+        with open(os.path.join(FIXTURE_DIR, 'pages', name), 'rb') as f:
+            raw = f.read()
+        stem = name[:-len('.json')] if name.endswith('.firecrawl.json') else os.path.splitext(name)[0]
+        with open(os.path.join(FIXTURE_DIR, 'golden', stem + '.txt'), encoding='utf-8') as f:
+            expected = dict(expected, content=f.read())
+        if name.endswith('.firecrawl.json'):
+            documents.append({'name': name, 'kind': 'firecrawl', 'raw': json.loads(raw.decode('utf-8')),
+                              'bytes': len(raw), 'expected': expected})
+        else:
+            documents.append({'name': name, 'kind': 'html', 'raw': raw, 'bytes': len(raw), 'expected': expected})
+    return documents
+
+
+def tokens(text: str) -> Counter:
+    return Counter(TOKEN.findall((text or '').lower()))
+
+
+def content_scores(extracted: str, golden: str) -> dict:
+    got, want = tokens(extracted), tokens(golden)
+    overlap = sum((got & want).values())
+    precision = overlap / sum(got.values()) if got else 0.0
+    recall = overlap / sum(want.values()) if want else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'content_precision': round(precision, 4), 'content_recall': round(recall, 4), 'content_f1': round(f1, 4)}
+
+
+def same_text(a, b) -> bool:
+    return ' '.join((a or '').split()) == ' '.join((b or '').split())
+
+
+def time_ms(fn, repeat: int) -> float:
+    """Median wall time of fn() in milliseconds"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def extract(document: dict) -> dict:
+    """title / date / content as the scraper would produce them"""
+    url = document['expected']['url']
+    if document['kind'] == 'firecrawl':
+        result = _firecrawl_result(document['raw'], url) or {}
+        return {'title': result.get('title'), 'date': result.get('publish_date'), 'content': result.get('content')}
+    page = ParsedPage(document['raw'], url)
+    return {'title': page.title, 'date': page.found_publish_date, 'content': page.content}
+
+
+def benchmark_document(document: dict, repeat: int) -> dict:
+    expected = document['expected']
+    url, brand = expected['url'], expected.get('brand', '')
+    extracted = extract(document)
+    content = extracted['content'] or ''
+    matcher = get_matcher()
+
+    def snippet_logic():
+        build_snippet(content, brand)
+        matcher.snippets(content)
+
+    timings = {'full_extraction': time_ms(lambda: extract(document), repeat),
+               'snippet': time_ms(snippet_logic, repeat)}
+    if document['kind'] == 'firecrawl':
+        timings['clean_markdown_content'] = time_ms(
+            lambda: clean_markdown_content(document['raw']['markdown'], url), repeat)
+    else:
+        timings['extract_publish_date'] = time_ms(lambda: extract_publish_date(document['raw'], url), repeat)
+
+    snippet = build_snippet(content, brand)
+    scores = {
+        'title': int(same_text(extracted['title'], expected['title'])),
+        'date': int(extracted['date'] == expected['date']),
+        'snippet': int(all(phrase in snippet for phrase in expected.get('snippet_contains', []))),
+    }
+    scores.update(content_scores(content, expected['content']))
+    return {
+        'kind': document['kind'],
+        'bytes': document['bytes'],
+        'timings_ms': timings,
+        'scores': scores,
+        'extracted': {'title': extracted['title'], 'date': extracted['date'], 'content_chars': len(content)},
+    }
+
+
+def summarize(results: dict) -> dict:
+    scores = [result['scores'] for result in results.values()]
+    accuracy = {key: round(statistics.mean(score[key] for score in scores), 4)
+                for key in ('title', 'date', 'snippet', 'content_precision', 'content_recall', 'content_f1')}
+    timings = {}
+    for result in results.values():
+        for stage, ms in result['timings_ms'].items():
+            timings[stage] = round(timings.get(stage, 0.0) + ms, 3)
+    return {'documents': len(results), 'accuracy': accuracy, 'timings_ms': timings}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip())
+        return commit or None, dirty
+    except OSError:
+        return None, None
+
+
+def run(repeat: int) -> dict:
+    documents = load_corpus()
+    # Warm up regexes, the brand matcher and lxml before timing anything
+    for document in documents:
+        extract(document)
+    results = {document['name']: benchmark_document(document, repeat) for document in documents}
+    commit, dirty = git_commit()
+    return {
+        'commit': commit,
+        'dirty': dirty,
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'trafilatura': getattr(trafilatura, '__version__', None),
+        'repeat': repeat,
+        'summary': summarize(results),
+        'documents': results,
+    }
+
+
+def compare(old: dict, new: dict, out=sys.stderr):
+    """Print accuracy and timing changes between two result files"""
+    print(f"Comparing {str(old.get('commit'))[:10]} -> {str(new.get('commit'))[:10]}", file=out)
+    old_accuracy, new_accuracy = old['summary']['accuracy'], new['summary']['accuracy']
+    for key, value in new_accuracy.items():
+        before = old_accuracy.get(key)
+        if before is not None and abs(value - before) >= SCORE_EPSILON:
+            print(f"  accuracy {key:<18} {before:.3f} -> {value:.3f}", file=out)
+    old_timings, new_timings = old['summary']['timings_ms'], new['summary']['timings_ms']
+    for stage, ms in new_timings.items():
+        before = old_timings.get(stage)
+        if before and abs(ms - before) / before >= TIMING_TOLERANCE:
+            print(f"  time     {stage:<22} {before:>9.2f} ms -> {ms:>9.2f} ms ({ms / before:.2f}x)", file=out)
+    for name, result in new['documents'].items():
+        previous = old['documents'].get(name)
+        if previous is None:
+            print(f"  new document {name}", file=out)
+            continue
+        for key, value in result['scores'].items():
+            before = previous['scores'].get(key)
+            if before is not None and abs(value - before) >= SCORE_EPSILON:
+                print(f"  {name}: {key} {before} -> {value}", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per function per document (median is kept)')
+    parser.add_argument('--output', help='Write the JSON results here instead of stdout')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    results = run(max(1, args.repeat))
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        summary = results['summary']
+        print(f"{summary['documents']} documents - accuracy {summary['accuracy']}", file=sys.stderr)
+        print(f"timings (ms, summed over documents) {summary['timings_ms']}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
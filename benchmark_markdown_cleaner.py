@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass clean_markdown_content against the previous
+line-by-line implementation (copied below unchanged as the reference).
+
+Inputs are built from the techinasia Firecrawl sample in attached_assets,
+repeated up to several MB, plus randomised markdown. Every input is checked
+for identical output before timing (both run with all rule packs, i.e. no url).
+
+Usage: python benchmark_markdown_cleaner.py [--sizes 10,100,1000] [--repeat 3]
+"""
+
+import argparse
+import glob
+import random
+import re
+import time
+
+from web_scraper import clean_markdown_content, CLEANING_RULES
+
+SAMPLE_GLOB = 'attached_assets/Pasted--Premium-https-www-techinasia-com-*.txt'
+
+
+def legacy_clean_markdown_content(content: str) -> str:
+    """
+    Clean up scraped markdown content by removing navigation, ads, 
+    subscription prompts, job listings, and other website chrome.
+    """
+    if not content:
+        return ""
+    
+    lines = content.split('\n')
+    cleaned_lines = []
+    skip_section = False
+    article_started = False
+    
+    # Patterns to skip (navigation, ads, etc.)
+    skip_patterns = [
+        '- [Premium]',
+        '- [Visuals]',
+        '- [News]',
+        '- [Paid Partnership]',
+        '- [Press Releases]',
+        '- More',
+        '[Free newsletter]',
+        '[Subscribe]',
+        'Tired of ads?',
+        'signing up',
+        'Premium Content',
+        'It takes our newsroom',
+        "You can't find them",
+        'anywhere else',
+        'This is premium content',
+        'Subscribe to read',
+        'We know this is not ideal',
+        'Sign up in 20 seconds',
+        'Cancel anytime',
+        'For learners',
+        'For professionals',
+        'Best value',
+        'Billed annually',
+        'Get instant access',
+        'premium content',
+        'Unlimited news content',
+        'Unlimited company database',
+        'Ad-free reading',
+        'Just US$',
+        '[Compare]',
+        '[Subscribe now',
+        'Already a subscriber',
+        '[Log in Here]',
+        'Our subscriber community',
+        '### [🏆 Premium',
+        '### [💼 Latest Jobs',
+        '📅 Upcoming Events',
+        'More articles ↓',
+        'NextPrev',
+        'Featured',
+        'TIA Writer',
+        '· 2d ago ·',
+        '· 1d ago ·',
+        '· 3d ago ·',
+        'min read',
+    ]
+    
+    # Patterns that indicate end of article content
+    end_patterns = [
+        '## Stay ahead in Asia',
+        'This is premium content. Subscribe',
+        '### [🏆 Premium Content]',
+        '### [💼 Latest Jobs]',
+    ]
+    
+    for line in lines:
+        stripped = line.strip()
+        
+        # Check if we've hit end of article
+        if any(pattern in line for pattern in end_patterns):
+            break
+        
+        # Skip empty lines at the start
+        if not article_started and not stripped:
+            continue
+        
+        # Skip navigation and chrome
+        if any(pattern in line for pattern in skip_patterns):
+            continue
+        
+        # Skip image-only lines (markdown images without text)
+        if stripped.startswith('![') and stripped.endswith(')') and len(stripped) < 200:
+            # Allow images with captions (longer lines)
+            if '/' not in stripped[3:50]:  # Skip if it looks like a nav image
+                continue
+        
+        # Skip lines that are just links
+        if stripped.startswith('[') and stripped.endswith(')') and '](' in stripped:
+            link_text = stripped.split('](')[0][1:]
+            if len(link_text) < 50:  # Short link text = likely navigation
+                continue
+        
+        # Skip lines with multiple navigation-style links
+        if stripped.count('](http') > 2:
+            continue
+        
+        # Skip job listings
+        if '**Mandarin Teacher**' in line or '**Online Sales' in line or 'IDR ' in line:
+            continue
+        
+        # Detect article start (headline)
+        if stripped.startswith('# ') and not article_started:
+            article_started = True
+        
+        # Add valid content
+        if stripped or article_started:
+            cleaned_lines.append(line)
+            if stripped:
+                article_started = True
+    
+    # Join and clean up extra whitespace
+    result = '\n'.join(cleaned_lines)
+    
+    # Remove multiple consecutive blank lines
+    while '\n\n\n' in result:
+        result = result.replace('\n\n\n', '\n\n')
+    
+    # Remove markdown link syntax, keep just the text
+    # [text](url) -> text
+    result = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', result)
+    
+    # Remove image references
+    result = re.sub(r'!\[[^\]]*\]\([^)]+\)', '', result)
+    
+    # Clean up any remaining Base64 image references
+    result = re.sub(r'<Base64-Image-Removed>', '', result)
+    
+    # Remove duplicate title (non-heading version before the # heading)
+    lines = result.split('\n')
+    if len(lines) > 2:
+        # Find the main headline
+        for i, line in enumerate(lines):
+            if line.strip().startswith('# '):
+                headline = line.strip()[2:].strip()
+                # Check if previous non-empty lines match the headline
+                new_lines = []
+                for j, l in enumerate(lines):
+                    if j < i and l.strip() == headline:
+                        continue  # Skip duplicate title
+                    new_lines.append(l)
+                result = '\n'.join(new_lines)
+                break
+    
+    # Remove multiple consecutive blank lines again
+    while '\n\n\n' in result:
+        result = result.replace('\n\n\n', '\n\n')
+    
+    return result.strip()
+
+
+def load_sample() -> str:
+    paths = sorted(glob.glob(SAMPLE_GLOB))
+    if paths:
+        with open(paths[0], encoding='utf-8') as f:
+            return f.read()
+    return random_markdown(random.Random(0), 200)
+
+
+def without_end_lines(text: str) -> str:
+    """Drop lines with an end pattern, so the whole input is processed rather than a short prefix"""
+    end_patterns = [p for pack in CLEANING_RULES.values() for p in pack.get('end_patterns', [])]
+    return '\n'.join(line for line in text.split('\n') if not any(p in line for p in end_patterns))
+
+
+def random_markdown(rng: random.Random, n_lines: int) -> str:
+    """Markdown with the kinds of lines Firecrawl returns: nav, links, images, jobs, prose"""
+    pieces = [
+        '- [Premium](https://example.com/p)', '[Subscribe](https://example.com/s)',
+        '![](https://img.example.com/a.png)', '![](<Base64-Image-Removed>)', '![caption](x)',
+        '[Short link](https://example.com)', '[' + 'long link text ' * 5 + '](https://example.com)',
+        '[a](http://a) [b](http://b) [c](http://c)', '**Mandarin Teacher** IDR 5,000,000',
+        'Antler led the round. The startup raised [$5m](https://example.com/news).',
+        'Plain paragraph with no markup at all.', '', '', '   ', '# Headline here', 'Headline here',
+        'Glenn Kaonang · 2d ago · 5 min read', 'Some text [multi\nline link](http://x)',
+        '## Stay ahead in Asia', 'More articles ↓', '[unclosed link(', ')', '![alt [x](y)](z)',
+    ]
+    return '\n'.join(rng.choice(pieces) for _ in range(n_lines))
+
+
+def check_equivalence(samples) -> int:
+    mismatches = 0
+    for text in samples:
+        if clean_markdown_content(text) != legacy_clean_markdown_content(text):
+            mismatches += 1
+    return mismatches
+
+
+def time_it(fn, text: str, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', default='1,10,100,500', help='Input sizes as multiples of the sample')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fuzz', type=int, default=2000, help='Random documents to check for identical output')
+    args = parser.parse_args()
+
+    sample = load_sample()
+    rng = random.Random(42)
+
+    # End patterns truncate the sample early, so also time it with them removed
+    body_only = without_end_lines(sample)
+
+    fuzz = [random_markdown(rng, rng.randint(1, 60)) for _ in range(args.fuzz)]
+    mismatches = check_equivalence(fuzz + [sample, body_only])
+    print(f"Equivalence: {len(fuzz) + 2 - mismatches}/{len(fuzz) + 2} inputs identical")
+    if mismatches:
+        raise SystemExit("Outputs differ from the reference implementation")
+
+    print(f"{'input':<24} {'size':>10} {'legacy s':>10} {'new s':>10} {'speedup':>8}")
+    for multiple in (int(s) for s in args.sizes.split(',')):
+        for label, base in (('sample', sample), ('sample, no end', body_only),
+                            ('random, no end', without_end_lines(random_markdown(rng, 400)))):
+            text = '\n'.join([base] * multiple)
+            if clean_markdown_content(text) != legacy_clean_markdown_content(text):
+                raise SystemExit(f"Outputs differ for {label} x{multiple}")
+            legacy_time = time_it(legacy_clean_markdown_content, text, args.repeat)
+            new_time = time_it(clean_markdown_content, text, args.repeat)
+            print(f"{label + ' x' + str(multiple):<24} {len(text):>10,} {legacy_time:>10.4f} "
+                  f"{new_time:>10.4f} {legacy_time / max(new_time, 1e-9):>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
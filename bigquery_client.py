@@ -1,53 +1,97 @@
 import os
 import json
+import threading
 import requests
 from google.cloud import bigquery
 from google.oauth2 import service_account
 from datetime import datetime
 import streamlit as st
+from url_resolver import resolve_many, canonical_key
+import near_duplicates
+import content_store
+import id_allocator
+import batch_writer
+import bulk_ingest
+import enrichment_dispatcher
+
+PROJECT_ID = "media-455519"
+CREDENTIALS_FILE = 'attached_assets/media-455519-e05e80608e53.json'
+
+# One bigquery.Client per process. Streamlit re-runs app.py but not imported
+# modules, so it is shared by every rerun, session and batch.
+_client = None
+_client_lock = threading.Lock()
+_validated = False
+
+# Columns known to exist (see _add_columns), shared by all BigQueryClient instances
+_added_columns = set()
+
+
+def _load_credentials():
+    """
+    Service account credentials from the first source that has them: the key
+    file in attached_assets, GOOGLE_APPLICATION_CREDENTIALS_JSON, then
+    GOOGLE_APPLICATION_CREDENTIALS. Nothing is sent to BigQuery.
+    """
+    errors = []
+    try:
+        with open(CREDENTIALS_FILE, 'r') as f:
+            return service_account.Credentials.from_service_account_info(json.load(f))
+    except Exception as e:
+        errors.append(f"File error: {e}")
+    
+    credentials_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
+    if credentials_json:
+        try:
+            return service_account.Credentials.from_service_account_info(json.loads(credentials_json))
+        except Exception as e:
+            errors.append(f"GOOGLE_APPLICATION_CREDENTIALS_JSON error: {e}")
+    
+    credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+    if credentials_path:
+        try:
+            return service_account.Credentials.from_service_account_file(credentials_path)
+        except Exception as e:
+            errors.append(f"GOOGLE_APPLICATION_CREDENTIALS error: {e}")
+    
+    raise Exception(f"BigQuery authentication failed. {' '.join(errors)}")
+
+
+def get_client():
+    """The process-wide bigquery.Client, created on first use (credentials are loaded once)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = bigquery.Client(credentials=_load_credentials(), project=PROJECT_ID)
+    return _client
+
 
 class BigQueryClient:
     def __init__(self):
-        self.project_id = "media-455519"
+        self.project_id = PROJECT_ID
         self.dataset_id = "mediatracker"
         self.table_id = "mediatracker"
         self.full_table_id = f"{self.project_id}.{self.dataset_id}.{self.table_id}"
-        self.client = self._get_client()
+        self.client = get_client()
+        self._added_columns = _added_columns
 
-    def _get_client(self):
-        # Try file-based credentials first (most reliable)
+    def validate(self, force=False):
+        """
+        Check credentials and access to the table with a dry-run query, which
+        BigQuery doesn't bill or run. Returns (ok, message); a success is
+        remembered for the rest of the process unless force is set.
+        """
+        global _validated
+        if _validated and not force:
+            return True, "Connection already validated"
         try:
-            with open('attached_assets/media-455519-e05e80608e53.json', 'r') as f:
-                credentials_info = json.load(f)
-            credentials = service_account.Credentials.from_service_account_info(credentials_info)
-            client = bigquery.Client(credentials=credentials, project=self.project_id)
-            client.query("SELECT 1").result()
-            return client
-        except Exception as file_error:
-            # Fallback to environment variable
-            try:
-                credentials_json = os.getenv('GOOGLE_APPLICATION_CREDENTIALS_JSON')
-                if credentials_json:
-                    credentials_info = json.loads(credentials_json)
-                    credentials = service_account.Credentials.from_service_account_info(credentials_info)
-                    client = bigquery.Client(credentials=credentials, project=self.project_id)
-                    client.query("SELECT 1").result()
-                    return client
-            except Exception:
-                pass
-            
-            # Last resort: try credentials path
-            try:
-                credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-                if credentials_path:
-                    credentials = service_account.Credentials.from_service_account_file(credentials_path)
-                    client = bigquery.Client(credentials=credentials, project=self.project_id)
-                    client.query("SELECT 1").result()
-                    return client
-            except Exception:
-                pass
-            
-            raise Exception(f"BigQuery authentication failed. File error: {str(file_error)}")
+            job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+            self.client.query(f"SELECT id FROM `{self.full_table_id}` LIMIT 1", job_config=job_config, timeout=30)
+            _validated = True
+            return True, f"Successfully validated access to {self.full_table_id}"
+        except Exception as e:
+            return False, f"BigQuery validation failed: {str(e)}"
 
     def check_url_exists(self, url):
         """Check if URL already exists in the database"""
@@ -141,9 +185,7 @@ class BigQueryClient:
                 signal_score = 5
                 tier = 'Tier 3' if page_rank < 5 else ('Tier 2' if page_rank < 7 else 'Tier 1')
             
-            max_id_query = "SELECT COALESCE(MAX(id), 0) as max_id FROM `media-455519.mediatracker.media_data`"
-            max_id = list(self.client.query(max_id_query).result())[0].max_id
-            next_id = max_id + 1
+            next_id = id_allocator.next_id('media_data')
             
             insert_query = """
             INSERT INTO `media-455519.mediatracker.media_data`
@@ -166,7 +208,12 @@ class BigQueryClient:
         except Exception as e:
             pass
 
-    def insert_media_record(self, record_data, skip_procedure=False):
+    def insert_media_record(self, record_data, skip_procedure=False, dispatcher=None):
+        """
+        Insert one article. Enrichment (process_new_url) runs right after the
+        insert, or later through dispatcher (an EnrichmentDispatcher) if one
+        is given; skip_procedure leaves it out entirely.
+        """
         try:
             # First normalize and check if URL already exists
             url = record_data.get('url', '')
@@ -186,16 +233,19 @@ class BigQueryClient:
             # Ensure domain exists in media_data (fetch page_rank if new)
             self.ensure_domain_in_media_data(prepared_data.get("domain"))
 
-            # Get next ID
-            max_id_query = f"SELECT COALESCE(MAX(id), 0) as max_id FROM `{self.full_table_id}`"
-            max_id = list(self.client.query(max_id_query).result())[0].max_id
-            next_id = max_id + 1
+            next_id = id_allocator.next_id('mediatracker')
+
+            # Full text goes to the content store when one is configured (see save_full_content)
+            content_fields = self._content_fields(prepared_data["content"], next_id) if prepared_data["content"] else {}
+            extra_columns = [name for name in content_fields if name != 'content']
+            extra_columns_sql = ''.join(f", {name}" for name in extra_columns)
+            extra_values_sql = ''.join(f", @{name}" for name in extra_columns)
 
             query = f"""
             INSERT INTO `{self.full_table_id}`
-            (id, url, content, domain, title, publish_date, updated_at, matched_spokespeople, matched_reporter, matched_portcos, tagged_antler, managed_by_fund, unbranded_win, data_ingestion)
+            (id, url, content, domain, title, publish_date, updated_at, matched_spokespeople, matched_reporter, matched_portcos, tagged_antler, managed_by_fund, unbranded_win, data_ingestion{extra_columns_sql})
             VALUES (
-                @id, @url, @content, @domain, @title, @publish_date, @updated_at, @matched_spokespeople, @matched_reporter, @matched_portcos, @tagged_antler, @managed_by_fund, @unbranded_win, TRUE
+                @id, @url, @content, @domain, @title, @publish_date, @updated_at, @matched_spokespeople, @matched_reporter, @matched_portcos, @tagged_antler, @managed_by_fund, @unbranded_win, TRUE{extra_values_sql}
             )
             """
 
@@ -203,7 +253,8 @@ class BigQueryClient:
                 query_parameters=[
                     bigquery.ScalarQueryParameter("id", "INT64", next_id),
                     bigquery.ScalarQueryParameter("url", "STRING", prepared_data["url"]),
-                    bigquery.ScalarQueryParameter("content", "STRING", prepared_data["content"]),
+                    bigquery.ScalarQueryParameter("content", "STRING",
+                                                  content_fields.get('content', ('STRING', prepared_data["content"]))[1]),
                     bigquery.ScalarQueryParameter("domain", "STRING", prepared_data["domain"]),
                     bigquery.ScalarQueryParameter("title", "STRING", prepared_data["title"]),
                     bigquery.ScalarQueryParameter("publish_date", "TIMESTAMP", prepared_data["publish_date"]),
@@ -214,7 +265,7 @@ class BigQueryClient:
                     bigquery.ScalarQueryParameter("tagged_antler", "BOOL", prepared_data["tagged_antler"]),
                     bigquery.ScalarQueryParameter("managed_by_fund", "STRING", prepared_data["managed_by_fund"]),
                     bigquery.ScalarQueryParameter("unbranded_win", "BOOL", prepared_data["unbranded_win"]),
-                ]
+                ] + [bigquery.ScalarQueryParameter(name, *content_fields[name]) for name in extra_columns]
             )
 
             job = self.client.query(query, job_config=job_config)
@@ -223,8 +274,12 @@ class BigQueryClient:
             st.success("✅ Record successfully inserted into BigQuery!")
 
             # Only call procedure if not skipping (for batch operations)
-            if not skip_procedure:
-                self.trigger_url_processing(record_data)
+            if skip_procedure:
+                pass
+            elif dispatcher is not None:
+                dispatcher.add(record_data['url'], job)
+            else:
+                self.trigger_url_processing(record_data, job=job)
 
             return True
 
@@ -232,29 +287,19 @@ class BigQueryClient:
             st.error(f"Error inserting record: {str(e)}")
             return False
 
-    def trigger_url_processing(self, record_data):
-        import time
+    def trigger_url_processing(self, record_data, job=None):
+        """Run process_new_url for a new record as soon as job (its insert) is done"""
         try:
             st.info("Processing new URL...")
             
             url = record_data.get('url', '')
             domain = record_data.get('domain', '')
             
-            # Wait for streaming buffer to settle
-            st.info("Waiting 15 seconds for BigQuery streaming buffer...")
-            time.sleep(15)
-            
-            # Call procedure WITH the URL parameter
-            query = f"CALL `media-455519.mediatracker.process_new_url`(@url)"
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("url", "STRING", url)
-                ]
-            )
-            
+            # Polls the insert job instead of waiting a fixed 15 seconds
             st.info("Executing enrichment procedure...")
-            job = self.client.query(query, job_config=job_config)
-            job.result()
+            result = enrichment_dispatcher.enrich([url], job=job, client=self.client)
+            if result['failed']:
+                raise Exception(result['failed'][url])
 
             st.success(f"URL enrichment completed for: {domain}")
             return True
@@ -262,15 +307,15 @@ class BigQueryClient:
             st.warning(f"Record saved but enrichment failed: {str(e)}")
             return False
 
-    def call_process_backlog_bulk(self):
-        """Run enrichment updates after bulk data ingestion - fills ALL fields"""
-        import time
+    def call_process_backlog_bulk(self, jobs=()):
+        """Run enrichment updates after bulk data ingestion - fills ALL fields. jobs are writes to wait for first."""
         try:
             st.info("📝 Data saved! Running enrichment updates...")
             
-            # Wait for streaming buffer to settle
-            st.info("⏳ Waiting 20 seconds for BigQuery streaming buffer...")
-            time.sleep(20)
+            # Wait for the ingestion jobs themselves, not a fixed 20 seconds
+            failed_jobs = enrichment_dispatcher.wait_for_jobs(jobs)
+            if failed_jobs:
+                st.warning(f"⚠️ {len(failed_jobs)} write jobs failed or are still running")
             
             # COMPREHENSIVE update for ALL 49 fields - no NULLs allowed
             batch_sql = '''
@@ -633,48 +678,67 @@ class BigQueryClient:
             
         return url
 
-    def check_existing_urls(self, urls_list):
-        """Check which URLs already exist in the database with smart normalization"""
+    def _url_variants(self, url, resolution=None):
+        """Normalized forms an already-stored copy of this URL could be under"""
+        variants = [self.normalize_url(url)]
+        if resolution:
+            for candidate in (resolution['final_url'], resolution['resolved_url']):
+                normalized = self.normalize_url(candidate)
+                if normalized not in variants:
+                    variants.append(normalized)
+        return variants
+
+    def check_existing_urls(self, urls_list, resolved=None):
+        """
+        Check which URLs already exist in the database with smart normalization.
+        Redirects and rel=canonical are resolved first (url_resolver), and URLs
+        are compared on url_resolver.canonical_key - the key used for in-batch
+        dedupe - so a short link or tracking variant of a stored article counts
+        as existing. resolved can pass in url_resolver.resolve_many results
+        already at hand.
+        """
         try:
             if not urls_list:
                 return []
             
-            # Normalize input URLs using Python (more reliable than complex SQL)
-            normalized_input_urls = [self.normalize_url(url) for url in urls_list]
+            if resolved is None:
+                resolved = resolve_many(urls_list)
+            
+            # Canonical keys of every variant of each input URL (as given, after redirects, canonical)
+            keys_per_url = [{canonical_key(variant) for variant in self._url_variants(url, resolved.get(url))}
+                            for url in urls_list]
             
             # Use faster batch checking approach
             existing_urls = []
             
             # Process URLs in smaller batches to avoid timeouts
             batch_size = 100
-            for i in range(0, len(normalized_input_urls), batch_size):
-                batch_urls = normalized_input_urls[i:i+batch_size]
+            for i in range(0, len(urls_list), batch_size):
+                batch_keys = keys_per_url[i:i+batch_size]
                 original_batch = urls_list[i:i+batch_size]
                 
-                # Check this batch against database using parameterized query
-                placeholders = ', '.join([f"@url_{idx}" for idx in range(len(batch_urls))])
+                # Stored URLs with the same host and path (case, scheme, www., query
+                # and fragment ignored) are the candidates; canonical_key decides below
+                bases = sorted({key.split('://', 1)[1].split('?', 1)[0].lower() for keys in batch_keys for key in keys})
                 query = f"""
                 SELECT DISTINCT url
                 FROM `{self.full_table_id}`
-                WHERE url IN ({placeholders})
+                WHERE RTRIM(REGEXP_REPLACE(LOWER(SPLIT(SPLIT(url, '#')[OFFSET(0)], '?')[OFFSET(0)]),
+                                           r'^(https?://)?(www\\.)?', ''), '/') IN UNNEST(@bases)
                 """
                 
-                # Create query parameters
-                query_parameters = [
-                    bigquery.ScalarQueryParameter(f"url_{idx}", "STRING", url)
-                    for idx, url in enumerate(batch_urls)
-                ]
-                
-                job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+                job_config = bigquery.QueryJobConfig(
+                    query_parameters=[bigquery.ArrayQueryParameter("bases", "STRING", bases)]
+                )
                 query_job = self.client.query(query, job_config=job_config)
                 results = query_job.result()
                 
-                # Get existing URLs from this batch
-                existing_in_batch = set(row.url for row in results)
+                # Canonical keys of the stored copies found for this batch
+                existing_in_batch = set(canonical_key(row.url) for row in results if row.url)
                 
                 # Map back to original URLs
-                for j, normalized_url in enumerate(batch_urls):
-                    if normalized_url in existing_in_batch:
+                for j, keys in enumerate(batch_keys):
+                    if keys & existing_in_batch:
                         existing_urls.append(original_batch[j])
             
             return existing_urls
@@ -863,46 +927,56 @@ class BigQueryClient:
             if not batch_name:
                 batch_name = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
             
-            # Normalize URLs and check for duplicates before adding to queue
+            # Resolve redirects/canonical links once for the whole list, then
+            # dedupe on the canonical key so each article is queued (and scraped) once
             current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            resolved = resolve_many(urls_list)
+            existing_in_db = set(self.check_existing_urls(urls_list, resolved=resolved))
+            
+            variants = {url: self._url_variants(url, resolved.get(url)) for url in urls_list}
+            all_variants = list(dict.fromkeys(v for url_variants in variants.values() for v in url_variants))
+            existing_in_queue = set()
+            if all_variants:
+                existing_in_queue_query = f"""
+                SELECT DISTINCT url
+                FROM `{queue_table}` 
+                WHERE url IN UNNEST(@urls)
+                """
+                job_config = bigquery.QueryJobConfig(
+                    query_parameters=[bigquery.ArrayQueryParameter("urls", "STRING", all_variants)]
+                )
+                existing_in_queue = set(row.url for row in self.client.query(existing_in_queue_query, job_config=job_config).result())
+            
             rows_to_insert = []
-            normalized_urls_seen = set()
+            canonical_keys_seen = set()
             skipped_duplicates = 0
             skipped_antler = 0
             
             for url in urls_list:
-                normalized_url = self.normalize_url(url)
+                resolution = resolved.get(url)
+                # Queue the resolved (canonical) URL rather than the short link or tracking variant
+                normalized_url = self.normalize_url(resolution['resolved_url'] if resolution else url)
                 
                 # Skip antler.co URLs
-                if 'antler.co' in normalized_url.lower():
+                if 'antler.co' in normalized_url.lower() or 'antler.co' in self.normalize_url(url).lower():
                     skipped_antler += 1
                     continue
                 
-                # Skip if we've already seen this normalized URL in this batch
-                if normalized_url in normalized_urls_seen:
+                # Skip if we've already seen this article in this batch
+                canonical = resolution['key'] if resolution else normalized_url
+                if canonical in canonical_keys_seen:
                     skipped_duplicates += 1
                     continue
                     
-                # Check if this normalized URL already exists in database or queue
-                existing_in_db = self.check_url_exists(normalized_url)
-                existing_in_queue_query = f"""
-                SELECT COUNT(*) as count 
-                FROM `{queue_table}` 
-                WHERE url = @url
-                """
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[bigquery.ScalarQueryParameter("url", "STRING", normalized_url)]
-                )
-                existing_in_queue = list(self.client.query(existing_in_queue_query, job_config=job_config).result())[0].count > 0
-                
-                if existing_in_db or existing_in_queue:
+                # Check if this article already exists in database or queue
+                if url in existing_in_db or any(v in existing_in_queue for v in variants[url]):
                     skipped_duplicates += 1
                     continue
                 
-                normalized_urls_seen.add(normalized_url)
+                canonical_keys_seen.add(canonical)
                 rows_to_insert.append({
                     'id': str(uuid.uuid4()),
-                    'url': normalized_url,  # Store normalized URL
+                    'url': normalized_url,  # Store normalized canonical URL
                     'status': 'pending',
                     'batch_name': batch_name,
                     'created_at': current_time,
@@ -921,8 +995,8 @@ class BigQueryClient:
                     'total_input': len(urls_list)
                 }
             
-            table = self.client.get_table(queue_table)
-            errors = self.client.insert_rows_json(table, rows_to_insert)
+            # Load job, not streaming - process_next_url_from_queue can update the rows right away
+            errors = bulk_ingest.load_rows(rows_to_insert, queue_table, client=self.client)
             
             if not errors:
                 return True, batch_name, {
@@ -1084,34 +1158,210 @@ class BigQueryClient:
             
         except Exception as e:
             return []
-    
+
+    def get_portco_names(self):
+        """Names of all tracked portfolio companies (for brand matching)"""
+        try:
+            query = f"""
+            SELECT DISTINCT TRIM(portco_name) AS portco_name
+            FROM `{self.project_id}.{self.dataset_id}.portcos`
+            WHERE portco_name IS NOT NULL AND TRIM(portco_name) != ''
+            """
+            return [row.portco_name for row in self.client.query(query).result()]
+        except Exception as e:
+            return []
+
+    def _add_columns(self, columns):
+        """ALTER TABLE ... ADD COLUMN IF NOT EXISTS for {name: type}; True once they all exist"""
+        missing = {name: column_type for name, column_type in columns.items() if name not in self._added_columns}
+        if not missing:
+            return True
+        try:
+            additions = ',\n            '.join(f"ADD COLUMN IF NOT EXISTS {name} {column_type}" for name, column_type in missing.items())
+            self.client.query(f"""
+            ALTER TABLE `{self.full_table_id}`
+            {additions}
+            """).result()
+            self._added_columns.update(missing)
+            return True
+        except Exception as e:
+            print(f"⚠️ Could not add columns {', '.join(missing)}: {str(e)[:200]}")
+            return False
+
+    def ensure_duplicate_cluster_column(self):
+        """Add the duplicate_cluster_id column (see near_duplicates) if the table doesn't have it yet"""
+        return self._add_columns({'duplicate_cluster_id': 'STRING'})
+
+    def ensure_content_columns(self):
+        """Add content_length / content_hash (see content_store) if the table doesn't have them yet"""
+        return self._add_columns({'content_length': 'INT64', 'content_hash': 'STRING'})
+
+    def update_row(self, fields, article_id=None, url=None, keep_if_empty=(), writer=None):
+        """
+        Set {name: (BigQuery type, value)} on a row (by id, else by url), now or
+        through a batch_writer.BatchWriter. Columns in keep_if_empty keep their
+        value when the new one is empty.
+        """
+        if writer is not None:
+            if article_id is not None:
+                writer.update(article_id, fields, key='id', keep_if_empty=keep_if_empty)
+            else:
+                writer.update(url, fields, key='url', keep_if_empty=keep_if_empty)
+            return
+        
+        assignments = [f"{name} = COALESCE(NULLIF(@{name}, ''), {name})" if name in keep_if_empty
+                       else f"{name} = @{name}" for name in fields]
+        query_parameters = [bigquery.ScalarQueryParameter(name, column_type, value)
+                            for name, (column_type, value) in fields.items()]
+        if article_id is not None:
+            where = "id = @id"
+            query_parameters.append(bigquery.ScalarQueryParameter("id", "INT64", int(article_id)))
+        else:
+            where = "url = @url"
+            query_parameters.append(bigquery.ScalarQueryParameter("url", "STRING", url))
+        
+        assignments_sql = ',\n            '.join(assignments)
+        update_query = f"""
+        UPDATE `{self.full_table_id}`
+        SET {assignments_sql}
+        WHERE {where}
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+        self.client.query(update_query, job_config=job_config).result()
+
+    def save_full_content(self, content, article_id=None, url=None, mark_scraped=True, extra_fields=None,
+                          writer=None):
+        """
+        Save scraped full text for a row (by id, else by url). With a content
+        store configured the text goes to content_store and the row keeps its
+        preview, length and hash; otherwise, and for rows without an id, the
+        full text stays in the table. extra_fields are more columns to set, as
+        {name: (BigQuery type, value)}. With a writer
+        (batch_writer.BatchWriter) the row update is buffered.
+        """
+        fields = self._content_fields(content, article_id)
+        if mark_scraped:
+            fields.update({
+                'text_scraped': ('BOOL', True),
+                'text_scraped_at': ('TIMESTAMP', batch_writer.now()),
+                'text_scrape_error': ('STRING', None),
+                'updated_at': ('TIMESTAMP', batch_writer.now()),
+            })
+        fields.update(extra_fields or {})
+        self.update_row(fields, article_id=article_id, url=url, writer=writer)
+
+    def _content_fields(self, content, article_id=None):
+        """Row fields that store content - see save_full_content"""
+        if not self.ensure_content_columns():
+            return {'content': ('STRING', content)}
+        if article_id is not None and content_store.ENABLED:
+            stored = content_store.put(article_id, content)
+        else:
+            # Full text in the table; no hash, so readers don't fall back to an older blob
+            stored = {'content': content, 'content_length': len(content or ''), 'content_hash': None}
+        return {
+            'content': ('STRING', stored['content']),
+            'content_length': ('INT64', stored['content_length']),
+            'content_hash': ('STRING', stored['content_hash']),
+        }
+
+    def save_scrape_error(self, error, article_id=None, url=None, extra_fields=None, writer=None):
+        """Record a failed text scrape in text_scrape_error (by id, else by url)"""
+        fields = {
+            'text_scrape_error': ('STRING', error),
+            'updated_at': ('TIMESTAMP', batch_writer.now()),
+        }
+        fields.update(extra_fields or {})
+        self.update_row(fields, article_id=article_id, url=url, writer=writer)
+
+    def get_full_content(self, article_id):
+        """Full text of an article - from content_store, or the table for rows saved before it"""
+        hash_column = 'content_hash' if self.ensure_content_columns() else 'CAST(NULL AS STRING) AS content_hash'
+        query = f"""
+        SELECT content, {hash_column}
+        FROM `{self.full_table_id}`
+        WHERE id = @id
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("id", "INT64", int(article_id))]
+        )
+        for row in self.client.query(query, job_config=job_config).result():
+            return content_store.get(article_id, row.content_hash) or row.content
+        return None
+
+    def set_duplicate_clusters(self, clusters):
+        """Store near-duplicate cluster ids, given as {url: cluster_id}"""
+        if not clusters:
+            return 0
+        urls = list(clusters)
+        query = f"""
+        UPDATE `{self.full_table_id}` t
+        SET duplicate_cluster_id = c.cluster_id
+        FROM (
+            SELECT url, @cluster_ids[OFFSET(pos)] AS cluster_id
+            FROM UNNEST(@urls) AS url WITH OFFSET pos
+        ) c
+        WHERE t.url = c.url
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("urls", "STRING", urls),
+                bigquery.ArrayQueryParameter("cluster_ids", "STRING", [clusters[url] for url in urls]),
+            ]
+        )
+        job = self.client.query(query, job_config=job_config)
+        job.result()
+        return job.num_dml_affected_rows or 0
+
+    def get_cluster_content(self, cluster_ids):
+        """Full text already scraped for each near-duplicate cluster, as {cluster_id: content}"""
+        cluster_ids = [cluster_id for cluster_id in set(cluster_ids) if cluster_id]
+        if not cluster_ids:
+            return {}
+        try:
+            hash_column = 'content_hash' if self.ensure_content_columns() else 'CAST(NULL AS STRING) AS content_hash'
+            query = f"""
+            SELECT duplicate_cluster_id, ARRAY_AGG(STRUCT(id, content, {hash_column}) LIMIT 1)[OFFSET(0)] AS article
+            FROM `{self.full_table_id}`
+            WHERE duplicate_cluster_id IN UNNEST(@cluster_ids)
+              AND text_scraped = TRUE AND content IS NOT NULL AND content != ''
+            GROUP BY duplicate_cluster_id
+            """
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[
+                    bigquery.ArrayQueryParameter("cluster_ids", "STRING", cluster_ids),
+                ]
+            )
+            cluster_content = {}
+            for row in self.client.query(query, job_config=job_config).result():
+                article = row.article
+                cluster_content[row.duplicate_cluster_id] = \
+                    content_store.get(article['id'], article['content_hash']) or article['content']
+            return cluster_content
+        except Exception as e:
+            return {}
+
     def light_scrape_article(self, article_id, url):
         """Light scrape an article and update its content"""
         try:
             from web_scraper import scrape_light
-            from datetime import datetime
             
             data = scrape_light(url)
-            
-            if data and data.get('content'):
-                update_query = """
-                UPDATE `media-455519.mediatracker.mediatracker`
-                SET content = @content,
-                    title = COALESCE(NULLIF(@title, ''), title),
-                    updated_at = CURRENT_TIMESTAMP()
-                WHERE id = @id
-                """
+            return self.save_light_scrape(article_id, data)
                 
-                from google.cloud.bigquery import QueryJobConfig, ScalarQueryParameter
-                job_config = QueryJobConfig(
-                    query_parameters=[
-                        ScalarQueryParameter("content", "STRING", data.get('content', '')),
-                        ScalarQueryParameter("title", "STRING", data.get('title', '')),
-                        ScalarQueryParameter("id", "INT64", int(article_id))
-                    ]
-                )
-                
-                self.client.query(update_query, job_config=job_config).result()
+        except Exception as e:
+            return False, str(e)
+    
+    def save_light_scrape(self, article_id, data, writer=None):
+        """Save the result of scrape_light for an article (used by batch light scraping)"""
+        try:
+            if data and data.get('content'):
+                fields = {
+                    'content': ('STRING', data.get('content', '')),
+                    'title': ('STRING', data.get('title', '')),
+                    'updated_at': ('TIMESTAMP', batch_writer.now()),
+                }
+                self.update_row(fields, article_id=article_id, keep_if_empty=('title',), writer=writer)
                 return True, data.get('content', '')[:50]
             else:
                 return False, "No content extracted"
@@ -1119,8 +1369,13 @@ class BigQueryClient:
         except Exception as e:
             return False, str(e)
     
-    def process_next_url_from_queue(self):
-        """Process one URL from the queue automatically"""
+    def process_next_url_from_queue(self, dispatcher=None):
+        """
+        Process one URL from the queue automatically. Enrichment goes through
+        dispatcher (default: the shared one), which runs it in batches;
+        callers that stop before the queue is empty should flush it.
+        """
+        dispatcher = dispatcher or enrichment_dispatcher.get_dispatcher()
         try:
             queue_table = f"{self.project_id}.{self.dataset_id}.processing_queue"
             
@@ -1136,6 +1391,7 @@ class BigQueryClient:
             results = list(self.client.query(query).result())
             
             if not results:
+                dispatcher.flush()
                 return None  # No pending URLs
             
             url_record = results[0]
@@ -1180,7 +1436,7 @@ class BigQueryClient:
                         'text_scraped': False  # Mark as not scraped yet
                     }
                     
-                    success = self.insert_media_record(record_data)
+                    success = self.insert_media_record(record_data, dispatcher=dispatcher)
                     
                     if success:
                         # Mark as completed in queue
@@ -1235,8 +1491,10 @@ class BigQueryClient:
     def get_urls_needing_text_scraping(self, limit=50):
         """Find entries that need text scraping (text_scraped=FALSE)"""
         try:
+            cluster_column = 'duplicate_cluster_id' if self.ensure_duplicate_cluster_column() \
+                else 'CAST(NULL AS STRING) AS duplicate_cluster_id'
             query = f"""
-            SELECT url, title, domain, publish_date
+            SELECT id, url, title, domain, publish_date, {cluster_column}
             FROM `{self.full_table_id}`
             WHERE text_scraped = FALSE
             ORDER BY updated_at ASC
@@ -1244,7 +1502,8 @@ class BigQueryClient:
             """
             
             results = list(self.client.query(query).result())
-            return [{'url': row.url, 'title': row.title, 'domain': row.domain} for row in results]
+            return [{'id': row.id, 'url': row.url, 'title': row.title, 'domain': row.domain,
+                     'duplicate_cluster_id': row.duplicate_cluster_id} for row in results]
             
         except Exception as e:
             return []
@@ -1263,79 +1522,71 @@ class BigQueryClient:
             
             results = {
                 'success': 0,
+                'reused': 0,
                 'failed': 0,
                 'total': len(urls_to_scrape),
                 'details': []
             }
             
-            for item in urls_to_scrape:
-                url = item['url']
-                
-                try:
-                    # Scrape full text content
-                    data = scrape_article_data_fast(url)
+            # Near-duplicate copies take the full text of an already scraped article in their cluster
+            cluster_content = self.get_cluster_content(item['duplicate_cluster_id'] for item in urls_to_scrape)
+            
+            # Row updates are buffered and applied with one MERGE per batch
+            with batch_writer.BatchWriter(self.client) as writer:
+                for item in urls_to_scrape:
+                    url = item['url']
+                    cluster_id = item.get('duplicate_cluster_id')
                     
-                    if data and data.get('content'):
-                        # Update the record with full text content
-                        update_query = f"""
-                        UPDATE `{self.full_table_id}`
-                        SET content = @content,
-                            text_scraped = TRUE,
-                            text_scraped_at = CURRENT_TIMESTAMP(),
-                            text_scrape_error = NULL,
-                            updated_at = CURRENT_TIMESTAMP()
-                        WHERE url = @url
-                        """
-                        
-                        job_config = bigquery.QueryJobConfig(
-                            query_parameters=[
-                                bigquery.ScalarQueryParameter("content", "STRING", data['content']),
-                                bigquery.ScalarQueryParameter("url", "STRING", url),
-                            ]
-                        )
+                    try:
+                        if cluster_id in cluster_content:
+                            data = {'content': cluster_content[cluster_id]}
+                            status = 'reused'
+                        else:
+                            # Scrape full text content
+                            data = scrape_article_data_fast(url)
+                            status = 'success'
                         
-                        self.client.query(update_query, job_config=job_config).result()
-                        results['success'] += 1
-                        results['details'].append({'url': url, 'status': 'success'})
-                    else:
+                        if data and data.get('content'):
+                            if status == 'success':
+                                match = near_duplicates.add(url, data['content'])
+                                if match:
+                                    cluster_id = match['cluster_id']
+                                if cluster_id:
+                                    cluster_content.setdefault(cluster_id, data['content'])
+                            
+                            # Full text goes to the content store; the row keeps preview, length and hash
+                            extra_fields = {}
+                            if 'duplicate_cluster_id' in self._added_columns:
+                                extra_fields['duplicate_cluster_id'] = ('STRING', cluster_id)
+                            self.save_full_content(data['content'], article_id=item.get('id'), url=url,
+                                                   extra_fields=extra_fields, writer=writer)
+                            results[status] += 1
+                            results['details'].append({'url': url, 'status': status})
+                        else:
+                            # Mark as error
+                            self.save_scrape_error('Content extraction failed', article_id=item.get('id'), url=url,
+                                                   writer=writer)
+                            results['failed'] += 1
+                            results['details'].append({'url': url, 'status': 'failed', 'error': 'No content extracted'})
+                            
+                    except Exception as e:
                         # Mark as error
-                        error_query = f"""
-                        UPDATE `{self.full_table_id}`
-                        SET text_scrape_error = 'Content extraction failed',
-                            updated_at = CURRENT_TIMESTAMP()
-                        WHERE url = @url
-                        """
-                        
-                        job_config = bigquery.QueryJobConfig(
-                            query_parameters=[
-                                bigquery.ScalarQueryParameter("url", "STRING", url),
-                            ]
-                        )
-                        
-                        self.client.query(error_query, job_config=job_config).result()
+                        error_msg = str(e)[:500]
+                        self.save_scrape_error(error_msg, article_id=item.get('id'), url=url, writer=writer)
                         results['failed'] += 1
-                        results['details'].append({'url': url, 'status': 'failed', 'error': 'No content extracted'})
-                        
-                except Exception as e:
-                    # Mark as error
-                    error_msg = str(e)[:500]
-                    error_query = f"""
-                    UPDATE `{self.full_table_id}`
-                    SET text_scrape_error = @error_msg,
-                        updated_at = CURRENT_TIMESTAMP()
-                    WHERE url = @url
-                    """
-                    
-                    job_config = bigquery.QueryJobConfig(
-                        query_parameters=[
-                            bigquery.ScalarQueryParameter("error_msg", "STRING", error_msg),
-                            bigquery.ScalarQueryParameter("url", "STRING", url),
-                        ]
-                    )
-                    
-                    self.client.query(error_query, job_config=job_config).result()
-                    results['failed'] += 1
-                    results['details'].append({'url': url, 'status': 'failed', 'error': error_msg})
+                        results['details'].append({'url': url, 'status': 'failed', 'error': error_msg})
+            
+            # Saves the writer could not apply didn't happen
+            unsaved = set(writer.failed)
+            if unsaved:
+                ids_by_url = {item['url']: item.get('id') for item in urls_to_scrape}
+                for detail in results['details']:
+                    article_id = ids_by_url.get(detail['url'])
+                    key = int(article_id) if article_id is not None else detail['url']
+                    if detail['status'] != 'failed' and key in unsaved:
+                        results[detail['status']] -= 1
+                        results['failed'] += 1
+                        detail.update({'status': 'failed', 'error': 'Row update could not be written'})
             
             return results
             
@@ -1344,24 +1595,14 @@ class BigQueryClient:
     
     def reprocess_single_article(self, url):
         """Trigger reprocessing for a specific URL"""
-        import time
         try:
             st.info(f"Reprocessing article: {url}")
             
-            # Wait for any pending operations
-            time.sleep(5)
-            
-            # Call procedure with the URL parameter
-            query = "CALL `media-455519.mediatracker.process_new_url`(@url)"
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("url", "STRING", url)
-                ]
-            )
-            
+            # Nothing was written, so there is nothing to wait for
             st.info("Executing reprocessing procedure...")
-            job = self.client.query(query, job_config=job_config)
-            job.result()
+            result = enrichment_dispatcher.enrich([url], client=self.client)
+            if result['failed']:
+                raise Exception(result['failed'][url])
 
             st.success(f"Reprocessing completed for: {url}")
             return True
@@ -0,0 +1,202 @@
+"""
+Multi-brand snippet extraction.
+
+build_snippet() looks for one brand at a time, lowercasing every sentence
+and testing each keyword in turn. BrandMatcher compiles every tracked brand
+(Antler, the portcos table and portfolio_companies.json) into a single
+case-insensitive alternation, runs it once over the extracted text and maps
+each hit to its sentence. One pass gives the snippet for every brand
+mentioned in the article, so a URL that several CSV rows attribute to
+different brands only has to be scraped once.
+
+Per-brand snippets use the same window as build_snippet(content, brand):
+sentences mentioning Antler or the brand, one sentence of context either
+side, at most ~5 sentences / 500 characters.
+"""
+
+import bisect
+import json
+import os
+import re
+import threading
+
+ANTLER = 'Antler'
+
+PORTFOLIO_COMPANIES_PATH = os.environ.get(
+    'PORTFOLIO_COMPANIES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'portfolio_companies.json')
+)
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+
+
+def select_snippet(sentences: list, hits) -> str:
+    """
+    Snippet from the sentences at the (ascending) indices in hits, with one
+    sentence of context either side, ending at a sentence boundary. Falls
+    back to the opening sentences when there are no hits.
+    """
+    relevant_sentences = []
+    for i in hits:
+        sentence = sentences[i]
+        # Include the sentence before (context) if available
+        if i > 0 and sentences[i-1] not in relevant_sentences:
+            relevant_sentences.append(sentences[i-1])
+        relevant_sentences.append(sentence)
+        # Include sentence after (context) if available
+        if i + 1 < len(sentences) and len(relevant_sentences) < 5:
+            relevant_sentences.append(sentences[i+1])
+
+        # Limit to ~5 sentences for context
+        if len(relevant_sentences) >= 5:
+            break
+
+    if relevant_sentences:
+        # Join relevant sentences
+        snippet = ' '.join(relevant_sentences)
+        # Limit to ~500 chars max, end at sentence boundary
+        if len(snippet) > 500:
+            # Find last sentence end within 500 chars
+            cut_point = 500
+            for punct in ['. ', '! ', '? ']:
+                last_punct = snippet[:500].rfind(punct)
+                if last_punct > 200:
+                    cut_point = last_punct + 1
+                    break
+            snippet = snippet[:cut_point]
+    else:
+        # Fallback: no keyword found, use first 2-3 sentences
+        snippet = ' '.join(sentences[:3])
+        # End at sentence boundary within 300 chars
+        if len(snippet) > 300:
+            cut_point = 300
+            for punct in ['. ', '! ', '? ']:
+                last_punct = snippet[:300].rfind(punct)
+                if last_punct > 100:
+                    cut_point = last_punct + 1
+                    break
+            snippet = snippet[:cut_point]
+
+    return snippet
+
+
+def split_sentences(content: str):
+    """(sentences, start offset of each sentence) - same split as build_snippet"""
+    sentences = []
+    starts = []
+    position = 0
+    for separator in SENTENCE_SPLIT.finditer(content):
+        sentences.append(content[position:separator.start()])
+        starts.append(position)
+        position = separator.end()
+    sentences.append(content[position:])
+    starts.append(position)
+    return sentences, starts
+
+
+def load_portfolio_companies(path: str = PORTFOLIO_COMPANIES_PATH) -> list:
+    try:
+        with open(path, 'r') as f:
+            return list(json.load(f).get('companies', []))
+    except Exception:
+        return []
+
+
+def tracked_brands(bq_client=None) -> list:
+    """Antler, portfolio_companies.json and (given a BigQueryClient) the portcos table"""
+    brands = [ANTLER] + load_portfolio_companies()
+    if bq_client is not None:
+        brands += bq_client.get_portco_names()
+    return brands
+
+
+class BrandMatcher:
+    """
+    All brands compiled into one regex. Matching is case-insensitive and
+    whole-word (a brand must not be glued to other letters or digits), and
+    longer names win over names they contain.
+    """
+
+    def __init__(self, brands):
+        self.brands = {}
+        for brand in brands:
+            name = (brand or '').strip()
+            if name and name.lower() not in self.brands:
+                self.brands[name.lower()] = name
+        if ANTLER.lower() not in self.brands:
+            self.brands[ANTLER.lower()] = ANTLER
+
+        alternatives = sorted(self.brands, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'(?<!\w)(?:' + '|'.join(re.escape(name) for name in alternatives) + r')(?!\w)',
+            re.IGNORECASE,
+        )
+
+    def __contains__(self, brand) -> bool:
+        return bool(brand) and brand.strip().lower() in self.brands
+
+    def canonical(self, brand: str):
+        """Tracked spelling of brand, or None if it isn't tracked"""
+        return self.brands.get((brand or '').strip().lower())
+
+    def mentions(self, content: str):
+        """({brand: [sentence indices]}, sentences) from one pass over content"""
+        if not content:
+            return {}, []
+        sentences, starts = split_sentences(content)
+        found = {}
+        for match in self.pattern.finditer(content):
+            brand = self.brands[match.group(0).lower()]
+            index = bisect.bisect_right(starts, match.start()) - 1
+            indices = found.setdefault(brand, [])
+            if not indices or indices[-1] != index:
+                indices.append(index)
+        return found, sentences
+
+    def snippets(self, content: str) -> dict:
+        """
+        {brand: snippet} for every tracked brand mentioned in content.
+        Each snippet covers Antler's and that brand's mentions, like
+        build_snippet(content, brand).
+        """
+        return self.scan(content)[1]
+
+    def scan(self, content: str, brand: str = ''):
+        """
+        (snippet for brand, {brand: snippet}) from one pass over content.
+        The first is build_snippet(content, brand) for a tracked brand (or
+        Antler when brand is empty), including the opening-sentences
+        fallback when nothing is mentioned.
+        """
+        found, sentences = self.mentions(content)
+        antler_hits = found.get(ANTLER, [])
+        result = {}
+        for name, hits in found.items():
+            if name != ANTLER:
+                hits = sorted(set(hits) | set(antler_hits))
+            result[name] = select_snippet(sentences, hits)
+        name = self.canonical(brand) if brand else ANTLER
+        if name in result:
+            snippet = result[name]
+        else:
+            snippet = select_snippet(sentences, antler_hits) if sentences else ''
+        return snippet, result
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher() -> BrandMatcher:
+    """Process-wide matcher over Antler and portfolio_companies.json (no BigQuery call)"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                _matcher = BrandMatcher(tracked_brands())
+    return _matcher
+
+
+def build_matcher(bq_client) -> BrandMatcher:
+    """Matcher that also covers every company in the portcos table"""
+    return BrandMatcher(tracked_brands(bq_client))
@@ -0,0 +1,218 @@
+"""
+Long-lived headless browser for pages that need a real browser (WSJ, the
+render tier).
+
+Starting Chromium and logging in costs several seconds, so BrowserPool
+starts one browser on first use and keeps it for the whole process:
+
+- Async Playwright runs on its own background event loop thread; sync
+  callers (Streamlit, batch scripts, thread pools) submit coroutines with
+  run() and block on the result.
+- Each named profile (e.g. 'wsj') gets one browser context. A context's
+  cookies are shared by all its pages, so one login serves every page.
+- Login state is saved with storage_state() under .cache/browser_state/
+  and loaded into the context on the next process start.
+- At most BROWSER_MAX_PAGES pages are open at once across all profiles.
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+from contextlib import asynccontextmanager
+
+from http_cache import CACHE_DIR
+
+try:
+    from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+    HAS_PLAYWRIGHT = True
+except ImportError:
+    HAS_PLAYWRIGHT = False
+    async_playwright = None
+    PlaywrightTimeout = TimeoutError
+
+STATE_DIR = os.path.join(CACHE_DIR, 'browser_state')
+
+# Pages rendering at once (all profiles together)
+MAX_PAGES = int(os.environ.get('BROWSER_MAX_PAGES', '4'))
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+VIEWPORT = {'width': 1920, 'height': 1080}
+
+
+class BrowserPool:
+    """
+    One Chromium with one context per profile. Coroutines that use it must
+    run on the pool's loop - submit them with run().
+    """
+
+    def __init__(self, max_pages: int = MAX_PAGES, headless: bool = True):
+        if not HAS_PLAYWRIGHT:
+            raise RuntimeError("playwright is not installed")
+        self.max_pages = max(1, max_pages)
+        self.headless = headless
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='browser-pool', daemon=True)
+        self._thread.start()
+        self._playwright = None
+        self._browser = None
+        self._contexts = {}
+        self._open_pages = {}  # context -> pages open in it
+        self._retired = set()  # contexts reset while pages were open
+        self._start_lock = None
+        self._context_lock = None
+        self._pages = None
+        self._closed = False
+
+    def run(self, coro, timeout: float = None):
+        """Run a coroutine on the pool's loop and return its result (call from any thread but the loop's)"""
+        if self._closed:
+            coro.close()
+            raise RuntimeError("BrowserPool is shut down")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    async def _ensure_browser(self):
+        if self._start_lock is None:
+            # asyncio primitives must be created on the loop that uses them
+            self._start_lock = asyncio.Lock()
+            self._context_lock = asyncio.Lock()
+            self._pages = asyncio.Semaphore(self.max_pages)
+        async with self._start_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._contexts = {}
+        return self._browser
+
+    def state_path(self, profile: str) -> str:
+        return os.path.join(STATE_DIR, f"{profile}.json")
+
+    async def start(self):
+        """Launch the browser now (raises if it can't start)"""
+        await self._ensure_browser()
+
+    async def context(self, profile: str, setup=None, **options):
+        """
+        Browser context for a profile, created on first use with any saved
+        login state. options are passed to new_context and setup (an async
+        fn taking the context, e.g. to install routes) is awaited the first time.
+        """
+        browser = await self._ensure_browser()
+        context = self._contexts.get(profile)
+        if context is not None:
+            return context
+        async with self._context_lock:
+            context = self._contexts.get(profile)
+            if context is None:
+                kwargs = {'user_agent': USER_AGENT, 'viewport': VIEWPORT}
+                kwargs.update(options)
+                path = self.state_path(profile)
+                if os.path.exists(path):
+                    kwargs['storage_state'] = path
+                try:
+                    context = await browser.new_context(**kwargs)
+                except Exception:
+                    # Corrupt or outdated state file - start logged out
+                    kwargs.pop('storage_state', None)
+                    context = await browser.new_context(**kwargs)
+                if setup is not None:
+                    await setup(context)
+                self._contexts[profile] = context
+        return context
+
+    @asynccontextmanager
+    async def page(self, profile: str = 'default', setup=None, **options):
+        """A new page in the profile's context; waits while MAX_PAGES are open"""
+        context = await self.context(profile, setup, **options)
+        async with self._pages:
+            self._open_pages[context] = self._open_pages.get(context, 0) + 1
+            try:
+                page = await context.new_page()
+                try:
+                    yield page
+                finally:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+            finally:
+                self._open_pages[context] -= 1
+                if not self._open_pages[context]:
+                    del self._open_pages[context]
+                    if context in self._retired:
+                        self._retired.discard(context)
+                        await self._close_context(context)
+
+    async def save_state(self, profile: str):
+        """Persist the profile's cookies/local storage for the next process"""
+        context = self._contexts.get(profile)
+        if context is None:
+            return
+        os.makedirs(STATE_DIR, exist_ok=True)
+        await context.storage_state(path=self.state_path(profile))
+
+    async def _close_context(self, context):
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    async def reset_profile(self, profile: str):
+        """
+        Drop a profile's context and saved state (e.g. after a failed login).
+        New pages get a fresh context; pages still open in the old one keep
+        it until they close, then it is closed.
+        """
+        context = self._contexts.pop(profile, None)
+        if context is not None:
+            if self._open_pages.get(context):
+                self._retired.add(context)
+            else:
+                await self._close_context(context)
+        try:
+            os.remove(self.state_path(profile))
+        except OSError:
+            pass
+
+    async def _close(self):
+        for context in list(self._contexts.values()) + list(self._retired):
+            await self._close_context(context)
+        self._contexts = {}
+        self._retired = set()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception:
+                pass
+
+    def shutdown(self):
+        if self._closed:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(30)
+        except Exception:
+            pass
+        self._closed = True
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """Process-wide browser pool, started on first use and closed at interpreter exit"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = BrowserPool()
+                atexit.register(_pool.shutdown)
+    return _pool
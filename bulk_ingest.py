@@ -0,0 +1,63 @@
+"""
+Bulk inserts through load jobs instead of insert_rows_json.
+
+Rows written with insert_rows_json (the streaming API) sit in the streaming
+buffer for up to 90 minutes, and UPDATE / DELETE / MERGE on them fail until
+they leave it. That broke enrichment right after a CSV import, kept
+processing_queue rows from moving to 'processing', and is why several
+scripts wait or skip recently inserted rows. load_rows() sends the rows as
+newline-delimited JSON in a load job instead. Once the job finishes the rows
+are in the table like any other and can be modified straight away. Load
+jobs are also free, where streaming inserts are billed.
+
+A load job is all-or-nothing: either every row in a chunk lands or none
+does. Chunks are BULK_INGEST_CHUNK_ROWS rows (BigQuery allows 1,500 load
+jobs per table per day, so keep them large).
+"""
+
+import os
+from datetime import date, datetime
+
+from google.cloud import bigquery
+
+CHUNK_ROWS = int(os.environ.get('BULK_INGEST_CHUNK_ROWS', '50000'))
+
+
+def _json_row(row: dict) -> dict:
+    return {key: value.isoformat() if isinstance(value, (datetime, date)) else value
+            for key, value in row.items()}
+
+
+def load_rows(rows, table_id, client=None, chunk_rows: int = CHUNK_ROWS) -> list:
+    """
+    Append rows (dicts) to table_id with load jobs and wait for them.
+    Returns a list of error messages - empty when every row was written,
+    like insert_rows_json.
+    """
+    rows = [_json_row(row) for row in rows]
+    if not rows:
+        return []
+    if client is None:
+        from bigquery_client import get_client
+        client = get_client()
+
+    # The table's own schema, so values are typed like streamed rows were
+    table = client.get_table(table_id)
+    job_config = bigquery.LoadJobConfig(
+        schema=table.schema,
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+    )
+
+    chunk_rows = max(1, chunk_rows)
+    errors = []
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        job = client.load_table_from_json(chunk, table, job_config=job_config)
+        try:
+            job.result()
+        except Exception as e:
+            details = [error.get('message', str(error)) for error in (job.errors or [])]
+            errors.append(f"Rows {start + 1}-{start + len(chunk)} not loaded: {str(e)[:300]}")
+            errors.extend(details[:10])
+    return errors
@@ -0,0 +1,203 @@
+"""
+Per-domain circuit breaker for the fetch layer.
+
+A publication that is down or throttling us would otherwise cost every
+one of its URLs in a batch a full timeout, plus the render tier and a
+Firecrawl fallback. Each host's breaker counts consecutive failures
+(connection errors, timeouts, 5xx and 429). A plain 403 doesn't count: that
+is a site refusing bare downloads, which routing already sends to Firecrawl.
+
+- closed: requests go through; CIRCUIT_FAILURES failures in a row open it
+- open: for CIRCUIT_COOLDOWN seconds requests fail at once with
+  CircuitOpenError, and web_scraper defers the domain's URLs before trying
+  any strategy (no render, no Firecrawl). record_deferral() notes each
+  deferred URL with the reason
+- half-open: after the cooldown one request is let through as a probe;
+  success closes the breaker, failure opens it for another cooldown
+
+State is per process (one run). report() / print_report() list the
+domains that tripped and the URLs deferred because of them.
+CIRCUIT_BREAKER=off disables it.
+"""
+
+import os
+import threading
+import time
+
+import requests
+
+from rate_limiter import host_of
+
+ENABLED = os.environ.get('CIRCUIT_BREAKER', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Consecutive failures that open a domain's breaker
+FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURES', '5'))
+
+# Seconds a breaker stays open before a probe is allowed
+COOLDOWN = float(os.environ.get('CIRCUIT_COOLDOWN', '120'))
+
+# Responses that mean the site is down or refusing us (404 etc. are about the page, not the site)
+FAILURE_STATUSES = (429,)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.RequestException):
+    """The domain's breaker is open - the URL was deferred without a request"""
+
+
+class _Breaker:
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.last_reason = None
+        self.trips = 0
+        self.deferred = []
+
+
+class CircuitBreakers:
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, host: str) -> _Breaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = _Breaker()
+        return breaker
+
+    def _reason(self, host: str, breaker: _Breaker) -> str:
+        return f"circuit open for {host} after {breaker.failures} failures ({breaker.last_reason})"
+
+    def deferral_reason(self, url: str, claim_probe: bool = False):
+        """
+        Why url must be deferred right now, or None if a request may go out.
+        With claim_probe, a breaker past its cooldown lets this caller be the
+        half-open probe; without it, the check has no side effects.
+        """
+        host = host_of(url)
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None or breaker.state == CLOSED:
+                return None
+            if breaker.state == OPEN and time.monotonic() - breaker.opened_at >= self.cooldown:
+                breaker.state = HALF_OPEN
+            if breaker.state == HALF_OPEN and not breaker.probing:
+                # Cooldown over and nobody probing yet - this request may go out
+                if claim_probe:
+                    breaker.probing = True
+                return None
+            return self._reason(host, breaker)
+
+    def record_deferral(self, url: str, reason: str):
+        """url was deferred (not scraped) because its domain's breaker is open"""
+        with self._lock:
+            self._breaker(host_of(url)).deferred.append((url, reason))
+
+    def before_request(self, url: str):
+        """Raise CircuitOpenError if url's domain is open (or already being probed)"""
+        reason = self.deferral_reason(url, claim_probe=True)
+        if reason:
+            raise CircuitOpenError(reason)
+
+    def record_success(self, url: str):
+        with self._lock:
+            breaker = self._breakers.get(host_of(url))
+            if breaker is None:
+                return
+            breaker.failures = 0
+            breaker.probing = False
+            breaker.state = CLOSED
+
+    def release(self, url: str):
+        """End a request that says nothing about the site (e.g. a bad URL) without a verdict"""
+        with self._lock:
+            breaker = self._breakers.get(host_of(url))
+            if breaker is not None:
+                breaker.probing = False
+
+    def record_failure(self, url: str, reason: str):
+        host = host_of(url)
+        with self._lock:
+            breaker = self._breaker(host)
+            breaker.failures += 1
+            breaker.last_reason = reason
+            if breaker.state == HALF_OPEN or breaker.failures >= self.threshold:
+                if breaker.state != OPEN:
+                    breaker.trips += 1
+                breaker.state = OPEN
+                breaker.opened_at = time.monotonic()
+            breaker.probing = False
+
+    def report(self) -> list:
+        """Domains whose breaker tripped this run, most deferrals first"""
+        now = time.monotonic()
+        with self._lock:
+            rows = [{
+                'domain': host,
+                'state': breaker.state,
+                'trips': breaker.trips,
+                'consecutive_failures': breaker.failures,
+                'last_reason': breaker.last_reason,
+                'deferred': len(breaker.deferred),
+                'deferred_urls': [url for url, _ in breaker.deferred],
+                'reopens_in': round(max(0.0, self.cooldown - (now - breaker.opened_at)), 1) if breaker.state == OPEN else 0,
+            } for host, breaker in self._breakers.items() if breaker.trips]
+        return sorted(rows, key=lambda row: -row['deferred'])
+
+    def reset(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+_breakers = CircuitBreakers()
+
+
+def deferral_reason(url: str):
+    """Reason url would be deferred right now, or None"""
+    return _breakers.deferral_reason(url) if ENABLED else None
+
+
+def record_deferral(url: str, reason: str):
+    if ENABLED:
+        _breakers.record_deferral(url, reason)
+
+
+def before_request(url: str):
+    if ENABLED:
+        _breakers.before_request(url)
+
+
+def record_success(url: str):
+    if ENABLED:
+        _breakers.record_success(url)
+
+
+def release(url: str):
+    if ENABLED:
+        _breakers.release(url)
+
+
+def record_failure(url: str, reason: str):
+    if ENABLED:
+        _breakers.record_failure(url, reason)
+
+
+def report() -> list:
+    return _breakers.report()
+
+
+def print_report():
+    rows = report()
+    if not rows:
+        return
+    print(f"\nTripped domains ({len(rows)}):")
+    for row in rows:
+        print(f"  {row['domain']}: {row['state']}, tripped {row['trips']}x, "
+              f"{row['deferred']} URLs deferred - last error: {row['last_reason']}")
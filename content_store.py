@@ -0,0 +1,255 @@
+"""
+Compressed blob store for full article text.
+
+The mediatracker table used to hold up to 1,000,000 characters of content
+per row, and almost every query (unscraped detection, browse, search,
+completeness) touches that column. Full text now lives here instead,
+compressed with zstd (zlib if the zstandard package is missing) and keyed
+by article id and content hash:
+
+    <article id>/<sha256 of the text>.zst
+
+The row keeps a preview in `content`, plus `content_length` and
+`content_hash`. The preview is the opening CONTENT_PREVIEW_CHARS characters
+and then every later sentence that mentions a tracked brand (see
+brand_snippets). Tagging in the enrichment procedure therefore still sees
+those mentions.
+
+Backends, chosen by CONTENT_STORE_URL:
+- gs://bucket/prefix - Google Cloud Storage (needs google-cloud-storage)
+- a directory - local filesystem, for dev and tests
+
+The store is off unless CONTENT_STORE_URL is set. Until then rows keep
+their full text in the table, because a preview is only safe once the full
+text is somewhere every deployment can read it.
+
+python content_store.py --migrate   moves existing long rows into the store
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import zlib
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+    zstandard = None
+
+try:
+    from google.cloud import storage
+    HAS_GCS = True
+except ImportError:
+    HAS_GCS = False
+    storage = None
+
+CONTENT_STORE_URL = os.environ.get('CONTENT_STORE_URL', '')
+
+# Previews replace the table's full text only when a store is configured
+ENABLED = bool(CONTENT_STORE_URL)
+
+# Characters of the opening kept in the table, and of later brand mentions after it
+PREVIEW_CHARS = int(os.environ.get('CONTENT_PREVIEW_CHARS', '2000'))
+MENTION_CHARS = int(os.environ.get('CONTENT_PREVIEW_MENTION_CHARS', '2000'))
+
+ZSTD_LEVEL = 10
+
+# Codecs (file extensions) new blobs can be written with, preferred first
+CODECS = ('zst', 'zz') if HAS_ZSTD else ('zz',)
+
+PREVIEW_GAP = '\n[...]\n'
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def compress(text: str, codec: str = None) -> bytes:
+    codec = codec or CODECS[0]
+    data = text.encode('utf-8')
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return zlib.compress(data, 9)
+
+
+def decompress(blob: bytes, codec: str) -> str:
+    if codec == 'zst':
+        if not HAS_ZSTD:
+            raise RuntimeError("zstandard is not installed - cannot read .zst content")
+        data = zstandard.ZstdDecompressor().decompress(blob)
+    else:
+        data = zlib.decompress(blob)
+    return data.decode('utf-8')
+
+
+def _cut_at_sentence(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    end = max(head.rfind(punct) for punct in ('. ', '! ', '? ', '。', '\n'))
+    return head[:end + 1].rstrip() if end > limit // 2 else head
+
+
+def preview(text: str, limit: int = PREVIEW_CHARS) -> str:
+    """Opening of the text plus later sentences that mention tracked brands"""
+    if not text or len(text) <= limit:
+        return text or ''
+    from brand_snippets import get_matcher
+
+    head = _cut_at_sentence(text, limit)
+    found, sentences = get_matcher().mentions(text[len(head):])
+    hits = sorted({index for indices in found.values() for index in indices})
+    mentions = _cut_at_sentence(' '.join(sentences[i].strip() for i in hits), MENTION_CHARS)
+    return head + PREVIEW_GAP + mentions if mentions else head
+
+
+class LocalContentStore:
+    """Blobs as files under a directory"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def write(self, key: str, blob: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp, path)
+
+    def read(self, key: str):
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+
+class GCSContentStore:
+    """Blobs as objects under gs://bucket/prefix"""
+
+    def __init__(self, url: str):
+        if not HAS_GCS:
+            raise RuntimeError("google-cloud-storage is not installed - cannot use a gs:// content store")
+        bucket, _, prefix = url[len('gs://'):].partition('/')
+        self.bucket = storage.Client().bucket(bucket)
+        self.prefix = prefix.strip('/')
+
+    def _blob(self, key: str):
+        return self.bucket.blob(f"{self.prefix}/{key}" if self.prefix else key)
+
+    def write(self, key: str, blob: bytes):
+        self._blob(key).upload_from_string(blob, content_type='application/octet-stream')
+
+    def read(self, key: str):
+        blob = self._blob(key)
+        return blob.download_as_bytes() if blob.exists() else None
+
+    def exists(self, key: str) -> bool:
+        return self._blob(key).exists()
+
+
+class ContentStore:
+    """Full text by (article id, content hash)"""
+
+    def __init__(self, url: str = CONTENT_STORE_URL):
+        if not url:
+            raise RuntimeError("CONTENT_STORE_URL is not set - no content store configured")
+        self.url = url
+        self.backend = GCSContentStore(url) if url.startswith('gs://') else LocalContentStore(url)
+
+    @staticmethod
+    def _key(article_id, digest: str, codec: str) -> str:
+        return f"{article_id}/{digest}.{codec}"
+
+    def put(self, article_id, text: str) -> dict:
+        """
+        Store the full text and return the row fields that replace it:
+        {'content': preview, 'content_length', 'content_hash'}
+        """
+        text = text or ''
+        digest = content_hash(text)
+        # Same id and hash means same text - nothing to write
+        if not any(self.backend.exists(self._key(article_id, digest, codec)) for codec in CODECS):
+            self.backend.write(self._key(article_id, digest, CODECS[0]), compress(text))
+        return {'content': preview(text), 'content_length': len(text), 'content_hash': digest}
+
+    def get(self, article_id, digest: str):
+        """Full text stored for the article under that hash, or None"""
+        if not digest:
+            return None
+        for codec in ('zst', 'zz'):
+            blob = self.backend.read(self._key(article_id, digest, codec))
+            if blob is not None:
+                return decompress(blob, codec)
+        return None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ContentStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ContentStore()
+    return _store
+
+
+def put(article_id, text: str) -> dict:
+    return get_store().put(article_id, text)
+
+
+def get(article_id, digest: str):
+    return get_store().get(article_id, digest)
+
+
+def migrate(batch_size: int = 200):
+    """Move the full text of rows longer than their preview into the store"""
+    from bigquery_client import BigQueryClient
+
+    if not ENABLED:
+        print("❌ Set CONTENT_STORE_URL (e.g. gs://bucket/content) before migrating - "
+              "rows would otherwise lose their full text")
+        return
+
+    bq_client = BigQueryClient()
+    if not bq_client.ensure_content_columns():
+        print("❌ Could not add content_length / content_hash to the table")
+        return
+
+    moved = 0
+    while True:
+        query = f"""
+        SELECT id, content
+        FROM `{bq_client.full_table_id}`
+        WHERE content_hash IS NULL AND id IS NOT NULL
+          AND LENGTH(content) > {PREVIEW_CHARS + len(PREVIEW_GAP) + MENTION_CHARS}
+        LIMIT {batch_size}
+        """
+        rows = list(bq_client.client.query(query).result())
+        if not rows:
+            break
+        for row in rows:
+            bq_client.save_full_content(row.content, article_id=row.id, mark_scraped=False)
+        moved += len(rows)
+        print(f"Moved {moved} articles to {CONTENT_STORE_URL}")
+    print(f"✅ Migration complete: {moved} articles")
+
+
+if __name__ == '__main__':
+    if '--migrate' in sys.argv:
+        migrate()
+    else:
+        print(__doc__)
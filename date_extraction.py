@@ -0,0 +1,119 @@
+"""
+Publish-date extraction with cheap probes first.
+
+Structured markup states the publish date explicitly and is found with one
+precompiled regex scan, so it is tried before anything expensive:
+
+  1. JSON-LD "datePublished"
+  2. publish-date meta tags (article:published_time, og:published_time,
+     itemprop=datePublished, pubdate, date, ...) in either attribute order
+  3. <time datetime="...">
+
+Values are parsed with a fast ISO-8601 path (a YYYY-MM-DD prefix, then
+datetime.fromisoformat) and only fall back to dateutil for free-form
+strings. trafilatura/htmldate's whole-page date search runs last, only
+when none of the probes matched.
+"""
+
+import re
+from datetime import date, datetime
+
+import dateutil.parser
+
+JSON_LD_PATTERN = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+
+_META_NAMES = (
+    r'article:published_time|og:published_time|datePublished|pubdate|publishdate|'
+    r'publish-date|publish_date|date|dc\.date|dc\.date\.issued|dcterms\.created|'
+    r'parsely-pub-date|sailthru\.date'
+)
+META_PATTERNS = [
+    # name/property/itemprop before content
+    re.compile(
+        r'<meta[^>]*?\b(?:property|name|itemprop)=["\'](?:' + _META_NAMES + r')["\'][^>]*?\bcontent=["\']([^"\'>]+)["\']',
+        re.IGNORECASE,
+    ),
+    # content before name/property/itemprop
+    re.compile(
+        r'<meta[^>]*?\bcontent=["\']([^"\'>]+)["\'][^>]*?\b(?:property|name|itemprop)=["\'](?:' + _META_NAMES + r')["\']',
+        re.IGNORECASE,
+    ),
+]
+
+TIME_PATTERN = re.compile(r'<time[^>]*?\bdatetime=["\']([^"\'>]+)["\']', re.IGNORECASE)
+
+ISO_DATE_PREFIX = re.compile(r'\s*(\d{4})-(\d{2})-(\d{2})')
+
+# Dates outside this range are parsing accidents, not publish dates
+MIN_YEAR = 1995
+
+
+def parse_date(value: str):
+    """Normalize a date string to YYYY-MM-DD, or None if it isn't a plausible date"""
+    if not value:
+        return None
+
+    # Fast path: ISO-8601 with a plain date prefix (the vast majority of markup)
+    match = ISO_DATE_PREFIX.match(value)
+    if match:
+        try:
+            parsed = date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            parsed = None
+    else:
+        try:
+            parsed = datetime.fromisoformat(value.strip()).date()
+        except ValueError:
+            try:
+                parsed = dateutil.parser.parse(value).date()
+            except (ValueError, OverflowError, TypeError):
+                parsed = None
+
+    if parsed is None or not (MIN_YEAR <= parsed.year <= datetime.now().year + 1):
+        return None
+    return parsed.strftime('%Y-%m-%d')
+
+
+def _probe(pattern: re.Pattern, html: str):
+    """First match of pattern whose value parses as a date"""
+    for match in pattern.finditer(html):
+        parsed = parse_date(match.group(1))
+        if parsed:
+            return parsed
+    return None
+
+
+def find_publish_date_with_source(html: str, fallback=None):
+    """
+    (YYYY-MM-DD, probe name) for the first probe that finds a date, or
+    (None, None). fallback is an optional callable returning a raw date
+    string (e.g. trafilatura metadata) used only when every probe misses.
+    """
+    if html:
+        parsed = _probe(JSON_LD_PATTERN, html)
+        if parsed:
+            return parsed, 'json_ld'
+
+        for pattern in META_PATTERNS:
+            parsed = _probe(pattern, html)
+            if parsed:
+                return parsed, 'meta'
+
+        parsed = _probe(TIME_PATTERN, html)
+        if parsed:
+            return parsed, 'time'
+
+    if fallback is not None:
+        try:
+            parsed = parse_date(fallback())
+        except Exception:
+            parsed = None
+        if parsed:
+            return parsed, 'fallback'
+
+    return None, None
+
+
+def find_publish_date(html: str, fallback=None):
+    """Publish date as YYYY-MM-DD, or None (see find_publish_date_with_source)"""
+    return find_publish_date_with_source(html, fallback)[0]
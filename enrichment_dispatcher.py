@@ -0,0 +1,182 @@
+"""
+Post-insert enrichment without fixed sleeps.
+
+insert_media_record used to sleep 15 seconds before calling the
+process_new_url procedure. That was a wait for the streaming buffer, but the
+row is written by a DML INSERT, which is visible as soon as its job is done.
+Every URL from the processing queue paid the 15 seconds, so the queue moved
+at four URLs a minute whatever the scraper could do.
+
+EnrichmentDispatcher records the URLs that need enrichment, together with
+the job that wrote each one. flush() polls those jobs' state until they are
+DONE (at most ENRICH_WRITE_TIMEOUT seconds). It drops any URL whose write
+failed, then runs process_new_url for the rest, ENRICH_BATCH_SIZE CALLs to
+a script (one job per batch instead of one per URL). Each CALL has its own
+exception handler, so one bad row doesn't stop the rest of its script and
+no URL is enriched twice; the script returns the URLs that failed.
+
+The processing queue shares one dispatcher (get_dispatcher()). It flushes
+when ENRICH_BATCH_SIZE URLs are pending and when the queue runs dry.
+Callers that stop early flush it themselves.
+"""
+
+import os
+import threading
+import time
+
+from google.cloud import bigquery
+
+PROCEDURE = "media-455519.mediatracker.process_new_url"
+
+# URLs enriched per script job
+BATCH_SIZE = int(os.environ.get('ENRICH_BATCH_SIZE', '25'))
+
+# Longest wait for a write job to finish before its URLs are dropped
+WRITE_TIMEOUT = float(os.environ.get('ENRICH_WRITE_TIMEOUT', '300'))
+
+# Job polling backoff: first interval, doubling up to the cap
+POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 5.0
+
+
+def wait_for_jobs(jobs, timeout: float = WRITE_TIMEOUT) -> list:
+    """
+    Poll BigQuery jobs until all are DONE. Returns the jobs that failed or
+    didn't finish within timeout; jobs that are None count as done.
+    """
+    pending = [job for job in jobs if job is not None]
+    deadline = time.monotonic() + timeout
+    interval = POLL_INTERVAL
+    failed = []
+    while pending:
+        still_running = []
+        for job in pending:
+            try:
+                done = job.done()
+            except Exception:
+                # done() reloads the job; a failed reload means a failed job
+                failed.append(job)
+                continue
+            if not done:
+                still_running.append(job)
+            elif job.error_result:
+                failed.append(job)
+        pending = still_running
+        if pending:
+            if time.monotonic() >= deadline:
+                return failed + pending
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL)
+    return failed
+
+
+class EnrichmentDispatcher:
+    """Runs process_new_url for inserted URLs once their writes are done"""
+
+    def __init__(self, client=None, batch_size: int = BATCH_SIZE, auto_flush: bool = True):
+        self._client = client
+        self.batch_size = max(1, batch_size)
+        self.auto_flush = auto_flush
+        self._pending = []  # (url, write job or None)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            from bigquery_client import get_client
+            self._client = get_client()
+        return self._client
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, url: str, job=None):
+        """Queue a URL for enrichment once job (the write that stored it) is done"""
+        if not url:
+            return
+        with self._lock:
+            self._pending.append((url, job))
+            full = self.auto_flush and len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self, timeout: float = WRITE_TIMEOUT) -> dict:
+        """
+        Enrich everything pending. Returns {'enriched': [...], 'failed':
+        {url: error}}, where failed includes URLs whose write never finished.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            result = {'enriched': [], 'failed': {}}
+            if not pending:
+                return result
+
+            failed_jobs = wait_for_jobs([job for _, job in pending], timeout=timeout)
+            failed_ids = {id(job) for job in failed_jobs}
+            urls = []
+            for url, job in pending:
+                if job is not None and id(job) in failed_ids:
+                    result['failed'][url] = str(job.error_result or 'write did not finish')[:300]
+                elif url not in urls:
+                    urls.append(url)
+
+            for start in range(0, len(urls), self.batch_size):
+                batch = urls[start:start + self.batch_size]
+                try:
+                    errors = self._call(batch)
+                except Exception as e:
+                    # The script job itself failed (not one of its CALLs) - don't re-run CALLs that may have gone through
+                    errors = {url: str(e) for url in batch}
+                for url in batch:
+                    if url in errors:
+                        result['failed'][url] = errors[url][:300]
+                    else:
+                        result['enriched'].append(url)
+            if result['failed']:
+                print(f"⚠️ Enrichment failed for {len(result['failed'])} of {len(pending)} URLs: "
+                      f"{next(iter(result['failed'].values()))[:200]}")
+            return result
+
+    def _call(self, urls) -> dict:
+        """Run process_new_url once per URL in one script; returns {url: error} for the CALLs that failed"""
+        calls = '\n'.join(f"""
+BEGIN
+  CALL `{PROCEDURE}`(@url_{i});
+EXCEPTION WHEN ERROR THEN
+  SET failed = ARRAY_CONCAT(failed, [STRUCT({i} AS position, @@error.message AS error)]);
+END;""" for i in range(len(urls)))
+        script = f"""
+DECLARE failed ARRAY<STRUCT<position INT64, error STRING>> DEFAULT [];
+{calls}
+SELECT position, error FROM UNNEST(failed);
+"""
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter(f"url_{i}", "STRING", url)
+                              for i, url in enumerate(urls)]
+        )
+        rows = self.client.query(script, job_config=job_config).result()
+        return {urls[row.position]: row.error or 'process_new_url failed' for row in rows}
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> EnrichmentDispatcher:
+    """The dispatcher shared by the processing queue"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = EnrichmentDispatcher()
+    return _dispatcher
+
+
+def enrich(urls, job=None, client=None) -> dict:
+    """Enrich urls now, once job (the write that stored them) is done - see EnrichmentDispatcher.flush"""
+    dispatcher = EnrichmentDispatcher(client, auto_flush=False)
+    for url in urls:
+        dispatcher.add(url, job)
+    return dispatcher.flush()
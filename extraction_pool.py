@@ -0,0 +1,212 @@
+"""
+Out-of-process extraction stage.
+
+trafilatura/lxml extraction is CPU-bound and, run on the scraping threads,
+is limited to one core and can be stalled by a single huge or malformed
+page. ExtractionPool keeps a set of worker processes that import
+trafilatura and lxml once at startup. Each document goes in as raw bytes
+and comes back as a plain dict (title, content, publish_date, error).
+
+Every document has a hard time budget (EXTRACTION_TIMEOUT seconds). A
+worker that overruns it is killed and replaced, and the URL is recorded
+as an extraction timeout instead of holding up the rest of the batch.
+"""
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Worker processes (defaults to one per core)
+DEFAULT_WORKERS = int(os.environ.get('EXTRACTION_WORKERS', str(os.cpu_count() or 2)))
+
+# Hard per-document time budget in seconds
+EXTRACTION_TIMEOUT = float(os.environ.get('EXTRACTION_TIMEOUT', '20'))
+
+# Seconds a fresh worker may take to import trafilatura before we give up on it
+WORKER_STARTUP_TIMEOUT = 60
+
+ERROR_TIMEOUT = 'extraction_timeout'
+ERROR_FAILED = 'extraction_failed'
+
+_WARMUP_HTML = b'<html><head><title>warmup</title></head><body><article><p>warmup text</p></article></body></html>'
+
+
+def _worker_main(conn):
+    """Worker loop: preload the parsers once, then extract documents until told to stop"""
+    import lxml.html  # noqa: F401 - preload
+    import trafilatura  # noqa: F401 - preload
+    from web_scraper import ParsedPage
+
+    # Touch every code path once so the first real document doesn't pay for lazy imports
+    warmup = ParsedPage(_WARMUP_HTML, 'https://example.com/warmup')
+    warmup.content, warmup.title, warmup.publish_date
+    conn.send('ready')
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+
+        html, url, encoding = message
+        try:
+            page = ParsedPage(html, url, encoding)
+            result = {
+                'title': page.title,
+                'content': page.content,
+                'publish_date': page.publish_date,
+                'error': None,
+            }
+        except Exception as e:
+            result = {'error': f"{ERROR_FAILED}: {str(e)[:200]}"}
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.ready = False
+
+
+class ExtractionPool:
+    """
+    Fixed-size pool of extraction processes.
+    extract() is thread-safe and blocks until a worker is free.
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, timeout: float = EXTRACTION_TIMEOUT):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        # spawn, not fork: forking a Streamlit process with live threads is unsafe
+        self._ctx = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.completed = 0
+        self.timeouts = []
+        self.failures = []
+        for _ in range(self.workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def _kill(self, worker: _Worker):
+        try:
+            worker.process.kill()
+            worker.process.join(timeout=5)
+        except Exception:
+            pass
+        try:
+            worker.conn.close()
+        except Exception:
+            pass
+
+    def _wait_ready(self, worker: _Worker) -> bool:
+        if worker.ready:
+            return True
+        if worker.conn.poll(WORKER_STARTUP_TIMEOUT) and worker.conn.recv() == 'ready':
+            worker.ready = True
+        return worker.ready
+
+    def extract(self, html: bytes, url: str = "", encoding: str = None) -> dict:
+        """
+        Extract title, content and publish_date from raw page bytes
+        (encoding is the server-declared charset, if any).
+        On failure the dict has content None and error set to
+        'extraction_timeout' or 'extraction_failed: ...'.
+        """
+        if self._closed:
+            raise RuntimeError("ExtractionPool is shut down")
+
+        worker = self._idle.get()
+        try:
+            if not self._wait_ready(worker):
+                raise EOFError("worker did not start")
+
+            worker.conn.send((html, url, encoding))
+            if worker.conn.poll(self.timeout):
+                result = worker.conn.recv()
+            else:
+                # Over budget - kill it rather than wait; the replacement starts warming up now
+                self._kill(worker)
+                worker = self._spawn()
+                with self._lock:
+                    self.timeouts.append(url)
+                result = {'error': ERROR_TIMEOUT}
+        except (EOFError, OSError):
+            # Worker crashed (e.g. lxml segfault or OOM kill) - replace it
+            self._kill(worker)
+            worker = self._spawn()
+            result = {'error': ERROR_FAILED}
+        finally:
+            self._idle.put(worker)
+
+        with self._lock:
+            self.completed += 1
+            if result.get('error') and result['error'] != ERROR_TIMEOUT:
+                self.failures.append(url)
+
+        result.setdefault('title', '')
+        result.setdefault('content', None)
+        result.setdefault('publish_date', None)
+        return result
+
+    def extract_many(self, documents) -> list:
+        """Extract a list of (html_bytes, url[, encoding]) tuples on all workers, results in input order"""
+        documents = list(documents)
+        if not documents:
+            return []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(lambda doc: self.extract(*doc), documents))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'completed': self.completed,
+                'timeouts': len(self.timeouts),
+                'failures': len(self.failures),
+            }
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.conn.send(None)
+                worker.process.join(timeout=2)
+            except Exception:
+                pass
+            if worker.process.is_alive():
+                self._kill(worker)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int = DEFAULT_WORKERS) -> ExtractionPool:
+    """Process-wide pool, started on first use and stopped at interpreter exit"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ExtractionPool(workers=workers)
+                atexit.register(_pool.shutdown)
+    return _pool
@@ -6,6 +6,7 @@ Checks all URLs against database in one query instead of one-by-one
 
 import sys
 from bigquery_client import BigQueryClient
+from bulk_ingest import load_rows
 from datetime import datetime
 import uuid
 
@@ -63,7 +64,7 @@ def main():
         bq_client.client.create_table(temp_table_obj, exists_ok=True)
         
         rows = [{"url": url} for url in filtered_urls]
-        bq_client.client.insert_rows_json(temp_table, rows)
+        load_rows(rows, temp_table, client=bq_client.client)
         
         # Check against main table and queue in ONE query
         check_query = f"""
@@ -127,9 +128,8 @@ def main():
         """
         bq_client.client.query(create_queue).result()
         
-        # Insert to queue
-        table = bq_client.client.get_table(queue_table)
-        errors = bq_client.client.insert_rows_json(table, queue_rows)
+        # Load into the queue (not streamed, so the queue processor can update the rows right away)
+        errors = load_rows(queue_rows, queue_table, client=bq_client.client)
         
         if not errors:
             print(f"✅ SUCCESS!")
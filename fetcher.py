@@ -0,0 +1,344 @@
+"""
+Shared HTTP transport for all scraping paths.
+
+Every fetch goes through one pooled requests.Session per process so that
+keep-alive connections and TLS sessions are reused across URLs. Headers,
+timeouts, retries and pool sizes are configured here and nowhere else.
+Successful pages are kept in the on-disk http_cache, so re-running a batch
+script over URLs fetched earlier doesn't download them again.
+
+Bodies are streamed: anything that isn't HTML is rejected from the headers
+alone, and reading stops at FETCH_MAX_BYTES, so memory per in-flight
+request stays bounded no matter what a URL points at.
+
+Every network request waits for its host's turn in rate_limiter, and its
+status is fed back so the per-host pace adapts to 429/503 and Retry-After.
+Hosts that keep failing are cut off for a while by circuit_breaker.
+"""
+
+import os
+import re
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+
+import circuit_breaker
+import http_cache
+import rate_limiter
+from circuit_breaker import CircuitOpenError  # noqa: F401 - re-exported for callers
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+# Default request timeout in seconds (metadata/light paths pass shorter ones)
+DEFAULT_TIMEOUT = 8
+
+# Number of distinct hosts to keep a connection pool for
+POOL_CONNECTIONS = int(os.environ.get('FETCH_POOL_CONNECTIONS', '32'))
+
+# Maximum open connections kept per host
+POOL_MAXSIZE = int(os.environ.get('FETCH_POOL_MAXSIZE', '16'))
+
+# Retries for connection errors and transient gateway errors
+FETCH_RETRIES = int(os.environ.get('FETCH_RETRIES', '2'))
+
+# 429/503 are left to rate_limiter, which slows the host down and honours Retry-After
+RETRY_STATUSES = (502, 504)
+
+# Stop reading a body after this many bytes (the page is kept, truncated)
+MAX_BYTES = int(os.environ.get('FETCH_MAX_BYTES', str(5 * 1024 * 1024)))
+
+CHUNK_SIZE = 64 * 1024
+
+# Content types worth handing to the extractor; a missing header is given the benefit of the doubt
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+
+# Give up looking for </head> after this many bytes and treat what we have as the head
+HEAD_MAX_BYTES = int(os.environ.get('FETCH_HEAD_MAX_BYTES', str(256 * 1024)))
+
+HEAD_END = re.compile(rb'</head\s*>', re.IGNORECASE)
+JSON_LD_BLOCK = re.compile(rb'<script[^>]*application/ld\+json[^>]*>.*?</script\s*>', re.IGNORECASE | re.DOTALL)
+TITLE_END = re.compile(rb'</title\s*>', re.IGNORECASE)
+
+
+class ContentTypeRejected(requests.RequestException):
+    """The server says the URL is not an HTML page (PDF, video, image...)"""
+
+_session = None
+_session_lock = threading.Lock()
+_settings = {
+    'pool_connections': POOL_CONNECTIONS,
+    'pool_maxsize': POOL_MAXSIZE,
+    'retries': FETCH_RETRIES,
+}
+
+
+def _build_session(pool_connections: int, pool_maxsize: int, retries: int) -> requests.Session:
+    """Create a session with pooled adapters, retry policy and default headers"""
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=0,  # a read timeout already cost us the full timeout - don't pay it twice
+        status=retries,
+        backoff_factor=0.3,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+        respect_retry_after_header=False,  # rate_limiter handles Retry-After for the whole host
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Return the process-wide pooled session, creating it on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(**_settings)
+    return _session
+
+
+def configure(pool_connections: int = None, pool_maxsize: int = None, retries: int = None):
+    """
+    Change pool sizes or retry policy. The current session is replaced, so
+    call this before starting a batch rather than in the middle of one.
+    """
+    global _session
+    with _session_lock:
+        if pool_connections is not None:
+            _settings['pool_connections'] = pool_connections
+        if pool_maxsize is not None:
+            _settings['pool_maxsize'] = pool_maxsize
+        if retries is not None:
+            _settings['retries'] = retries
+
+        old_session = _session
+        _session = _build_session(**_settings)
+
+    if old_session is not None:
+        old_session.close()
+
+
+def ensure_pool_maxsize(per_host: int):
+    """Grow the per-host pool if a caller plans to run more concurrent requests per host"""
+    if per_host > _settings['pool_maxsize']:
+        configure(pool_maxsize=per_host)
+
+
+def declared_encoding(response: requests.Response):
+    """
+    Charset the server declared in Content-Type, or None. Unlike
+    response.encoding this does not fall back to ISO-8859-1 for text/*.
+    """
+    content_type = response.headers.get('Content-Type', '')
+    for param in content_type.split(';')[1:]:
+        name, _, value = param.strip().partition('=')
+        if name.lower() == 'charset' and value:
+            return value.strip('"\' ').lower()
+    return None
+
+
+def _check_content_type(response: requests.Response):
+    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type and content_type not in HTML_CONTENT_TYPES:
+        raise ContentTypeRejected(f"Not an HTML page ({content_type})", response=response)
+
+
+def _read_capped(response: requests.Response, max_bytes: int):
+    """Read a streamed body up to max_bytes and make it available as response.content"""
+    chunks = []
+    size = 0
+    truncated = False
+    for chunk in response.iter_content(CHUNK_SIZE):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= max_bytes:
+            truncated = True
+            break
+
+    response._content = b''.join(chunks)[:max_bytes]
+    response._content_consumed = True
+    response.truncated = truncated
+    if truncated:
+        # Drop the rest of the body rather than draining it back into the pool
+        response.close()
+
+
+def _cached_response(url: str, entry: dict) -> requests.Response:
+    """Rebuild a requests.Response from a cache entry"""
+    response = requests.Response()
+    response.status_code = 200
+    # Where the original request was redirected to, so redirect resolution works on cache hits
+    response.url = entry.get('final_url') or entry['url'] or url
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response.encoding = entry['encoding']
+    response._content = entry['body']
+    response._content_consumed = True
+    response.from_cache = True
+    response.truncated = False
+    response.partial = False
+    return response
+
+
+def _get(url: str, timeout: float, headers: dict = None) -> requests.Response:
+    """
+    Streamed GET paced by the host's rate limiter. A 429/503 slows the host
+    down; if it asks us to wait no longer than RATE_LIMIT_MAX_RETRY_WAIT,
+    the request is retried once after the wait. Raises CircuitOpenError
+    without a request while the domain's circuit breaker is open.
+    """
+    circuit_breaker.before_request(url)
+    try:
+        for attempt in range(2):
+            rate_limiter.acquire(url)
+            response = get_session().get(url, timeout=timeout, headers=headers, stream=True)
+            rate_limiter.record(url, response.status_code, response.headers.get('Retry-After'))
+            if (response.status_code not in rate_limiter.THROTTLE_STATUSES or attempt == 1
+                    or rate_limiter.retry_wait(url) > rate_limiter.MAX_RETRY_WAIT):
+                break
+            response.close()
+    except (requests.ConnectionError, requests.Timeout) as e:
+        circuit_breaker.record_failure(url, type(e).__name__)
+        raise
+    except Exception:
+        circuit_breaker.release(url)
+        raise
+
+    if response.status_code >= 500 or response.status_code in circuit_breaker.FAILURE_STATUSES:
+        circuit_breaker.record_failure(url, f"HTTP {response.status_code}")
+    else:
+        circuit_breaker.record_success(url)
+    return response
+
+
+def fetch(url: str, timeout: float = DEFAULT_TIMEOUT, headers: dict = None,
+          refresh: bool = False, max_bytes: int = None) -> requests.Response:
+    """
+    GET an HTML page through the shared session, served from the on-disk cache when possible.
+    refresh=True skips the cache lookup (the fresh response is still stored).
+    The body is streamed and cut off at max_bytes (default FETCH_MAX_BYTES);
+    response.truncated says whether that happened.
+    Raises requests exceptions on network errors and non-2xx responses, and
+    ContentTypeRejected for non-HTML content types.
+    """
+    use_cache = http_cache.ENABLED
+    entry = None
+    if use_cache and not (refresh or http_cache.FORCE_REFRESH):
+        try:
+            entry = http_cache.lookup(url)
+        except Exception:
+            entry = None  # a broken cache must never break scraping
+        if entry and entry['fresh']:
+            return _cached_response(url, entry)
+
+    request_headers = dict(headers or {})
+    if entry:
+        # Stale entry - ask the server whether it changed
+        if entry['etag']:
+            request_headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            request_headers['If-Modified-Since'] = entry['last_modified']
+
+    response = _get(url, timeout, request_headers or None)
+
+    if entry and response.status_code == 304:
+        response.close()
+        http_cache.mark_revalidated(url)
+        return _cached_response(url, entry)
+
+    try:
+        response.raise_for_status()
+        _check_content_type(response)
+        _read_capped(response, max_bytes or MAX_BYTES)
+    except Exception:
+        response.close()
+        raise
+    response.from_cache = False
+    response.partial = False
+
+    if use_cache and response.status_code == 200:
+        try:
+            http_cache.store(url, response.content, response.headers, response.encoding, response.url)
+        except Exception:
+            pass
+    return response
+
+
+def _head_complete(data: bytes, full_head: bool = False) -> int:
+    """
+    Byte offset where the metadata we need is complete, or 0 if it isn't yet:
+    the end of </head>, or (unless full_head) the end of the first JSON-LD
+    block once <title> is closed
+    """
+    head_end = HEAD_END.search(data)
+    if head_end:
+        return head_end.end()
+    if full_head:
+        return 0
+    json_ld = JSON_LD_BLOCK.search(data)
+    if json_ld and TITLE_END.search(data, 0, json_ld.end()):
+        return json_ld.end()
+    return 0
+
+
+def fetch_head(url: str, timeout: float = DEFAULT_TIMEOUT, headers: dict = None,
+               full_head: bool = False) -> requests.Response:
+    """
+    GET only the start of an HTML page: the body is streamed until </head>
+    (or the first JSON-LD block, unless full_head) and the connection is then dropped.
+    response.partial is True when only the head was read; a fresh cached
+    copy of the full page is returned as is.
+    Raises the same exceptions as fetch().
+    """
+    if http_cache.ENABLED and not http_cache.FORCE_REFRESH:
+        try:
+            entry = http_cache.lookup(url)
+        except Exception:
+            entry = None
+        if entry and entry['fresh']:
+            return _cached_response(url, entry)
+
+    response = _get(url, timeout, headers)
+    try:
+        response.raise_for_status()
+        _check_content_type(response)
+
+        data = b''
+        end = 0
+        complete = True
+        for chunk in response.iter_content(8 * 1024):
+            data += chunk
+            end = _head_complete(data, full_head)
+            if end or len(data) >= HEAD_MAX_BYTES:
+                complete = False
+                break
+    finally:
+        response.close()
+
+    response._content = data[:end] if end else data
+    response._content_consumed = True
+    response.from_cache = False
+    response.truncated = not complete
+    # A body that ended before </head> is the whole page, not a partial one
+    response.partial = not complete
+    return response
@@ -0,0 +1,210 @@
+"""
+Shared Firecrawl access for the paywalled-site path.
+
+- One FirecrawlApp per process instead of one per call.
+- Raw results (uncleaned markdown, title, published/modified time) are
+  cached on disk in http_cache, keyed by normalized URL, so a URL is paid
+  for once and cleaning rules can change without re-scraping.
+- Within a run (one scrape_many batch), a URL Firecrawl returned nothing
+  for is not retried and two threads asking for the same URL share one
+  request, so fallback paths can't double-spend credits. Exceptions
+  (timeouts, 5xx) are not remembered, so the next call tries again.
+- scrape_raw_many() sends a list of URLs as one Firecrawl batch job with
+  bounded concurrency.
+
+Point FIRECRAWL_API_URL at a local stand-in server to test without credits.
+"""
+
+import os
+import threading
+
+import http_cache
+
+try:
+    from firecrawl import FirecrawlApp
+    HAS_FIRECRAWL = True
+except ImportError:
+    HAS_FIRECRAWL = False
+    FirecrawlApp = None
+
+FIRECRAWL_API_KEY = os.environ.get('FIRECRAWL_API_KEY', '')
+FIRECRAWL_API_URL = os.environ.get('FIRECRAWL_API_URL', '')
+
+# Pages Firecrawl works on at once for a batch job
+FIRECRAWL_CONCURRENCY = int(os.environ.get('FIRECRAWL_CONCURRENCY', '5'))
+
+# Seconds to wait for a whole batch job before giving up on it
+FIRECRAWL_BATCH_TIMEOUT = int(os.environ.get('FIRECRAWL_BATCH_TIMEOUT', '300'))
+
+CACHE_NAMESPACE = 'firecrawl'
+
+# Most results kept in memory for the run; the oldest are forgotten first
+MAX_ATTEMPTED = int(os.environ.get('FIRECRAWL_MAX_ATTEMPTED', '1000'))
+
+_app = None
+_app_lock = threading.Lock()
+
+# In-run bookkeeping: normalized URL -> raw result (None = failed this run)
+_attempted = {}
+_inflight = {}
+_state_lock = threading.Lock()
+
+
+def is_configured() -> bool:
+    return bool(FIRECRAWL_API_KEY) and HAS_FIRECRAWL
+
+
+def get_app():
+    """Process-wide FirecrawlApp, created on first use"""
+    global _app
+    if _app is None:
+        with _app_lock:
+            if _app is None:
+                kwargs = {'api_key': FIRECRAWL_API_KEY}
+                if FIRECRAWL_API_URL:
+                    kwargs['api_url'] = FIRECRAWL_API_URL
+                _app = FirecrawlApp(**kwargs)
+    return _app
+
+
+def _raw_from_document(document) -> dict:
+    """Keep just the fields we use from a Firecrawl Document"""
+    metadata = document.metadata if hasattr(document, 'metadata') else None
+    raw = {
+        'markdown': (document.markdown if hasattr(document, 'markdown') else '') or '',
+        'title': '',
+        'published_time': None,
+        'modified_time': None,
+    }
+    if metadata:
+        raw['title'] = metadata.title or getattr(metadata, 'og_title', '') or ''
+        raw['published_time'] = getattr(metadata, 'published_time', None) or getattr(metadata, 'publishedTime', None) or getattr(metadata, 'og_published_time', None) or getattr(metadata, 'article:published_time', None)
+        raw['modified_time'] = getattr(metadata, 'modified_time', None) or getattr(metadata, 'modifiedTime', None)
+    return raw
+
+
+def _cached(url: str, refresh: bool):
+    if refresh or not http_cache.ENABLED or http_cache.FORCE_REFRESH:
+        return None
+    try:
+        return http_cache.lookup_document(CACHE_NAMESPACE, url)
+    except Exception:
+        return None
+
+
+def _remember(url: str, raw):
+    """Record a result for this run, and on disk if it has content"""
+    with _state_lock:
+        key = http_cache.normalize_key(url)
+        _attempted.pop(key, None)
+        _attempted[key] = raw
+        while len(_attempted) > MAX_ATTEMPTED:
+            del _attempted[next(iter(_attempted))]
+    if raw and raw['markdown'] and http_cache.ENABLED:
+        try:
+            http_cache.store_document(CACHE_NAMESPACE, url, raw)
+        except Exception:
+            pass
+
+
+def scrape_raw(url: str, refresh: bool = False):
+    """
+    Raw Firecrawl result for one URL, or None.
+    Served from the disk cache when possible; never calls the API twice for
+    the same URL in one run (unless refresh=True).
+    """
+    cached = _cached(url, refresh)
+    if cached:
+        return cached
+
+    key = http_cache.normalize_key(url)
+    with _state_lock:
+        if not refresh and key in _attempted:
+            return _attempted[key]
+        event = _inflight.get(key)
+        owner = event is None
+        if owner:
+            event = _inflight[key] = threading.Event()
+
+    if not owner:
+        # Someone else is already paying for this URL - wait for their result
+        event.wait()
+        with _state_lock:
+            return _attempted.get(key)
+
+    raw = None
+    try:
+        document = get_app().scrape(url, formats=['markdown'])
+        if document:
+            raw = _raw_from_document(document)
+        # Only a completed request counts as an attempt - an exception may be transient
+        _remember(url, raw)
+    finally:
+        with _state_lock:
+            _inflight.pop(key, None)
+        event.set()
+    return raw
+
+
+def scrape_raw_many(urls, refresh: bool = False, concurrency: int = FIRECRAWL_CONCURRENCY) -> dict:
+    """
+    Raw Firecrawl results for many URLs, as {url: raw or None}.
+    Cached and already-attempted URLs are skipped; the rest go out as one
+    batch job with at most `concurrency` pages in flight on Firecrawl's side.
+    """
+    urls = list(urls)
+    found = {}
+    pending = {}
+    for url in urls:
+        key = http_cache.normalize_key(url)
+        if key in found or key in pending:
+            continue
+        cached = _cached(url, refresh)
+        if cached:
+            found[key] = cached
+            continue
+        with _state_lock:
+            if not refresh and key in _attempted:
+                found[key] = _attempted[key]
+                continue
+        pending[key] = url
+
+    if pending:
+        job = get_app().batch_scrape(
+            list(pending.values()),
+            formats=['markdown'],
+            max_concurrency=concurrency,
+            wait_timeout=FIRECRAWL_BATCH_TIMEOUT,
+        )
+
+        for document in (getattr(job, 'data', None) or []):
+            metadata = getattr(document, 'metadata', None)
+            source = None
+            if metadata:
+                source = getattr(metadata, 'source_url', None) or getattr(metadata, 'url', None)
+            key = http_cache.normalize_key(source) if source else None
+            if key in pending and key not in found:
+                found[key] = _raw_from_document(document)
+                _remember(pending[key], found[key])
+
+        # Anything the batch didn't return counts as failed for this run
+        for key, url in pending.items():
+            if key not in found:
+                found[key] = None
+                _remember(url, None)
+
+    return {url: found[http_cache.normalize_key(url)] for url in urls}
+
+
+def is_known(url: str) -> bool:
+    """True if scrape_raw(url) would be answered without calling the API"""
+    with _state_lock:
+        if http_cache.normalize_key(url) in _attempted:
+            return True
+    return _cached(url, False) is not None
+
+
+def reset_run_state():
+    """Forget in-run results; scrape_many calls this at the start of each batch"""
+    with _state_lock:
+        _attempted.clear()
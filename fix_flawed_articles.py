@@ -6,9 +6,9 @@ Fix flawed articles by re-scraping content for articles with:
 - Very short content (<100 chars)
 """
 
-import time
 from bigquery_client import BigQueryClient
-from web_scraper import scrape_article_data_fast
+from scrape_engine import scrape_many
+from batch_writer import BatchWriter, now
 
 def get_flawed_articles(bq_client, limit=100, skip_ids=None):
     """Get articles that need re-scraping"""
@@ -32,33 +32,19 @@ def get_flawed_articles(bq_client, limit=100, skip_ids=None):
     '''
     return list(bq_client.client.query(query).result())
 
-def update_article_content(bq_client, article_id, title, content, domain):
-    """Update article with new scraped content"""
-    from google.cloud import bigquery
-    
-    query = f'''
-    UPDATE `{bq_client.project_id}.{bq_client.dataset_id}.{bq_client.table_id}`
-    SET 
-        title = @title,
-        content = @content,
-        domain = @domain,
-        updated_at = CURRENT_TIMESTAMP()
-    WHERE id = @id
-    '''
-    
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("title", "STRING", title),
-            bigquery.ScalarQueryParameter("content", "STRING", content),
-            bigquery.ScalarQueryParameter("domain", "STRING", domain),
-            bigquery.ScalarQueryParameter("id", "INT64", article_id)
-        ]
-    )
-    
-    bq_client.client.query(query, job_config=job_config).result()
+def update_article_content(bq_client, article_id, title, content, domain, writer=None):
+    """Update article with new scraped content (buffered when a BatchWriter is given)"""
+    fields = {
+        'title': ('STRING', title),
+        'domain': ('STRING', domain),
+        'updated_at': ('TIMESTAMP', now()),
+    }
+    # Through save_full_content so content_hash / content_length match the new text
+    bq_client.save_full_content(content, article_id=article_id, mark_scraped=False,
+                                extra_fields=fields, writer=writer)
     return True
 
-def fix_batch(batch_size=50, delay=0.5, skip_ids=None):
+def fix_batch(batch_size=50, skip_ids=None):
     """Fix a batch of flawed articles"""
     bq_client = BigQueryClient()
     
@@ -76,36 +62,45 @@ def fix_batch(batch_size=50, delay=0.5, skip_ids=None):
     success_count = 0
     fail_count = 0
     failed_ids = set()
+    saved_ids = []
     
-    for i, article in enumerate(articles):
-        article_id = article.id
-        url = article.url
-        
-        try:
-            scraped = scrape_article_data_fast(url)
+    # Scrape the whole batch concurrently - per-domain limits keep it polite
+    scraped_results = scrape_many([article.url for article in articles])
+    
+    # Row updates are applied with one MERGE when the batch is done
+    with BatchWriter(bq_client.client) as writer:
+        for article, scraped in zip(articles, scraped_results):
+            article_id = article.id
             
-            if scraped and scraped.get('content') and len(scraped.get('content', '')) >= 50:
-                update_article_content(
-                    bq_client,
-                    article_id,
-                    scraped.get('title', ''),
-                    scraped.get('content', ''),
-                    scraped.get('domain', '')
-                )
-                success_count += 1
-                print(f"✓ {article_id}")
-            else:
+            try:
+                if scraped and scraped.get('content') and len(scraped.get('content', '')) >= 50:
+                    update_article_content(
+                        bq_client,
+                        article_id,
+                        scraped.get('title', ''),
+                        scraped.get('content', ''),
+                        scraped.get('domain', ''),
+                        writer=writer
+                    )
+                    success_count += 1
+                    saved_ids.append(article_id)
+                    print(f"✓ {article_id}")
+                else:
+                    fail_count += 1
+                    failed_ids.add(article_id)
+                    reason = scraped.get('error') if scraped else None
+                    print(f"✗ {article_id} - {reason or 'no content'}")
+                    
+            except Exception as e:
                 fail_count += 1
                 failed_ids.add(article_id)
-                print(f"✗ {article_id} - no content")
-                
-        except Exception as e:
-            fail_count += 1
-            failed_ids.add(article_id)
-            print(f"✗ {article_id} - {str(e)[:30]}")
-        
-        if delay > 0:
-            time.sleep(delay)
+                print(f"✗ {article_id} - {str(e)[:30]}")
+    
+    # Updates the writer could not apply fixed nothing
+    unsaved = [article_id for article_id in saved_ids if article_id in set(writer.failed)]
+    success_count -= len(unsaved)
+    fail_count += len(unsaved)
+    failed_ids.update(unsaved)
     
     print(f"\n=== Batch Complete ===")
     print(f"Success: {success_count}, Failed: {fail_count}")
@@ -151,7 +146,7 @@ if __name__ == "__main__":
             break
             
         print(f"\n--- Batch {batch_num} ({remaining} remaining, {len(all_failed_ids)} skipped) ---")
-        success, fail, failed_ids = fix_batch(batch_size=50, delay=0.3, skip_ids=all_failed_ids)
+        success, fail, failed_ids = fix_batch(batch_size=50, skip_ids=all_failed_ids)
         
         all_failed_ids.update(failed_ids)
         total_success += success
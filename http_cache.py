@@ -0,0 +1,294 @@
+"""
+Persistent on-disk cache for downloaded pages.
+
+Bodies are stored zlib-compressed in a small SQLite database under
+SCRAPER_CACHE_DIR (default .cache/), keyed by normalized URL. Entries are
+fresh for a per-domain TTL; after that fetcher revalidates them with
+ETag / If-Modified-Since and a 304 costs no body download. The database is
+kept under a size budget by evicting the least recently used entries.
+
+Set HTTP_CACHE=off to disable the cache, or HTTP_CACHE_REFRESH=1 to force
+every fetch in a run to go to the network (responses are still stored).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+CACHE_DIR = os.environ.get('SCRAPER_CACHE_DIR', '.cache')
+CACHE_PATH = os.path.join(CACHE_DIR, 'http_cache.sqlite3')
+
+ENABLED = os.environ.get('HTTP_CACHE', 'on').lower() not in ('0', 'off', 'false', 'no')
+FORCE_REFRESH = os.environ.get('HTTP_CACHE_REFRESH', '').lower() in ('1', 'on', 'true', 'yes')
+
+# Size budget for stored (compressed) bodies
+MAX_BYTES = int(float(os.environ.get('HTTP_CACHE_MAX_MB', '512')) * 1024 * 1024)
+
+# Seconds an entry is served without revalidation
+DEFAULT_TTL = int(os.environ.get('HTTP_CACHE_TTL', str(24 * 3600)))
+
+# Per-domain overrides (seconds). Subdomains match their parent entry.
+# Extra overrides can be given as HTTP_CACHE_DOMAIN_TTLS="example.com=3600,other.com=60"
+DOMAIN_TTLS = {
+    'techinasia.com': 6 * 3600,
+    'sifted.eu': 6 * 3600,
+}
+
+# Query parameters that never change page content
+TRACKING_PARAMS = ('utm_', 'fbclid', 'gclid', 'mc_cid', 'mc_eid')
+
+# Stores between full recounts of the cache size; in between a running total
+# is kept (other processes share the database, so it drifts a little)
+RECOUNT_EVERY = 500
+
+_conn = None
+_lock = threading.Lock()
+_size = None  # running total of stored bytes, None until counted
+_stores_since_recount = 0
+
+
+def _load_domain_ttls():
+    raw = os.environ.get('HTTP_CACHE_DOMAIN_TTLS', '')
+    for item in raw.split(','):
+        if '=' in item:
+            domain, ttl = item.split('=', 1)
+            try:
+                DOMAIN_TTLS[domain.strip().lower()] = int(ttl)
+            except ValueError:
+                pass
+
+
+_load_domain_ttls()
+
+
+def normalize_key(url: str) -> str:
+    """
+    Cache key for a URL: lowercase scheme/host, no www., no fragment,
+    no trailing slash, tracking params dropped and the rest sorted
+    """
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/') or '/'
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(TRACKING_PARAMS)]
+    return urlunsplit((parts.scheme.lower() or 'https', host, path, urlencode(sorted(query)), ''))
+
+
+def domain_of(key: str) -> str:
+    return urlsplit(key).netloc.split(':')[0]
+
+
+def ttl_for(domain: str) -> int:
+    """TTL in seconds for a domain, checking parent domains for an override"""
+    labels = domain.lower().split('.')
+    for i in range(len(labels) - 1):
+        ttl = DOMAIN_TTLS.get('.'.join(labels[i:]))
+        if ttl is not None:
+            return ttl
+    return DEFAULT_TTL
+
+
+def set_domain_ttl(domain: str, seconds: int):
+    DOMAIN_TTLS[domain.lower()] = seconds
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, check_same_thread=False, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                domain TEXT,
+                headers TEXT,
+                encoding TEXT,
+                body BLOB,
+                size INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL,
+                last_access REAL,
+                final_url TEXT
+            )
+        """)
+        try:
+            # Databases created before final_url was stored
+            conn.execute('ALTER TABLE responses ADD COLUMN final_url TEXT')
+        except sqlite3.OperationalError:
+            pass
+        conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+        _conn = conn
+    return _conn
+
+
+def _get(key: str):
+    with _lock:
+        conn = _connection()
+        row = conn.execute(
+            'SELECT url, headers, encoding, body, etag, last_modified, fetched_at, final_url '
+            'FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+        conn.commit()
+    return row
+
+
+def _put(key: str, url: str, domain: str, body: bytes, headers: dict, encoding: str = None,
+         final_url: str = None):
+    compressed = zlib.compress(body or b'', 6)
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        replaced = conn.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+        conn.execute(
+            'INSERT OR REPLACE INTO responses '
+            '(key, url, domain, headers, encoding, body, size, etag, last_modified, fetched_at, last_access, final_url) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, url, domain, json.dumps(headers), encoding, compressed, len(compressed),
+             headers.get('ETag') or headers.get('etag'),
+             headers.get('Last-Modified') or headers.get('last-modified'),
+             now, now, final_url)
+        )
+        conn.commit()
+        _evict(conn, len(compressed) - ((replaced[0] or 0) if replaced else 0))
+
+
+def lookup(url: str):
+    """
+    Return the cached entry for a URL as a dict, or None.
+    entry['fresh'] says whether it is still inside its TTL; entry['final_url']
+    is where the request ended up after redirects.
+    """
+    key = normalize_key(url)
+    row = _get(key)
+    if row is None:
+        return None
+
+    stored_url, headers, encoding, body, etag, last_modified, fetched_at, final_url = row
+    return {
+        'url': stored_url,
+        'final_url': final_url or stored_url,
+        'headers': json.loads(headers or '{}'),
+        'encoding': encoding,
+        'body': zlib.decompress(body),
+        'etag': etag,
+        'last_modified': last_modified,
+        'fetched_at': fetched_at,
+        'fresh': time.time() - fetched_at < ttl_for(domain_of(key)),
+    }
+
+
+def store(url: str, body: bytes, headers: dict = None, encoding: str = None, final_url: str = None):
+    """
+    Store a 200 response body, replacing any earlier entry for the same URL.
+    final_url is the URL the response came from after redirects.
+    """
+    key = normalize_key(url)
+    _put(key, url, domain_of(key), body, dict(headers or {}), encoding, final_url)
+
+
+def lookup_document(namespace: str, url: str, ttl: int = None):
+    """
+    Cached JSON payload stored under namespace for a URL (e.g. raw Firecrawl
+    markdown), or None. Documents never go stale unless a ttl is given.
+    """
+    key = f"{namespace}|{normalize_key(url)}"
+    row = _get(key)
+    if row is None:
+        return None
+    fetched_at = row[6]
+    if ttl is not None and time.time() - fetched_at >= ttl:
+        return None
+    return json.loads(zlib.decompress(row[3]).decode('utf-8'))
+
+
+def store_document(namespace: str, url: str, payload: dict):
+    key = f"{namespace}|{normalize_key(url)}"
+    body = json.dumps(payload).encode('utf-8')
+    _put(key, url, domain_of(normalize_key(url)), body, {})
+
+
+def mark_revalidated(url: str):
+    """A 304 came back - the stored body is good for another TTL"""
+    now = time.time()
+    with _lock:
+        conn = _connection()
+        conn.execute('UPDATE responses SET fetched_at = ?, last_access = ? WHERE key = ?',
+                     (now, now, normalize_key(url)))
+        conn.commit()
+
+
+def _evict(conn: sqlite3.Connection, added: int = 0):
+    """
+    Drop least recently used entries until the cache fits in MAX_BYTES.
+    added is the size change of the store that just happened; the table is
+    only summed on the first call and every RECOUNT_EVERY stores.
+    """
+    global _size, _stores_since_recount
+    _stores_since_recount += 1
+    if _size is None or _stores_since_recount >= RECOUNT_EVERY:
+        _size = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        _stores_since_recount = 0
+    else:
+        _size += added
+    total = _size
+    if total <= MAX_BYTES:
+        return
+    # Trim to 90% so we don't evict again on the very next store
+    target = total - int(MAX_BYTES * 0.9)
+    freed = 0
+    victims = []
+    for key, size in conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+        victims.append((key,))
+        freed += size
+        if freed >= target:
+            break
+    conn.executemany('DELETE FROM responses WHERE key = ?', victims)
+    conn.commit()
+    _size = total - freed
+
+
+def _forget_size():
+    """Recount the cache size on the next store (after deletes)"""
+    global _size
+    _size = None
+
+
+def invalidate(url: str):
+    """Forget a URL, including any documents stored for it"""
+    key = normalize_key(url)
+    with _lock:
+        conn = _connection()
+        conn.execute("DELETE FROM responses WHERE key = ? OR key LIKE ?", (key, '%|' + key))
+        conn.commit()
+        _forget_size()
+
+
+def clear():
+    with _lock:
+        conn = _connection()
+        conn.execute('DELETE FROM responses')
+        conn.commit()
+        conn.execute('VACUUM')
+        _forget_size()
+
+
+def stats() -> dict:
+    """Entry count and stored size, for logging at the end of a batch"""
+    with _lock:
+        count, size = _connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()
+    return {'entries': count, 'bytes': size, 'max_bytes': MAX_BYTES}
@@ -0,0 +1,154 @@
+"""
+Integer ids for mediatracker, media_data and portcos without MAX(id) scans.
+
+Every insert used to run SELECT COALESCE(MAX(id), 0) against the target
+table - a full scan of the id column per row - and two ingesters running at
+once could both get the same id. Ids now come from a sequence table:
+
+    media-455519.mediatracker.id_sequences (table_name, next_id, updated_at)
+
+Each process leases a block of ID_BLOCK_SIZE ids at a time with a single
+transaction (read next_id, advance it by the block) and hands them out
+locally, so a bulk insert makes one query per block instead of one per row.
+Concurrent leases conflict inside BigQuery and the loser retries, so two
+processes never get overlapping blocks.
+
+The first lease for a table seeds its sequence from MAX(id) + 1 - the only
+scan left. Ids not used before a process exits are skipped, so ids are
+unique and increasing per process but not gap-free.
+"""
+
+import os
+import threading
+import time
+
+from google.cloud import bigquery
+
+SEQUENCE_TABLE = "media-455519.mediatracker.id_sequences"
+
+# Tables ids can be allocated for
+TABLES = {
+    'mediatracker': "media-455519.mediatracker.mediatracker",
+    'media_data': "media-455519.mediatracker.media_data",
+    'portcos': "media-455519.mediatracker.portcos",
+}
+
+# Ids leased per round trip
+ID_BLOCK_SIZE = int(os.environ.get('ID_BLOCK_SIZE', '100'))
+
+# Attempts at a lease that keeps losing to concurrent leases
+LEASE_ATTEMPTS = 5
+
+LEASE_SCRIPT = """
+DECLARE lease_start INT64;
+BEGIN TRANSACTION;
+
+INSERT INTO `{sequences}` (table_name, next_id, updated_at)
+SELECT @table_name, (SELECT COALESCE(MAX(id), 0) + 1 FROM `{target}`), CURRENT_TIMESTAMP()
+FROM UNNEST([1])
+WHERE NOT EXISTS (SELECT 1 FROM `{sequences}` WHERE table_name = @table_name);
+
+SET lease_start = (SELECT next_id FROM `{sequences}` WHERE table_name = @table_name);
+
+UPDATE `{sequences}`
+SET next_id = next_id + @count, updated_at = CURRENT_TIMESTAMP()
+WHERE table_name = @table_name;
+
+COMMIT TRANSACTION;
+
+SELECT lease_start AS start;
+"""
+
+
+class IdAllocator:
+    """Hands out ids from blocks leased from the sequence table"""
+
+    def __init__(self, client=None, block_size: int = ID_BLOCK_SIZE):
+        self._client = client
+        self.block_size = max(1, block_size)
+        self._blocks = {}  # table -> [next id, end of block (exclusive)]
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    @property
+    def client(self):
+        if self._client is None:
+            from bigquery_client import get_client
+            self._client = get_client()
+        return self._client
+
+    def _ensure_table(self):
+        if self._table_ready:
+            return
+        self.client.query(f"""
+        CREATE TABLE IF NOT EXISTS `{SEQUENCE_TABLE}` (
+            table_name STRING,
+            next_id INT64,
+            updated_at TIMESTAMP
+        )
+        """).result()
+        self._table_ready = True
+
+    def _lease(self, table: str, count: int) -> int:
+        """Reserve count ids for table and return the first"""
+        self._ensure_table()
+        script = LEASE_SCRIPT.format(sequences=SEQUENCE_TABLE, target=TABLES[table])
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("table_name", "STRING", table),
+                bigquery.ScalarQueryParameter("count", "INT64", count),
+            ]
+        )
+        for attempt in range(LEASE_ATTEMPTS):
+            try:
+                rows = list(self.client.query(script, job_config=job_config).result())
+                return rows[0].start
+            except Exception as e:
+                # Another process committed a lease first - its transaction wins, ours aborts
+                message = str(e).lower()
+                if attempt == LEASE_ATTEMPTS - 1 or ('concurrent' not in message and 'aborted' not in message):
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    def allocate(self, table: str, count: int = 1) -> list:
+        """count unused ids for table, in increasing order"""
+        if table not in TABLES:
+            raise ValueError(f"No id sequence for table '{table}'")
+        ids = []
+        with self._lock:
+            block = self._blocks.get(table)
+            if block:
+                take = min(count, block[1] - block[0])
+                ids.extend(range(block[0], block[0] + take))
+                block[0] += take
+            missing = count - len(ids)
+            if missing:
+                lease = max(missing, self.block_size)
+                start = self._lease(table, lease)
+                ids.extend(range(start, start + missing))
+                self._blocks[table] = [start + missing, start + lease]
+        return ids
+
+    def next_id(self, table: str) -> int:
+        return self.allocate(table, 1)[0]
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator() -> IdAllocator:
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = IdAllocator()
+    return _allocator
+
+
+def next_id(table: str) -> int:
+    return get_allocator().next_id(table)
+
+
+def allocate(table: str, count: int = 1) -> list:
+    return get_allocator().allocate(table, count)
@@ -3,7 +3,7 @@
 
 from bigquery_client import BigQueryClient
 from web_scraper import scrape_light
-import time
+from batch_writer import BatchWriter, now
 import sys
 
 def main():
@@ -33,48 +33,41 @@ def main():
         
         print(f"\n--- Batch {batch_num} ({len(results)} entries) ---", flush=True)
         
-        for row in results:
-            try:
-                data = scrape_light(row.url)
-                
-                if data and (data.get('title') or data.get('content')):
-                    title = (data.get('title') or '').replace('"', "'").replace('\n', ' ')[:500]
-                    content = (data.get('content') or '').replace('"', "'").replace('\n', ' ')[:5000]
-                    domain = data.get('domain', '')
+        saved_ids = []
+        # Row updates are applied with one MERGE when the batch is done, before the next fetch
+        with BatchWriter(bq.client) as writer:
+            for row in results:
+                try:
+                    data = scrape_light(row.url)
                     
-                    update_q = f'''
-                    UPDATE `media-455519.mediatracker.mediatracker`
-                    SET 
-                        title = "{title}",
-                        content = "{content}",
-                        domain = "{domain}",
-                        updated_at = CURRENT_TIMESTAMP()
-                    WHERE id = {row.id}
-                    '''
-                    bq.client.query(update_q).result()
-                    total_success += 1
-                else:
-                    update_q = f'''
-                    UPDATE `media-455519.mediatracker.mediatracker`
-                    SET content = "", updated_at = CURRENT_TIMESTAMP()
-                    WHERE id = {row.id}
-                    '''
-                    bq.client.query(update_q).result()
+                    if data and (data.get('title') or data.get('content')):
+                        fields = {
+                            'title': ('STRING', (data.get('title') or '')[:500]),
+                            'content': ('STRING', (data.get('content') or '')[:5000]),
+                            'domain': ('STRING', data.get('domain', '')),
+                            'updated_at': ('TIMESTAMP', now()),
+                        }
+                        bq.update_row(fields, article_id=row.id, writer=writer)
+                        total_success += 1
+                        saved_ids.append(row.id)
+                    else:
+                        bq.update_row({'content': ('STRING', ''), 'updated_at': ('TIMESTAMP', now())},
+                                      article_id=row.id, writer=writer)
+                        total_failed += 1
+                except Exception as e:
+                    try:
+                        bq.update_row({'content': ('STRING', ''), 'updated_at': ('TIMESTAMP', now())},
+                                      article_id=row.id, writer=writer)
+                    except:
+                        pass
                     total_failed += 1
-            except Exception as e:
-                try:
-                    update_q = f'''
-                    UPDATE `media-455519.mediatracker.mediatracker`
-                    SET content = "", updated_at = CURRENT_TIMESTAMP()
-                    WHERE id = {row.id}
-                    '''
-                    bq.client.query(update_q).result()
-                except:
-                    pass
-                total_failed += 1
+        
+        # Scraped rows whose update could not be written are not saved
+        unsaved = [row_id for row_id in saved_ids if row_id in set(writer.failed)]
+        total_success -= len(unsaved)
+        total_failed += len(unsaved)
         
         print(f"Progress: {total_success} success, {total_failed} failed", flush=True)
-        time.sleep(0.2)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,312 @@
+"""
+Near-duplicate article detection with SimHash fingerprints.
+
+Wizikey feeds carry syndicated press releases (a PR TIMES release shows up
+on mainichi.jp, infoseek and a dozen others) and each copy would otherwise
+be scraped, stored and tagged on its own. Every article's extracted text
+gets a 64-bit SimHash over shingles of NEAR_DUP_SHINGLE tokens (CJK
+characters count as one token each, so Japanese copies fingerprint as well
+as English ones). Copies differ in a few bits at most, so two articles
+within NEAR_DUP_DISTANCE bits are the same story.
+
+- Fingerprints live in an LSH index on disk (.cache/near_duplicates.sqlite3):
+  the 64 bits are split into NEAR_DUP_DISTANCE + 1 bands, and any pair
+  within the distance shares at least one band exactly, so a lookup only
+  compares against articles in matching bands.
+- Each indexed article belongs to a cluster; the first article seen is its
+  canonical, later copies join its cluster. add() returns the cluster id,
+  which is stored on the row (duplicate_cluster_id) for reporting, and lets
+  scrape_text_batch reuse the canonical's full text instead of scraping
+  (and possibly Firecrawling) every copy.
+- Texts shorter than NEAR_DUP_MIN_SHINGLES shingles are not fingerprinted -
+  short snippets collide too easily.
+
+python near_duplicates.py --seed      index text-scraped articles from BigQuery
+python near_duplicates.py --report    print the clusters with copies
+NEAR_DUPLICATES=off disables detection.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from http_cache import CACHE_DIR
+from url_resolver import canonical_key
+
+ENABLED = os.environ.get('NEAR_DUPLICATES', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+INDEX_PATH = os.path.join(CACHE_DIR, 'near_duplicates.sqlite3')
+
+# Differing bits at which two fingerprints still count as the same article
+MAX_DISTANCE = int(os.environ.get('NEAR_DUP_DISTANCE', '3'))
+
+# Tokens per shingle, and the fewest shingles worth fingerprinting
+SHINGLE_SIZE = int(os.environ.get('NEAR_DUP_SHINGLE', '3'))
+MIN_SHINGLES = int(os.environ.get('NEAR_DUP_MIN_SHINGLES', '40'))
+
+BITS = 64
+
+# CJK / kana / hangul characters are tokens on their own (no spaces between words)
+TOKEN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[^\W_]+')
+
+
+def _shingles(text: str) -> Counter:
+    tokens = TOKEN.findall(unicodedata.normalize('NFKC', text or '').lower())
+    if len(tokens) < SHINGLE_SIZE:
+        return Counter()
+    return Counter(' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1))
+
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def fingerprint(text: str):
+    """64-bit SimHash of the text's shingles, or None if the text is too short"""
+    shingles = _shingles(text)
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    hashes = [(_hash64(feature), weight) for feature, weight in shingles.items()]
+    total = sum(weight for _, weight in hashes)
+    value = 0
+    for bit in range(BITS):
+        mask = 1 << bit
+        # Bit is set when the features with it set outweigh the ones without
+        if 2 * sum(weight for h, weight in hashes if h & mask) > total:
+            value |= mask
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+def _band_ranges(bands: int):
+    """(shift, mask) per band, splitting BITS as evenly as possible"""
+    ranges = []
+    start = 0
+    for band in range(bands):
+        width = BITS // bands + (1 if band < BITS % bands else 0)
+        ranges.append((start, (1 << width) - 1))
+        start += width
+    return ranges
+
+
+def _signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << BITS) if value >= 1 << (BITS - 1) else value
+
+
+def _unsigned(value: int) -> int:
+    return value + (1 << BITS) if value < 0 else value
+
+
+def cluster_id_for(key: str) -> str:
+    return 'nd-' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+class NearDuplicateIndex:
+    """SimHash LSH index of articles and the clusters they belong to"""
+
+    def __init__(self, path: str = INDEX_PATH, max_distance: int = MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.bands = _band_ranges(max_distance + 1)
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS articles (
+                    key TEXT PRIMARY KEY,
+                    url TEXT,
+                    simhash INTEGER,
+                    cluster_id TEXT,
+                    added_at REAL
+                )
+            """)
+            conn.execute('CREATE TABLE IF NOT EXISTS bands (band INTEGER, value INTEGER, key TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS bands_lookup ON bands (band, value)')
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS clusters (
+                    cluster_id TEXT PRIMARY KEY,
+                    canonical_url TEXT,
+                    size INTEGER
+                )
+            """)
+            self._conn = conn
+        return self._conn
+
+    def _band_values(self, simhash: int):
+        return [(band, (simhash >> shift) & mask) for band, (shift, mask) in enumerate(self.bands)]
+
+    def _nearest(self, conn, simhash: int, exclude_key: str = None):
+        candidates = {}
+        for band, value in self._band_values(simhash):
+            for key, url, stored, cluster_id in conn.execute(
+                'SELECT a.key, a.url, a.simhash, a.cluster_id FROM bands b JOIN articles a ON a.key = b.key '
+                'WHERE b.band = ? AND b.value = ?', (band, value)
+            ):
+                candidates[key] = (url, _unsigned(stored), cluster_id)
+        best = None
+        for key, (url, stored, cluster_id) in candidates.items():
+            if key == exclude_key:
+                continue
+            distance = hamming(simhash, stored)
+            if distance <= self.max_distance and (best is None or distance < best['distance']):
+                best = {'key': key, 'url': url, 'cluster_id': cluster_id, 'distance': distance}
+        return best
+
+    def _cluster(self, conn, cluster_id: str, own_url: str, distance: int = None) -> dict:
+        row = conn.execute('SELECT canonical_url FROM clusters WHERE cluster_id = ?', (cluster_id,)).fetchone()
+        canonical_url = row[0] if row else own_url
+        return {
+            'cluster_id': cluster_id,
+            'canonical_url': canonical_url,
+            'is_copy': canonical_key(canonical_url) != canonical_key(own_url),
+            'distance': distance,
+        }
+
+    def find(self, text: str = None, simhash: int = None):
+        """Closest indexed article within max_distance, as {'key', 'url', 'cluster_id', 'distance'}, or None"""
+        if simhash is None:
+            simhash = fingerprint(text)
+        if simhash is None:
+            return None
+        with self._lock:
+            return self._nearest(self._connection(), simhash)
+
+    def add(self, url: str, text: str = None, simhash: int = None):
+        """
+        Index an article and return its cluster as {'cluster_id', 'canonical_url',
+        'is_copy', 'distance'}, or None if the text is too short to fingerprint.
+        An article that is already indexed keeps its cluster.
+        """
+        if simhash is None:
+            simhash = fingerprint(text)
+        if simhash is None or not url:
+            return None
+        key = canonical_key(url)
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute('SELECT cluster_id FROM articles WHERE key = ?', (key,)).fetchone()
+            if row:
+                return self._cluster(conn, row[0], url)
+
+            match = self._nearest(conn, simhash, exclude_key=key)
+            if match:
+                cluster_id, distance = match['cluster_id'], match['distance']
+                conn.execute('UPDATE clusters SET size = size + 1 WHERE cluster_id = ?', (cluster_id,))
+            else:
+                cluster_id, distance = cluster_id_for(key), None
+                conn.execute('INSERT OR REPLACE INTO clusters (cluster_id, canonical_url, size) VALUES (?, ?, 1)',
+                             (cluster_id, url))
+            conn.execute('INSERT INTO articles (key, url, simhash, cluster_id, added_at) VALUES (?, ?, ?, ?, ?)',
+                         (key, url, _signed(simhash), cluster_id, time.time()))
+            conn.executemany('INSERT INTO bands (band, value, key) VALUES (?, ?, ?)',
+                             [(band, value, key) for band, value in self._band_values(simhash)])
+            conn.commit()
+            return self._cluster(conn, cluster_id, url, distance)
+
+    def clusters(self, min_size: int = 2) -> list:
+        """Clusters with at least min_size articles, biggest first"""
+        with self._lock:
+            conn = self._connection()
+            rows = conn.execute(
+                'SELECT cluster_id, canonical_url, size FROM clusters WHERE size >= ? ORDER BY size DESC',
+                (min_size,)
+            ).fetchall()
+            return [{
+                'cluster_id': cluster_id,
+                'canonical_url': canonical_url,
+                'size': size,
+                'urls': [url for (url,) in conn.execute(
+                    'SELECT url FROM articles WHERE cluster_id = ? ORDER BY added_at', (cluster_id,))],
+            } for cluster_id, canonical_url, size in rows]
+
+    def stats(self) -> dict:
+        with self._lock:
+            conn = self._connection()
+            articles = conn.execute('SELECT COUNT(*) FROM articles').fetchone()[0]
+            clusters, copies = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size - 1), 0) FROM clusters WHERE size > 1'
+            ).fetchone()
+        return {'articles': articles, 'clusters_with_copies': clusters, 'copies': copies}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> NearDuplicateIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = NearDuplicateIndex()
+    return _index
+
+
+def add(url: str, text: str = None, simhash: int = None):
+    """Index an article in the shared index; None when disabled or too short to fingerprint"""
+    if not ENABLED:
+        return None
+    try:
+        return get_index().add(url, text=text, simhash=simhash)
+    except sqlite3.Error as e:
+        print(f"⚠️ Near-duplicate index unavailable: {e}")
+        return None
+
+
+def print_report(limit: int = 20):
+    stats = get_index().stats()
+    print(f"Near-duplicate index: {stats['articles']} articles, "
+          f"{stats['clusters_with_copies']} clusters with {stats['copies']} copies")
+    for cluster in get_index().clusters()[:limit]:
+        print(f"  {cluster['cluster_id']} ({cluster['size']} articles) canonical: {cluster['canonical_url']}")
+        for url in cluster['urls'][1:]:
+            print(f"      copy: {url}")
+
+
+def seed_from_bigquery(batch_size: int = 500):
+    """Index every text-scraped article in BigQuery and write the cluster ids back"""
+    from bigquery_client import BigQueryClient
+
+    bq_client = BigQueryClient()
+    if not bq_client.ensure_duplicate_cluster_column():
+        print("❌ Could not add duplicate_cluster_id to the table")
+        return
+
+    query = f"""
+    SELECT url, content
+    FROM `{bq_client.full_table_id}`
+    WHERE text_scraped = TRUE AND content IS NOT NULL AND url IS NOT NULL
+    ORDER BY updated_at ASC
+    """
+    assigned = {}
+    for row in bq_client.client.query(query).result(page_size=batch_size):
+        match = add(row.url, row.content)
+        if match:
+            assigned[row.url] = match['cluster_id']
+
+    print(f"Indexed {len(assigned)} articles")
+    bq_client.set_duplicate_clusters(assigned)
+    print_report()
+
+
+if __name__ == '__main__':
+    if '--seed' in sys.argv:
+        seed_from_bigquery()
+    else:
+        print_report()
@@ -1,4 +1,6 @@
 from bigquery_client import BigQueryClient
+import id_allocator
+from bulk_ingest import load_rows
 from datetime import datetime, timedelta
 import pandas as pd
 
@@ -33,15 +35,7 @@ print(f"   date: {date_col}")
 print(f"   domain: {domain_col}")
 print(f"   brand: {brand_col}")
 
-# Get current MAX ID
-max_id_query = f"""
-SELECT IFNULL(MAX(id), 0) as max_id
-FROM `{client.project_id}.{client.dataset_id}.{client.table_id}`
-"""
-max_id_result = list(client.client.query(max_id_query).result())
-next_id = max_id_result[0].max_id + 1
-
-print(f"\n2. Starting ID assignment from: {next_id}")
+print(f"\n2. Ids are leased from the id_sequences table in one block for the whole import")
 
 # Check for duplicate URLs
 all_urls = df[url_col].tolist()
@@ -93,7 +87,7 @@ for idx, row in df.iterrows():
         
         # Create row for BigQuery
         bq_row = {
-            'id': next_id,
+            'id': None,  # Assigned for the whole import below
             'url': url_val,
             'title': title_val,
             'publish_date': publish_date_dt.isoformat() if publish_date_dt else None,
@@ -106,7 +100,6 @@ for idx, row in df.iterrows():
         }
         
         rows_to_insert.append(bq_row)
-        next_id += 1
         
         # Progress indicator every 100 rows
         if len(rows_to_insert) % 100 == 0:
@@ -125,29 +118,24 @@ if errors:
     for err in errors[:10]:
         print(f"     - {err}")
 
-# Insert to BigQuery in batches (BigQuery has a 10,000 row limit per request)
+# Load to BigQuery with load jobs - no streaming buffer, so the rows can be updated right away
 if rows_to_insert:
-    print(f"\n7. Inserting {len(rows_to_insert)} rows to BigQuery...")
+    print(f"\n7. Loading {len(rows_to_insert)} rows to BigQuery...")
     
-    batch_size = 5000  # Safe batch size
-    total_batches = (len(rows_to_insert) + batch_size - 1) // batch_size
+    # One id lease for the whole import
+    new_ids = id_allocator.allocate('mediatracker', len(rows_to_insert))
+    for bq_row, new_id in zip(rows_to_insert, new_ids):
+        bq_row['id'] = new_id
     
-    for batch_num in range(total_batches):
-        start_idx = batch_num * batch_size
-        end_idx = min((batch_num + 1) * batch_size, len(rows_to_insert))
-        batch = rows_to_insert[start_idx:end_idx]
-        
-        print(f"   Inserting batch {batch_num + 1}/{total_batches} ({len(batch)} rows)...")
-        
-        table_ref = f"{client.project_id}.{client.dataset_id}.{client.table_id}"
-        insert_errors = client.client.insert_rows_json(table_ref, batch)
-        
-        if insert_errors:
-            print(f"   ❌ Some rows in batch {batch_num + 1} failed:")
-            for err in insert_errors[:5]:
-                print(f"      {err}")
-        else:
-            print(f"   ✅ Batch {batch_num + 1} inserted successfully")
+    table_ref = f"{client.project_id}.{client.dataset_id}.{client.table_id}"
+    insert_errors = load_rows(rows_to_insert, table_ref, client=client.client)
+    
+    if insert_errors:
+        print(f"   ❌ Load failed:")
+        for err in insert_errors[:5]:
+            print(f"      {err}")
+    else:
+        print(f"   ✅ All rows loaded successfully")
     
     print(f"\n{'='*80}")
     print("COMPLETE!")
@@ -5,7 +5,7 @@ Run this in a separate terminal to process all pending URLs
 """
 
 from bigquery_client import BigQueryClient
-import time
+import enrichment_dispatcher
 
 def main():
     bq_client = BigQueryClient()
@@ -67,15 +67,16 @@ def main():
                     error = result.get('error', 'Unknown')[:50]
                     print(f"❌ [{processed}/{total_pending}] {url_short}... - {error}")
             
+            # Enrich this batch's URLs in one job, now that their inserts are done
+            enrichment_dispatcher.get_dispatcher().flush()
+            
             # Show progress
             progress_pct = (processed / total_pending) * 100
             print(f"\n📊 Progress: {processed}/{total_pending} ({progress_pct:.1f}%) | ✅ {successful} | ❌ {failed}\n")
-            
-            # Small delay to avoid rate limits
-            time.sleep(0.5)
     
     except KeyboardInterrupt:
         print("\n\n⏸️ Processing stopped by user")
+        enrichment_dispatcher.get_dispatcher().flush()
         print(f"📊 Final stats: {processed} processed | ✅ {successful} successful | ❌ {failed} failed")
     
     print("\n" + "=" * 60)
@@ -0,0 +1,193 @@
+"""
+Per-host adaptive rate limiting for the shared fetcher.
+
+Each host gets a token bucket: requests start once a token is available,
+tokens refill at the host's current rate and up to RATE_LIMIT_BURST can be
+saved up. The rate adapts to how the host responds:
+
+- 429 / 503 halve the rate (down to one request per RATE_LIMIT_MAX_INTERVAL
+  seconds), and a Retry-After header blocks the host until it has passed
+- every RATE_LIMIT_SUCCESS_STREAK successes in a row speed it up by 25%,
+  up to one request per RATE_LIMIT_MIN_INTERVAL seconds
+
+So hosts that are happy to serve us are hit as fast as the scraping engine's
+concurrency allows, and strict ones set their own pace. metrics() reports the
+current per-host rate, and print_metrics() prints it at the end of a batch.
+RATE_LIMIT=off turns the limiter off.
+"""
+
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+ENABLED = os.environ.get('RATE_LIMIT', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Seconds between requests to a host we know nothing about
+START_INTERVAL = float(os.environ.get('RATE_LIMIT_INTERVAL', '0.25'))
+
+# Fastest and slowest pace the limiter will settle on per host
+MIN_INTERVAL = float(os.environ.get('RATE_LIMIT_MIN_INTERVAL', '0.05'))
+MAX_INTERVAL = float(os.environ.get('RATE_LIMIT_MAX_INTERVAL', '30'))
+
+# Requests a host can take back to back after being idle
+BURST = float(os.environ.get('RATE_LIMIT_BURST', '2'))
+
+# Consecutive successes before the pace is raised
+SUCCESS_STREAK = int(os.environ.get('RATE_LIMIT_SUCCESS_STREAK', '10'))
+
+# Longest Retry-After we honour, and the longest one fetch() will wait out to retry
+MAX_RETRY_AFTER = float(os.environ.get('RATE_LIMIT_MAX_RETRY_AFTER', '300'))
+MAX_RETRY_WAIT = float(os.environ.get('RATE_LIMIT_MAX_RETRY_WAIT', '30'))
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def host_of(url: str) -> str:
+    host = urlsplit(url).netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def parse_retry_after(value):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class _HostBucket:
+    def __init__(self):
+        self.interval = START_INTERVAL
+        self.tokens = BURST
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.streak = 0
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def refill(self, now: float):
+        self.tokens = min(BURST, self.tokens + (now - self.updated) / self.interval)
+        self.updated = now
+
+
+class RateLimiter:
+    """Token bucket per host; acquire() before a request, record() after it"""
+
+    def __init__(self):
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            bucket = self._hosts[host] = _HostBucket()
+        return bucket
+
+    def acquire(self, url: str) -> float:
+        """Block until a request to url's host may start; returns the seconds waited"""
+        host = host_of(url)
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            bucket.refill(now)
+            # Take the token now (possibly going negative) so concurrent callers queue up behind us
+            bucket.tokens -= 1
+            wait = max(0.0, -bucket.tokens * bucket.interval, bucket.blocked_until - now)
+            bucket.requests += 1
+            bucket.waited += wait
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def record(self, url: str, status: int, retry_after=None):
+        """Adapt the host's pace to a response status (and its Retry-After header)"""
+        host = host_of(url)
+        with self._lock:
+            bucket = self._bucket(host)
+            now = time.monotonic()
+            if status in THROTTLE_STATUSES:
+                bucket.refill(now)
+                bucket.throttled += 1
+                bucket.streak = 0
+                bucket.interval = min(MAX_INTERVAL, bucket.interval * 2)
+                bucket.tokens = min(bucket.tokens, 0.0)
+                delay = parse_retry_after(retry_after)
+                if delay:
+                    bucket.blocked_until = max(bucket.blocked_until, now + delay)
+            elif status and status < 400:
+                bucket.streak += 1
+                if bucket.streak >= SUCCESS_STREAK:
+                    bucket.refill(now)
+                    bucket.interval = max(MIN_INTERVAL, bucket.interval * 0.8)
+                    bucket.streak = 0
+
+    def retry_wait(self, url: str) -> float:
+        """Seconds until url's host accepts requests again"""
+        with self._lock:
+            bucket = self._hosts.get(host_of(url))
+            if bucket is None:
+                return 0.0
+            return max(0.0, bucket.blocked_until - time.monotonic(), bucket.interval)
+
+    def metrics(self) -> dict:
+        """Current pace and counters per host"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    'rate_per_second': round(1 / bucket.interval, 3),
+                    'interval': round(bucket.interval, 3),
+                    'requests': bucket.requests,
+                    'throttled': bucket.throttled,
+                    'waited_seconds': round(bucket.waited, 2),
+                    'blocked_for': round(max(0.0, bucket.blocked_until - now), 1),
+                }
+                for host, bucket in self._hosts.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+
+_limiter = RateLimiter()
+
+
+def acquire(url: str) -> float:
+    if not ENABLED:
+        return 0.0
+    return _limiter.acquire(url)
+
+
+def record(url: str, status: int, retry_after=None):
+    if ENABLED:
+        _limiter.record(url, status, retry_after)
+
+
+def retry_wait(url: str) -> float:
+    return _limiter.retry_wait(url) if ENABLED else 0.0
+
+
+def metrics() -> dict:
+    return _limiter.metrics()
+
+
+def print_metrics(limit: int = 20):
+    """Busiest hosts first"""
+    rows = sorted(metrics().items(), key=lambda item: -item[1]['requests'])[:limit]
+    if not rows:
+        return
+    print(f"{'host':<35} {'req/s':>7} {'requests':>9} {'429/503':>8} {'waited s':>9}")
+    for host, row in rows:
+        print(f"{host[:35]:<35} {row['rate_per_second']:>7.2f} {row['requests']:>9} "
+              f"{row['throttled']:>8} {row['waited_seconds']:>9.1f}")
@@ -0,0 +1,205 @@
+"""
+Headless render tier for JavaScript-heavy sites.
+
+Single-page-app publications send an empty shell to a plain download, so
+trafilatura finds nothing. render_html() loads the URL in the shared
+browser (browser_pool, 'render' profile) and returns the HTML after
+scripts have built the article:
+
+- images, media, fonts and known ad/tracker hosts are blocked, so a render
+  only pays for the document and its scripts
+- instead of a fixed sleep it waits until an article container
+  (ARTICLE_SELECTOR) holds at least MIN_ARTICLE_TEXT characters, or
+  RENDER_TIMEOUT runs out, and then takes whatever is there
+- the HTML goes back to the normal extraction stage (ParsedPage or the
+  extraction pool); nothing here is site-specific
+
+Rendering is opt-in per domain. web_scraper offers the 'render' strategy
+to routing only for RENDER_DOMAINS (known single-page-app publications,
+where it is also the first choice) and for domains where a render has
+already worked. It checks is_available() (which starts the browser) only
+when routing actually tries it.
+Error pages (non-2xx) and renders where no article container filled in
+yield no content. `python render_tier.py --serve fixtures/render` renders the
+local fixture pages through a throwaway HTTP server.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+
+from browser_pool import get_pool, HAS_PLAYWRIGHT, PlaywrightTimeout
+
+PROFILE = 'render'
+
+# RENDER_TIER=off keeps the tier out of routing even when Playwright is installed
+ENABLED = os.environ.get('RENDER_TIER', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# JavaScript-built publications that need rendering (subdomains match their parent entry).
+# Extra domains can be given as RENDER_DOMAINS="example.com,other.com"
+RENDER_DOMAINS = {
+    domain.strip().lower() for domain in os.environ.get('RENDER_DOMAINS', '').split(',') if domain.strip()
+}
+
+# Milliseconds for navigation, and for the article DOM to show up after it
+NAVIGATION_TIMEOUT = int(os.environ.get('RENDER_NAVIGATION_TIMEOUT', '20000'))
+RENDER_TIMEOUT = int(os.environ.get('RENDER_TIMEOUT', '10000'))
+
+# Characters of text an article container needs before the page counts as rendered
+MIN_ARTICLE_TEXT = 200
+
+ARTICLE_SELECTOR = ', '.join([
+    'article',
+    '[itemprop="articleBody"]',
+    '[class*="article-body"]',
+    '[class*="article-content"]',
+    '[class*="story-body"]',
+    '[class*="post-content"]',
+    '[class*="entry-content"]',
+    'main',
+])
+
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font'}
+
+AD_HOSTS = re.compile(
+    r'(^|\.)(doubleclick\.net|googlesyndication\.com|googletagservices\.com|googletagmanager\.com|'
+    r'google-analytics\.com|adservice\.google\.[a-z.]+|amazon-adsystem\.com|taboola\.com|outbrain\.com|'
+    r'criteo\.(com|net)|scorecardresearch\.com|chartbeat\.(com|net)|hotjar\.com|facebook\.net|'
+    r'adnxs\.com|pubmatic\.com|rubiconproject\.com|moatads\.com|quantserve\.com)$'
+)
+
+_WAIT_FOR_ARTICLE = """
+([selector, minText]) => {
+    for (const el of document.querySelectorAll(selector)) {
+        if ((el.innerText || '').trim().length >= minText) return true;
+    }
+    return false;
+}
+"""
+
+_HOST = re.compile(r'^[a-z]+://([^/:?#]+)', re.IGNORECASE)
+
+# None until the first render decides whether a browser can start here
+_available = None
+_available_lock = threading.Lock()
+
+
+def _blocked(request) -> bool:
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = _HOST.match(request.url)
+    return bool(host and AD_HOSTS.search(host.group(1).lower()))
+
+
+async def _install_blocking(context):
+    async def handle(route):
+        if _blocked(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+    await context.route('**/*', handle)
+
+
+async def _render(url: str) -> dict:
+    async with get_pool().page(PROFILE, setup=_install_blocking) as page:
+        blocked = []
+        page.on('requestfailed', lambda request: blocked.append(request.url) if _blocked(request) else None)
+
+        response = await page.goto(url, wait_until='domcontentloaded', timeout=NAVIGATION_TIMEOUT)
+        try:
+            await page.wait_for_function(_WAIT_FOR_ARTICLE, arg=[ARTICLE_SELECTOR, MIN_ARTICLE_TEXT],
+                                         timeout=RENDER_TIMEOUT)
+            rendered = True
+        except PlaywrightTimeout:
+            rendered = False
+
+        return {
+            'url': page.url,
+            'status': response.status if response else None,
+            'html': await page.content(),
+            'rendered': rendered,
+            'blocked': len(blocked),
+        }
+
+
+def is_render_domain(domain: str) -> bool:
+    """True if domain (or a parent domain) is listed in RENDER_DOMAINS"""
+    labels = (domain or '').lower().split('.')
+    return any('.'.join(labels[i:]) in RENDER_DOMAINS for i in range(len(labels) - 1))
+
+
+def is_available() -> bool:
+    """True if the render tier is enabled and a headless browser starts here (checked once)"""
+    global _available
+    if not ENABLED or not HAS_PLAYWRIGHT:
+        return False
+    if _available is None:
+        with _available_lock:
+            if _available is None:
+                try:
+                    get_pool().run(get_pool().start(), timeout=60)
+                    _available = True
+                except Exception as e:
+                    print(f"Warning: render tier disabled, browser did not start: {str(e)[:200]}")
+                    _available = False
+    return _available
+
+
+def render_html(url: str) -> dict:
+    """
+    Render a URL and return {'url', 'status', 'html', 'rendered', 'blocked'}.
+    rendered is False when no article container filled up in time (the
+    HTML is still whatever the page had by then). Raises on navigation errors.
+    """
+    return get_pool().run(_render(url))
+
+
+def render_many(urls) -> list:
+    """render_html for many URLs on the page pool; failures come back as {'url', 'error'}"""
+    urls = list(urls)
+
+    async def render_all():
+        results = await asyncio.gather(*(_render(url) for url in urls), return_exceptions=True)
+        return [{'url': url, 'error': str(r)} if isinstance(r, BaseException) else r
+                for url, r in zip(urls, results)]
+
+    return get_pool().run(render_all())
+
+
+def _serve(directory: str):
+    """Serve a directory on a free localhost port; returns the base URL"""
+    import functools
+    from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+    class QuietHandler(SimpleHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    from web_scraper import ParsedPage
+
+    args = sys.argv[1:]
+    if args[:1] == ['--serve']:
+        directory = args[1] if len(args) > 1 else os.path.join('fixtures', 'render')
+        base = _serve(directory)
+        args = [f"{base}/{name}" for name in sorted(os.listdir(directory)) if name.endswith('.html')]
+    if not args:
+        print("Usage: python render_tier.py URL... | --serve [DIRECTORY]")
+        sys.exit(1)
+    if not is_available():
+        sys.exit(1)
+
+    for result in render_many(args):
+        if result.get('error'):
+            print(f"{result['url']}: ERROR {result['error'][:200]}")
+            continue
+        page = ParsedPage(result['html'], result['url'])
+        print(f"{result['url']}: rendered={result['rendered']} blocked={result['blocked']} "
+              f"title={page.title!r} content={len(page.content or '')} chars")
@@ -0,0 +1,245 @@
+"""
+Per-domain fetch routing.
+
+Every scrape attempt records its outcome per (domain, strategy): whether it
+produced usable content, how long it took and how much text came back.
+plan() uses those stats to order the strategies for a URL, so a domain that
+never works with a direct download goes straight to Firecrawl (and vice
+versa) instead of paying for a wasted attempt first.
+
+- Success rates are smoothed towards a prior, so a domain with no history
+  starts from the old static rule (PAYWALL_DOMAINS -> Firecrawl first).
+- Cheaper strategies win ties: direct < render < firecrawl.
+- Strategies that keep failing for a domain are dropped from the chain,
+  and every ROUTING_REPROBE_EVERY-th URL of a domain tries the runner-up
+  first so a site that changed gets noticed.
+
+Stats live in .cache/routing.sqlite3. `python routing.py [domain]` prints
+the per-domain decisions for auditing.
+"""
+
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+
+from http_cache import CACHE_DIR
+
+ROUTING_PATH = os.path.join(CACHE_DIR, 'routing.sqlite3')
+
+DIRECT = 'direct'
+RENDER = 'render'
+FIRECRAWL = 'firecrawl'
+
+# Cheapest first - also the default order when nothing else decides
+STRATEGIES = (DIRECT, RENDER, FIRECRAWL)
+
+# Score handicap per strategy, so a paid strategy has to be clearly better to win
+COST_PENALTY = {DIRECT: 0.0, RENDER: 0.05, FIRECRAWL: 0.1}
+
+# Characters of extracted text that count as a successful scrape
+MIN_CONTENT_LENGTH = 100
+
+# Weight of the prior, in pseudo-attempts
+PRIOR_WEIGHT = 3
+
+# Drop a strategy from a domain's chain once it has this many attempts and a rate below DROP_BELOW
+DROP_AFTER = int(os.environ.get('ROUTING_DROP_AFTER', '10'))
+DROP_BELOW = float(os.environ.get('ROUTING_DROP_BELOW', '0.1'))
+
+# Every Nth URL of a domain tries the runner-up strategy first
+REPROBE_EVERY = int(os.environ.get('ROUTING_REPROBE_EVERY', '25'))
+
+# Latency samples kept per (domain, strategy) for the median
+LATENCY_WINDOW = 50
+
+_conn = None
+_lock = threading.Lock()
+_stats = None
+_decisions = {}
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn = sqlite3.connect(ROUTING_PATH, check_same_thread=False, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS route_stats (
+                domain TEXT,
+                strategy TEXT,
+                attempts INTEGER,
+                successes INTEGER,
+                total_content_length INTEGER,
+                latencies TEXT,
+                updated_at REAL,
+                PRIMARY KEY (domain, strategy)
+            )
+        """)
+        _conn = conn
+    return _conn
+
+
+def _load():
+    """Load all stats into memory once; writes go through to SQLite"""
+    global _stats
+    if _stats is None:
+        stats = {}
+        rows = _connection().execute(
+            'SELECT domain, strategy, attempts, successes, total_content_length, latencies, updated_at FROM route_stats'
+        )
+        for domain, strategy, attempts, successes, total_len, latencies, updated_at in rows:
+            stats[(domain, strategy)] = {
+                'attempts': attempts,
+                'successes': successes,
+                'total_content_length': total_len,
+                'latencies': json.loads(latencies or '[]'),
+                'updated_at': updated_at,
+            }
+        _stats = stats
+    return _stats
+
+
+def _domain_key(domain: str) -> str:
+    domain = (domain or '').lower()
+    return domain[4:] if domain.startswith('www.') else domain
+
+
+def _is_paywalled(domain: str) -> bool:
+    from web_scraper import PAYWALL_DOMAINS
+    return any(paywall in domain for paywall in PAYWALL_DOMAINS)
+
+
+def _prior(domain: str, strategy: str) -> float:
+    """Expected success rate before we have any history for this domain"""
+    import render_tier
+    if render_tier.is_render_domain(domain):
+        # Known JavaScript-built site: a plain download only gets the empty shell
+        return {DIRECT: 0.2, RENDER: 0.9, FIRECRAWL: 0.6}[strategy]
+    if _is_paywalled(domain):
+        return {DIRECT: 0.2, RENDER: 0.3, FIRECRAWL: 0.9}[strategy]
+    return {DIRECT: 0.8, RENDER: 0.6, FIRECRAWL: 0.6}[strategy]
+
+
+def succeeded(domain: str, strategy: str) -> bool:
+    """True once strategy has produced usable content for the domain"""
+    domain = _domain_key(domain)
+    with _lock:
+        entry = _load().get((domain, strategy))
+    return bool(entry and entry['successes'])
+
+
+def record(domain: str, strategy: str, success: bool, latency: float, content_length: int = 0):
+    """Record the outcome of one scrape attempt"""
+    domain = _domain_key(domain)
+    if not domain:
+        return
+    with _lock:
+        stats = _load()
+        entry = stats.setdefault((domain, strategy), {
+            'attempts': 0, 'successes': 0, 'total_content_length': 0, 'latencies': [], 'updated_at': 0,
+        })
+        entry['attempts'] += 1
+        entry['successes'] += 1 if success else 0
+        entry['total_content_length'] += content_length or 0
+        entry['latencies'] = (entry['latencies'] + [round(latency, 3)])[-LATENCY_WINDOW:]
+        entry['updated_at'] = time.time()
+        try:
+            conn = _connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO route_stats VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (domain, strategy, entry['attempts'], entry['successes'], entry['total_content_length'],
+                 json.dumps(entry['latencies']), entry['updated_at'])
+            )
+            conn.commit()
+        except sqlite3.Error:
+            pass  # stats are advisory - never fail a scrape over them
+
+
+def _score(domain: str, strategy: str) -> float:
+    entry = _load().get((domain, strategy))
+    prior = _prior(domain, strategy)
+    if not entry:
+        rate = prior
+    else:
+        rate = (entry['successes'] + prior * PRIOR_WEIGHT) / (entry['attempts'] + PRIOR_WEIGHT)
+    return rate - COST_PENALTY[strategy]
+
+
+def _dropped(domain: str, strategy: str) -> bool:
+    entry = _load().get((domain, strategy))
+    return bool(entry) and entry['attempts'] >= DROP_AFTER and entry['successes'] / entry['attempts'] < DROP_BELOW
+
+
+def rank(domain: str, available=STRATEGIES) -> list:
+    """Strategies for a domain, best first, without re-probing or dropping"""
+    domain = _domain_key(domain)
+    with _lock:
+        return sorted(available, key=lambda s: (-_score(domain, s), STRATEGIES.index(s)))
+
+
+def plan(url: str, available=STRATEGIES) -> list:
+    """
+    Order in which to try strategies for this URL. The first entry is the
+    expected winner; later ones are fallbacks.
+    """
+    from web_scraper import extract_domain_from_url
+    domain = _domain_key(extract_domain_from_url(url))
+    ordered = rank(domain, available)
+
+    with _lock:
+        _decisions[domain] = _decisions.get(domain, 0) + 1
+        reprobe = len(ordered) > 1 and REPROBE_EVERY > 0 and _decisions[domain] % REPROBE_EVERY == 0
+        if reprobe:
+            # Give the runner-up a chance to show it got better
+            ordered = [ordered[1], ordered[0]] + ordered[2:]
+        else:
+            kept = [s for s in ordered[1:] if not _dropped(domain, s)]
+            ordered = [ordered[0]] + kept
+    return ordered
+
+
+def report(domain: str = None) -> list:
+    """Per-domain, per-strategy stats plus the strategy plan() would pick first"""
+    with _lock:
+        stats = dict(_load())
+    rows = []
+    seen = {}
+    for entry_domain, strategy in stats:
+        seen.setdefault(entry_domain, []).append(strategy)
+    for (entry_domain, strategy), entry in sorted(stats.items()):
+        if domain and entry_domain != _domain_key(domain):
+            continue
+        attempts = entry['attempts'] or 1
+        rows.append({
+            'domain': entry_domain,
+            'strategy': strategy,
+            'attempts': entry['attempts'],
+            'success_rate': round(entry['successes'] / attempts, 3),
+            'median_latency': round(statistics.median(entry['latencies']), 3) if entry['latencies'] else None,
+            'avg_content_length': int(entry['total_content_length'] / attempts),
+            'preferred': rank(entry_domain, [s for s in STRATEGIES if s in seen[entry_domain]])[0],
+            'dropped': _dropped(entry_domain, strategy),
+        })
+    return rows
+
+
+def print_report(domain: str = None):
+    rows = report(domain)
+    if not rows:
+        print("No routing stats recorded yet")
+        return
+    print(f"{'domain':<35} {'strategy':<10} {'tries':>6} {'success':>8} {'median s':>9} {'avg len':>8}  preferred")
+    for row in rows:
+        latency = f"{row['median_latency']:.2f}" if row['median_latency'] is not None else '-'
+        marker = 'dropped' if row['dropped'] else ''
+        print(f"{row['domain'][:35]:<35} {row['strategy']:<10} {row['attempts']:>6} "
+              f"{row['success_rate']:>8.0%} {latency:>9} {row['avg_content_length']:>8}  {row['preferred']} {marker}")
+
+
+if __name__ == "__main__":
+    print_report(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -85,8 +85,6 @@ def main():
         ''').result()
         for row in remaining:
             print(f"  Batch done: {success} success, {failed} failed. Remaining: {row.cnt}")
-        
-        time.sleep(2)  # Brief pause between batches
 
 if __name__ == "__main__":
     main()
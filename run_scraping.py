@@ -3,7 +3,6 @@
 
 from bigquery_client import BigQueryClient
 from web_scraper import scrape_light
-import time
 import sys
 
 def process_batch(bq, batch_size=50):
@@ -80,8 +79,6 @@ def main():
         if batch_num % 5 == 0:
             remaining = list(bq.client.query('''SELECT COUNT(*) as cnt FROM `media-455519.mediatracker.mediatracker` WHERE TRIM(content) = 'Antler' ''').result())[0].cnt
             print(f"\n>>> Remaining: {remaining} | Processed: {total_success} success, {total_failed} failed <<<", flush=True)
-        
-        time.sleep(0.1)
 
 if __name__ == "__main__":
     main()
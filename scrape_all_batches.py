@@ -4,6 +4,9 @@ Scrape all unscraped URLs in batches of 100
 """
 from bigquery_client import BigQueryClient
 from web_scraper import get_website_text_content
+from scrape_engine import scrape_many
+import circuit_breaker
+import rate_limiter
 import time
 from datetime import datetime
 from google.cloud import bigquery
@@ -28,27 +31,14 @@ def scrape_one_batch(batch_size=100):
     successes = 0
     failures = 0
     
-    for row in results:
+    # Scrape the whole batch concurrently - per-domain limits keep it polite
+    contents = scrape_many([row.url for row in results], scrape_fn=get_website_text_content)
+    
+    for row, content in zip(results, contents):
         try:
-            content = get_website_text_content(row.url)
-            
             if content and len(content.strip()) > 50:
-                update_query = """
-                UPDATE `media-455519.mediatracker.mediatracker`
-                SET content = @content,
-                    text_scraped = true,
-                    text_scraped_at = @scraped_at
-                WHERE id = @id
-                """
-                
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("content", "STRING", content),
-                        bigquery.ScalarQueryParameter("scraped_at", "STRING", datetime.now().isoformat()),
-                        bigquery.ScalarQueryParameter("id", "INT64", int(row.id))
-                    ]
-                )
-                client.client.query(update_query, job_config=job_config).result()
+                # Keeps content_hash / content_length in step with the new text (see content_store)
+                client.save_full_content(content, article_id=int(row.id))
                 successes += 1
             else:
                 update_query = """
@@ -70,8 +60,6 @@ def scrape_one_batch(batch_size=100):
                 failures += 1
         except Exception as e:
             failures += 1
-        
-        time.sleep(0.5)
     
     return successes, failures, len(results)
 
@@ -104,9 +92,10 @@ def main():
         print(f"  Success: {successes}, Failed: {failures}", flush=True)
         print(f"  Time: {batch_time:.1f}s", flush=True)
         print(f"  Total so far: {total_success} ✅, {total_failed} ❌", flush=True)
+        circuit_breaker.print_report()
+        rate_limiter.print_metrics()
         
         batch_num += 1
-        time.sleep(1)
     
     total_time = time.time() - start_time
     total = total_success + total_failed
@@ -6,9 +6,25 @@ Handles large batches with progress tracking and error handling
 
 from bigquery_client import BigQueryClient
 from web_scraper import get_website_text_content
+from scrape_engine import scrape_many
+from batch_writer import BatchWriter, now
 import time
-from datetime import datetime
-from google.cloud import bigquery
+
+# URLs scraped per scrape_many call; their updates are written before the next chunk starts
+CHUNK_SIZE = 200
+
+UNSCRAPED_FILTER = '(content IS NULL OR content = "")'
+
+def fetch_unscraped_chunk(client, after_id, limit=CHUNK_SIZE):
+    """Next chunk of unscraped rows with id > after_id, in id order"""
+    query = f"""
+    SELECT id, url, title
+    FROM `media-455519.mediatracker.mediatracker`
+    WHERE {UNSCRAPED_FILTER} AND id > {int(after_id)}
+    ORDER BY id ASC
+    LIMIT {int(limit)}
+    """
+    return list(client.client.query(query).result())
 
 def scrape_all_unscraped():
     """Scrape all URLs that don't have content yet"""
@@ -19,131 +35,114 @@ def scrape_all_unscraped():
     print(f"BULK CONTENT SCRAPING")
     print(f"{'='*80}\n")
     
-    # Get all unscraped URLs
-    query = """
-    SELECT id, url, title
+    print("📊 Counting unscraped URLs in the database...")
+    count_query = f"""
+    SELECT COUNT(*) AS total
     FROM `media-455519.mediatracker.mediatracker`
-    WHERE content IS NULL OR content = ""
-    ORDER BY id ASC
+    WHERE {UNSCRAPED_FILTER}
     """
+    total = list(client.client.query(count_query).result())[0].total
     
-    print("📊 Fetching unscraped URLs from database...")
-    results = list(client.client.query(query).result())
-    
-    if not results:
+    if not total:
         print("✅ No unscraped URLs found! All done.")
         return
     
-    total = len(results)
-    print(f"📋 Found {total} URLs to scrape\n")
+    print(f"📋 Found {total} URLs to scrape, {CHUNK_SIZE} at a time\n")
     
     # Track statistics
     successes = 0
     failures = 0
+    processed = 0
+    saved_ids = []
+    last_id = -1
     start_time = time.time()
     
-    # Process each URL
-    for i, row in enumerate(results, 1):
-        elapsed = time.time() - start_time
-        avg_time = elapsed / i if i > 0 else 0
-        remaining = (total - i) * avg_time
-        
-        print(f"\n[{i}/{total}] ID {row.id} ({successes} ✅, {failures} ❌)")
-        print(f"  URL: {row.url[:70]}...")
-        print(f"  Time: {elapsed/60:.1f}m elapsed, ~{remaining/60:.1f}m remaining")
-        
-        # Scrape the content
-        try:
-            content = get_website_text_content(row.url)
+    # Each chunk is scraped concurrently (per-domain limits replace the old per-URL sleep)
+    # and saved before the next one, so an interrupted run keeps what it scraped
+    with BatchWriter(client.client) as writer:
+        while True:
+            results = fetch_unscraped_chunk(client, last_id)
+            if not results:
+                break
+            last_id = results[-1].id
+            chunk_start = processed
             
-            if content and len(content.strip()) > 50:
-                # Successfully scraped
-                print(f"  ✅ Scraped {len(content)} characters")
-                
-                # Update the database
-                update_query = """
-                UPDATE `media-455519.mediatracker.mediatracker`
-                SET content = @content,
-                    text_scraped = true,
-                    text_scraped_at = @scraped_at
-                WHERE id = @id
-                """
-                
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("content", "STRING", content),
-                        bigquery.ScalarQueryParameter("scraped_at", "STRING", datetime.now().isoformat()),
-                        bigquery.ScalarQueryParameter("id", "INT64", int(row.id))
-                    ]
-                )
-                job = client.client.query(update_query, job_config=job_config)
-                job.result()
-                
-                successes += 1
-                
-            else:
-                # Failed to scrape
-                print(f"  ❌ No content extracted")
+            def report_progress(index, url, content):
+                done = chunk_start + index + 1
+                elapsed = time.time() - start_time
+                status = f"{len(content)} chars" if content else "no content"
+                print(f"[~{done}/{total}] ID {results[index].id}: {status} "
+                      f"({elapsed/60:.1f}m elapsed)", flush=True)
+            
+            print(f"🚀 Scraping IDs {results[0].id}-{last_id}...\n")
+            contents = scrape_many([row.url for row in results], scrape_fn=get_website_text_content,
+                                   on_result=report_progress)
+            
+            for row, content in zip(results, contents):
+                processed += 1
+                i = processed
+                elapsed = time.time() - start_time
                 
-                # Log the error
-                update_query = """
-                UPDATE `media-455519.mediatracker.mediatracker`
-                SET text_scraped = false,
-                    text_scrape_error = @error,
-                    text_scraped_at = @scraped_at
-                WHERE id = @id
-                """
+                print(f"\n[{i}/{total}] ID {row.id} ({successes} ✅, {failures} ❌)")
+                print(f"  URL: {row.url[:70]}...")
                 
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("error", "STRING", "No content extracted"),
-                        bigquery.ScalarQueryParameter("scraped_at", "STRING", datetime.now().isoformat()),
-                        bigquery.ScalarQueryParameter("id", "INT64", int(row.id))
-                    ]
-                )
-                job = client.client.query(update_query, job_config=job_config)
-                job.result()
+                try:
+                    if content and len(content.strip()) > 50:
+                        # Successfully scraped
+                        print(f"  ✅ Scraped {len(content)} characters")
+                        
+                        # Update the database (full text goes to the content store)
+                        client.save_full_content(content, article_id=row.id, writer=writer)
+                        
+                        successes += 1
+                        saved_ids.append(row.id)
+                        
+                    else:
+                        # Failed to scrape
+                        print(f"  ❌ No content extracted")
+                        
+                        # Log the error
+                        client.save_scrape_error("No content extracted", article_id=row.id, writer=writer,
+                                                 extra_fields={'text_scraped': ('BOOL', False),
+                                                               'text_scraped_at': ('TIMESTAMP', now())})
+                        
+                        failures += 1
                 
-                failures += 1
-        
-        except Exception as e:
-            print(f"  ❌ Error: {str(e)[:60]}")
-            
-            # Log the error
-            try:
-                update_query = """
-                UPDATE `media-455519.mediatracker.mediatracker`
-                SET text_scraped = false,
-                    text_scrape_error = @error,
-                    text_scraped_at = @scraped_at
-                WHERE id = @id
-                """
+                except Exception as e:
+                    print(f"  ❌ Error: {str(e)[:60]}")
+                    
+                    # Log the error
+                    try:
+                        client.save_scrape_error(str(e)[:500], article_id=row.id, writer=writer,
+                                                 extra_fields={'text_scraped': ('BOOL', False),
+                                                               'text_scraped_at': ('TIMESTAMP', now())})
+                    except:
+                        pass
+                    
+                    failures += 1
                 
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("error", "STRING", str(e)[:500]),
-                        bigquery.ScalarQueryParameter("scraped_at", "STRING", datetime.now().isoformat()),
-                        bigquery.ScalarQueryParameter("id", "INT64", int(row.id))
-                    ]
-                )
-                job = client.client.query(update_query, job_config=job_config)
-                job.result()
-            except:
-                pass
+                # Progress update every 50 URLs
+                if i % 50 == 0:
+                    success_rate = (successes / i) * 100
+                    print(f"\n📊 Progress Update:")
+                    print(f"   Processed: {i}/{total} ({i/total*100:.1f}%)")
+                    print(f"   Success rate: {success_rate:.1f}%")
+                    print(f"   Time elapsed: {elapsed/60:.1f} minutes")
             
-            failures += 1
-        
-        # Polite delay between requests (1 second)
-        if i < total:
-            time.sleep(1)
-        
-        # Progress update every 50 URLs
-        if i % 50 == 0:
-            success_rate = (successes / i) * 100
-            print(f"\n📊 Progress Update:")
-            print(f"   Processed: {i}/{total} ({i/total*100:.1f}%)")
-            print(f"   Success rate: {success_rate:.1f}%")
-            print(f"   Time elapsed: {elapsed/60:.1f} minutes")
+            # Write this chunk before scraping the next
+            writer.flush()
+    
+    # Scraped pages whose update could not be written are not saved
+    unsaved = [article_id for article_id in saved_ids if article_id in set(writer.failed)]
+    if unsaved:
+        print(f"⚠️ {len(unsaved)} scraped articles could not be saved")
+        successes -= len(unsaved)
+        failures += len(unsaved)
+    
+    total = processed
+    if not total:
+        print("✅ No unscraped URLs left to scrape.")
+        return
     
     # Final summary
     total_time = time.time() - start_time
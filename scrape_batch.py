@@ -5,9 +5,8 @@ Batch scraping script - processes URLs in smaller batches
 import sys
 from bigquery_client import BigQueryClient
 from web_scraper import get_website_text_content
-import time
-from datetime import datetime
-from google.cloud import bigquery
+from scrape_engine import scrape_many
+from batch_writer import BatchWriter, now
 
 def scrape_batch(batch_size=100):
     """Scrape a batch of unscraped URLs"""
@@ -35,61 +34,41 @@ def scrape_batch(batch_size=100):
     
     successes = 0
     failures = 0
+    saved_ids = []
     
-    for i, row in enumerate(results, 1):
-        print(f"[{i}/{total}] ID {row.id}", flush=True)
-        print(f"  {row.url[:70]}...", flush=True)
-        
-        try:
-            content = get_website_text_content(row.url)
+    # Scrape the whole batch concurrently - per-domain limits keep it polite
+    contents = scrape_many([row.url for row in results], scrape_fn=get_website_text_content)
+    
+    # Row updates are buffered and applied with one MERGE per batch
+    with BatchWriter(client.client) as writer:
+        for i, (row, content) in enumerate(zip(results, contents), 1):
+            print(f"[{i}/{total}] ID {row.id}", flush=True)
+            print(f"  {row.url[:70]}...", flush=True)
+            
+            try:
+                if content and len(content.strip()) > 50:
+                    print(f"  ✅ {len(content)} chars", flush=True)
+                    
+                    client.save_full_content(content, article_id=row.id, writer=writer)
+                    successes += 1
+                    saved_ids.append(row.id)
+                    
+                else:
+                    print(f"  ❌ No content", flush=True)
+                    
+                    client.save_scrape_error("No content extracted", article_id=row.id, writer=writer,
+                                             extra_fields={'text_scraped': ('BOOL', False),
+                                                           'text_scraped_at': ('TIMESTAMP', now())})
+                    failures += 1
             
-            if content and len(content.strip()) > 50:
-                print(f"  ✅ {len(content)} chars", flush=True)
-                
-                update_query = """
-                UPDATE `media-455519.mediatracker.mediatracker`
-                SET content = @content,
-                    text_scraped = true,
-                    text_scraped_at = @scraped_at
-                WHERE id = @id
-                """
-                
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("content", "STRING", content),
-                        bigquery.ScalarQueryParameter("scraped_at", "STRING", datetime.now().isoformat()),
-                        bigquery.ScalarQueryParameter("id", "INT64", int(row.id))
-                    ]
-                )
-                client.client.query(update_query, job_config=job_config).result()
-                successes += 1
-                
-            else:
-                print(f"  ❌ No content", flush=True)
-                
-                update_query = """
-                UPDATE `media-455519.mediatracker.mediatracker`
-                SET text_scraped = false,
-                    text_scrape_error = @error,
-                    text_scraped_at = @scraped_at
-                WHERE id = @id
-                """
-                
-                job_config = bigquery.QueryJobConfig(
-                    query_parameters=[
-                        bigquery.ScalarQueryParameter("error", "STRING", "No content extracted"),
-                        bigquery.ScalarQueryParameter("scraped_at", "STRING", datetime.now().isoformat()),
-                        bigquery.ScalarQueryParameter("id", "INT64", int(row.id))
-                    ]
-                )
-                client.client.query(update_query, job_config=job_config).result()
+            except Exception as e:
+                print(f"  ❌ Error: {str(e)[:50]}", flush=True)
                 failures += 1
-        
-        except Exception as e:
-            print(f"  ❌ Error: {str(e)[:50]}", flush=True)
-            failures += 1
-        
-        time.sleep(0.5)  # Small delay
+    
+    # Scraped pages whose update could not be written are not saved
+    unsaved = [article_id for article_id in saved_ids if article_id in set(writer.failed)]
+    successes -= len(unsaved)
+    failures += len(unsaved)
     
     return successes, failures
 
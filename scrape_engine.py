@@ -0,0 +1,172 @@
+"""
+Concurrent scraping engine.
+
+Runs the blocking scrape functions from web_scraper (scrape_article_data_fast,
+scrape_light, get_website_text_content) for many URLs at once on an asyncio
+loop. A global cap bounds the total number of in-flight scrapes and a
+per-domain cap bounds how many run against one site at once; the pace of
+requests to each host is set by fetcher's adaptive rate limiter
+(rate_limiter), replacing the fixed time.sleep() between URLs that the
+batch scripts used to do.
+
+Scripts and app.py call the sync wrappers (scrape_many / scrape_many_light)
+with a list of URLs and get results back in input order. When the scrape
+function supports it, extraction runs in the extraction_pool worker
+processes so parsing uses every core and a pathological page times out
+instead of stalling the batch.
+"""
+
+import asyncio
+import functools
+import inspect
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import extraction_pool
+import fetcher
+import firecrawl_client
+from web_scraper import (
+    scrape_article_data_fast, scrape_light, get_website_text_content,
+    extract_domain_from_url, is_paywall_domain, scrape_many_with_firecrawl,
+)
+
+# Total number of URLs scraped at the same time
+DEFAULT_CONCURRENCY = int(os.environ.get('SCRAPE_CONCURRENCY', '64'))
+
+# URLs scraped at the same time against any single domain
+DEFAULT_PER_DOMAIN = int(os.environ.get('SCRAPE_PER_DOMAIN', '2'))
+
+# Scrape functions that send paywalled URLs to Firecrawl first
+FIRECRAWL_FIRST = (scrape_article_data_fast, get_website_text_content)
+
+# Run extraction in worker processes (set SCRAPE_EXTRACTION_POOL=off to parse in-thread)
+USE_EXTRACTION_POOL = os.environ.get('SCRAPE_EXTRACTION_POOL', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+
+async def scrape_many_async(urls, scrape_fn=scrape_article_data_fast, args=None,
+                            concurrency=DEFAULT_CONCURRENCY, per_domain=DEFAULT_PER_DOMAIN,
+                            on_result=None):
+    """
+    Scrape all URLs concurrently and return results in input order.
+
+    scrape_fn is called as scrape_fn(url, *args[i]) on a worker thread.
+    A scrape that raises yields None for that URL.
+    on_result(index, url, result) is called on the loop thread as each URL finishes.
+    """
+    loop = asyncio.get_running_loop()
+    global_slots = asyncio.Semaphore(concurrency)
+    domain_slots = {}
+    results = [None] * len(urls)
+
+    def slot_for(url):
+        domain = extract_domain_from_url(url)
+        if domain not in domain_slots:
+            domain_slots[domain] = asyncio.Semaphore(per_domain)
+        return domain_slots[domain]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+
+        async def run_one(index, url):
+            extra_args = tuple(args[index]) if args else ()
+            slot = slot_for(url)
+            # Take the domain slot first so a slow domain never sits on global slots
+            async with slot:
+                async with global_slots:
+                    try:
+                        result = await loop.run_in_executor(executor, scrape_fn, url, *extra_args)
+                    except Exception:
+                        result = None
+            results[index] = result
+            if on_result:
+                on_result(index, url, result)
+
+        await asyncio.gather(*(run_one(i, url) for i, url in enumerate(urls)))
+
+    return results
+
+
+def _run(coro):
+    """Run a coroutine to completion, even if this thread already has a running loop"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    # Called from inside an event loop - run on a helper thread instead
+    outcome = {}
+
+    def runner():
+        try:
+            outcome['result'] = asyncio.run(coro)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def _with_extraction_pool(scrape_fn):
+    """Bind the shared extraction pool if scrape_fn takes an extractor argument"""
+    try:
+        accepts_extractor = 'extractor' in inspect.signature(scrape_fn).parameters
+    except (TypeError, ValueError):
+        accepts_extractor = False
+    if not accepts_extractor:
+        return scrape_fn
+    return functools.partial(scrape_fn, extractor=extraction_pool.get_pool().extract)
+
+
+def _prefetch_paywalled(urls):
+    """
+    Send all paywalled URLs to Firecrawl as one batch job up front. The
+    per-URL scrapes then read the cached results instead of queueing behind
+    the per-domain cap one Firecrawl call at a time.
+    """
+    paywalled = [url for url in urls if is_paywall_domain(url)]
+    if len(paywalled) > 1 and firecrawl_client.is_configured():
+        scrape_many_with_firecrawl(paywalled)
+
+
+def scrape_many(urls, scrape_fn=scrape_article_data_fast, args=None,
+                concurrency=DEFAULT_CONCURRENCY, per_domain=DEFAULT_PER_DOMAIN,
+                on_result=None, use_extraction_pool=USE_EXTRACTION_POOL):
+    """
+    Sync wrapper around scrape_many_async for scripts and Streamlit.
+    Returns one result per URL, in the same order as urls.
+    """
+    urls = list(urls)
+    if not urls:
+        return []
+
+    # Keep enough pooled connections per host for the per-domain cap
+    fetcher.ensure_pool_maxsize(per_domain)
+
+    # A new batch may retry URLs Firecrawl had nothing for last time
+    firecrawl_client.reset_run_state()
+
+    if scrape_fn in FIRECRAWL_FIRST:
+        _prefetch_paywalled(urls)
+
+    if use_extraction_pool:
+        scrape_fn = _with_extraction_pool(scrape_fn)
+
+    return _run(scrape_many_async(
+        urls,
+        scrape_fn=scrape_fn,
+        args=args,
+        concurrency=max(1, min(concurrency, len(urls))),
+        per_domain=per_domain,
+        on_result=on_result,
+    ))
+
+
+def scrape_many_light(urls, brands=None, **kwargs):
+    """scrape_light for many URLs; brands, if given, is one brand per URL"""
+    urls = list(urls)
+    args = [(brand or '',) for brand in brands] if brands else None
+    return scrape_many(urls, scrape_fn=scrape_light, args=args, **kwargs)
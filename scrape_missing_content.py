@@ -4,12 +4,14 @@ Run this to scrape all articles with empty/missing content.
 """
 from google.cloud import bigquery
 import os
-import time
 
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = 'attached_assets/media-455519-e05e80608e53.json'
 client = bigquery.Client(project='media-455519')
 
 from web_scraper import scrape_article_data_fast
+import circuit_breaker
+import rate_limiter
+from batch_writer import BatchWriter
 
 def get_articles_needing_scrape(limit=100):
     """Get articles that need content scraping"""
@@ -24,27 +26,14 @@ def get_articles_needing_scrape(limit=100):
     """
     return list(client.query(query).result())
 
-def update_article_content(article_id, content, domain):
-    """Update article with scraped content"""
+def update_article_content(article_id, content, domain, writer=None):
+    """Update article with scraped content (buffered when a BatchWriter is given)"""
     # Ensure domain exists in media_data
     from bigquery_client import BigQueryClient
     bq = BigQueryClient()
     bq.ensure_domain_in_media_data(domain)
     
-    update_query = """
-    UPDATE `media-455519.mediatracker.mediatracker`
-    SET content = @content,
-        text_scraped = TRUE,
-        text_scraped_at = CURRENT_TIMESTAMP()
-    WHERE id = @id
-    """
-    job_config = bigquery.QueryJobConfig(
-        query_parameters=[
-            bigquery.ScalarQueryParameter("content", "STRING", content),
-            bigquery.ScalarQueryParameter("id", "INT64", article_id)
-        ]
-    )
-    client.query(update_query, job_config=job_config).result()
+    bq.save_full_content(content, article_id=article_id, writer=writer)
 
 def main():
     print("=== BATCH CONTENT SCRAPER ===\n")
@@ -72,30 +61,37 @@ def main():
             
         print(f"Processing batch of {len(articles)} articles...")
         
-        for i, article in enumerate(articles):
-            try:
-                print(f"  [{i+1}/{len(articles)}] ID {article.id}: {article.domain[:30]}...", end=" ")
-                
-                result = scrape_article_data_fast(article.url)
-                
-                if result and result.get('content') and len(result['content'].strip()) > 50:
-                    content = result['content']
-                    # Truncate if too long
-                    if len(content) > 1000000:
-                        content = content[:1000000] + "... [truncated]"
+        saved_ids = []
+        # Row updates are applied with one MERGE when the batch is done, before the next fetch
+        with BatchWriter(client) as writer:
+            for i, article in enumerate(articles):
+                try:
+                    print(f"  [{i+1}/{len(articles)}] ID {article.id}: {article.domain[:30]}...", end=" ")
                     
-                    update_article_content(article.id, content, article.domain)
-                    success_count += 1
-                    print("✅")
-                else:
-                    fail_count += 1
-                    print("❌ (no content)")
+                    result = scrape_article_data_fast(article.url)
                     
-            except Exception as e:
-                fail_count += 1
-                print(f"❌ ({str(e)[:30]})")
-            
-            time.sleep(0.5)  # Rate limiting
+                    if result and result.get('content') and len(result['content'].strip()) > 50:
+                        content = result['content']
+                        # Truncate if too long
+                        if len(content) > 1000000:
+                            content = content[:1000000] + "... [truncated]"
+                        
+                        update_article_content(article.id, content, article.domain, writer=writer)
+                        success_count += 1
+                        saved_ids.append(article.id)
+                        print("✅")
+                    else:
+                        fail_count += 1
+                        print("❌ (no content)")
+                        
+                except Exception as e:
+                    fail_count += 1
+                    print(f"❌ ({str(e)[:30]})")
+        
+        # Scraped pages whose update could not be written are not saved
+        unsaved = [article_id for article_id in saved_ids if article_id in set(writer.failed)]
+        success_count -= len(unsaved)
+        fail_count += len(unsaved)
         
         print(f"\nBatch complete. Success: {success_count}, Failed: {fail_count}")
         print(f"Remaining: ~{total - success_count - fail_count}\n")
@@ -108,6 +104,8 @@ def main():
     print(f"\n=== SCRAPING COMPLETE ===")
     print(f"Success: {success_count}")
     print(f"Failed: {fail_count}")
+    circuit_breaker.print_report()
+    rate_limiter.print_metrics()
     
     # Run enrichment procedure
     print("\nRunning bulk enrichment procedure...")
@@ -5,7 +5,6 @@ Test script to scrape unscraped URLs from the database
 
 from bigquery_client import BigQueryClient
 from web_scraper import get_website_text_content
-import time
 from datetime import datetime
 
 def test_scraping(num_urls=5):
@@ -94,10 +93,6 @@ def test_scraping(num_urls=5):
             job.result()
             
             failures += 1
-        
-        # Small delay to be polite
-        if i < len(results):
-            time.sleep(1)
     
     print(f"\n{'='*80}")
     print(f"SCRAPING TEST COMPLETE")
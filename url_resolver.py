@@ -0,0 +1,143 @@
+"""
+Redirect and canonical-URL resolution ahead of dedupe.
+
+Syften tweets carry t.co and other short links, Wizikey CSVs mix http://
+and tracking-parameter variants, and aggregators link through redirects,
+so one article can arrive under several URLs. resolve() follows the
+redirects once and reads <link rel="canonical"> from the page head
+(fetcher.fetch_head), giving every variant the same resolved URL.
+
+- Results are kept in http_cache under the 'resolved' namespace for
+  URL_RESOLVER_TTL seconds (default 7 days), so a URL costs one request
+  per TTL, across runs. Failures are not cached.
+- resolve_many() resolves a batch on URL_RESOLVER_WORKERS threads.
+- canonical_key() is the dedupe key: the resolved URL through
+  BigQueryClient-style normalization (https, no www., no trailing slash)
+  with fragments and tracking parameters dropped.
+- URL_RESOLVER=off skips the network; every URL resolves to itself.
+"""
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+import http_cache
+from fetcher import fetch_head, declared_encoding
+
+ENABLED = os.environ.get('URL_RESOLVER', 'on').lower() not in ('0', 'off', 'false', 'no')
+
+# Seconds a resolution stays valid
+RESOLVER_TTL = int(os.environ.get('URL_RESOLVER_TTL', str(7 * 24 * 3600)))
+
+# Threads for resolve_many
+RESOLVER_WORKERS = int(os.environ.get('URL_RESOLVER_WORKERS', '16'))
+
+RESOLVE_TIMEOUT = 8
+
+CACHE_NAMESPACE = 'resolved'
+
+CANONICAL_PATTERNS = [
+    re.compile(r'<link[^>]*?\brel=["\']?canonical["\']?[^>]*?\bhref=["\']([^"\'>]+)["\']', re.IGNORECASE),
+    re.compile(r'<link[^>]*?\bhref=["\']([^"\'>]+)["\'][^>]*?\brel=["\']?canonical\b', re.IGNORECASE),
+]
+
+
+def _with_scheme(url: str) -> str:
+    url = (url or '').strip()
+    if url.startswith('/') and len(url) > 1:
+        url = url[1:]
+    if url and not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def canonical_key(url: str) -> str:
+    """Dedupe key for a URL: https, no www., no trailing slash, fragment or tracking params"""
+    parts = urlsplit(_with_scheme(url))
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path.rstrip('/')
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith(http_cache.TRACKING_PARAMS)]
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+def find_canonical(html: str, base_url: str):
+    """Absolute <link rel=canonical> href from page HTML, or None if missing or implausible"""
+    for pattern in CANONICAL_PATTERNS:
+        match = pattern.search(html)
+        if match:
+            break
+    else:
+        return None
+
+    canonical = urljoin(base_url, match.group(1).strip().replace('&amp;', '&'))
+    parts = urlsplit(canonical)
+    if parts.scheme not in ('http', 'https') or not parts.netloc:
+        return None
+    # Some sites point every page's canonical at the homepage - that would merge unrelated articles
+    if parts.path.strip('/') == '' and urlsplit(base_url).path.strip('/') != '':
+        return None
+    return canonical
+
+
+def _resolve_uncached(url: str) -> dict:
+    final_url, canonical, error = url, None, None
+    try:
+        response = fetch_head(url, timeout=RESOLVE_TIMEOUT, full_head=True)
+        final_url = response.url or url
+        encoding = declared_encoding(response) or 'utf-8'
+        canonical = find_canonical(response.content.decode(encoding, errors='replace'), final_url)
+    except Exception as e:
+        # Redirects were still followed for HTTP errors and non-HTML pages
+        response = getattr(e, 'response', None)
+        if response is not None and response.url:
+            final_url = response.url
+        else:
+            error = str(e)[:200]
+    return {
+        'url': url,
+        'final_url': final_url,
+        'canonical_url': canonical,
+        'resolved_url': canonical or final_url,
+        'error': error,
+    }
+
+
+def resolve(url: str, refresh: bool = False) -> dict:
+    """
+    {'url', 'final_url', 'canonical_url', 'resolved_url', 'key', 'error'}
+    for one URL. resolved_url is the canonical link if the page has one,
+    else where the redirects ended; key is canonical_key(resolved_url).
+    """
+    url = _with_scheme(url)
+    result = None
+    if ENABLED and url:
+        if not refresh and http_cache.ENABLED:
+            try:
+                result = http_cache.lookup_document(CACHE_NAMESPACE, url, ttl=RESOLVER_TTL)
+            except Exception:
+                result = None
+        if result is None:
+            result = _resolve_uncached(url)
+            if not result['error'] and http_cache.ENABLED:
+                try:
+                    http_cache.store_document(CACHE_NAMESPACE, url, result)
+                except Exception:
+                    pass
+    if result is None:
+        result = {'url': url, 'final_url': url, 'canonical_url': None, 'resolved_url': url, 'error': None}
+    result['key'] = canonical_key(result['resolved_url'])
+    return result
+
+
+def resolve_many(urls, workers: int = RESOLVER_WORKERS, refresh: bool = False) -> dict:
+    """resolve() for many URLs concurrently, as {input url: result}"""
+    unique = list(dict.fromkeys(url for url in urls if url))
+    if not unique:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(unique)))) as executor:
+        results = list(executor.map(lambda url: resolve(url, refresh), unique))
+    return dict(zip(unique, results))
@@ -1,10 +1,17 @@
 import trafilatura
 from urllib.parse import urlparse
-import requests
+from fetcher import fetch, fetch_head, declared_encoding, CircuitOpenError
+from trafilatura.utils import decode_file
+from date_extraction import find_publish_date
+from brand_snippets import SENTENCE_SPLIT, select_snippet, get_matcher
+from near_duplicates import fingerprint
 from datetime import datetime
 import dateutil.parser
 import os
 import re
+import time
+import json
+from functools import cached_property, lru_cache
 
 try:
     import streamlit as st
@@ -13,15 +20,14 @@ except ImportError:
     HAS_STREAMLIT = False
     st = None
 
-try:
-    from firecrawl import FirecrawlApp
-    HAS_FIRECRAWL = True
-except ImportError:
-    HAS_FIRECRAWL = False
-    FirecrawlApp = None
+import firecrawl_client
+import circuit_breaker
+import render_tier
+import routing
+from firecrawl_client import HAS_FIRECRAWL
 
 # Firecrawl API for paywalled content
-FIRECRAWL_API_KEY = os.environ.get('FIRECRAWL_API_KEY', '')
+FIRECRAWL_API_KEY = firecrawl_client.FIRECRAWL_API_KEY
 
 # Maximum content length to avoid BigQuery/Streamlit display issues
 MAX_CONTENT_LENGTH = 50000
@@ -49,6 +55,17 @@ PAYWALL_DOMAINS = [
     'sifted.eu',
 ]
 
+# Markdown cleanup (clean_markdown_content)
+MARKDOWN_LINK_PATTERN = re.compile(r'\[([^\]]+)\]\([^)]+\)')
+MARKDOWN_IMAGE_PATTERN = re.compile(r'!\[[^\]]*\]\([^)]+\)')
+BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+
+# Per-domain skip/end rule packs for clean_markdown_content
+CLEANING_RULES_PATH = os.environ.get(
+    'CLEANING_RULES_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cleaning_rules.json')
+)
+
 def _warn(msg):
     if HAS_STREAMLIT and st:
         try:
@@ -63,164 +80,183 @@ def is_paywall_domain(url: str) -> bool:
     domain = extract_domain_from_url(url)
     return any(paywall in domain for paywall in PAYWALL_DOMAINS)
 
-def clean_markdown_content(content: str) -> str:
+class _RulePack:
+    """Skip/end patterns from one or more packs, compiled into one alternation each"""
+
+    def __init__(self, skip_patterns, end_patterns):
+        self.skip = _compile_literals(skip_patterns)
+        self.end = _compile_literals(end_patterns)
+
+def _compile_literals(patterns):
+    """
+    One regex matching any of the literal patterns, so a single scan of the
+    text finds every hit instead of one substring test per pattern per line
+    """
+    patterns = sorted(set(p for p in patterns if p), key=len, reverse=True)
+    if not patterns:
+        return None
+    return re.compile('|'.join(re.escape(p) for p in patterns))
+
+def _load_cleaning_rules() -> dict:
+    try:
+        with open(CLEANING_RULES_PATH, encoding='utf-8') as f:
+            rules = json.load(f)
+    except Exception as e:
+        _warn(f"Could not load cleaning rules from {CLEANING_RULES_PATH}: {str(e)}")
+        return {'default': {}}
+    return {name: pack for name, pack in rules.items() if not name.startswith('_')}
+
+CLEANING_RULES = _load_cleaning_rules()
+
+@lru_cache(maxsize=256)
+def _rules_for(domain: str) -> _RulePack:
+    """default pack plus the packs for domain and its parents; every pack when domain is empty"""
+    packs = CLEANING_RULES
+    if domain:
+        selected = [pack for name, pack in packs.items()
+                    if name == 'default' or domain == name or domain.endswith('.' + name)]
+    else:
+        selected = list(packs.values())
+    skip_patterns, end_patterns = [], []
+    for pack in selected:
+        skip_patterns.extend(pack.get('skip_patterns', []))
+        end_patterns.extend(pack.get('end_patterns', []))
+    return _RulePack(skip_patterns, end_patterns)
+
+def clean_markdown_content(content: str, url: str = "") -> str:
     """
     Clean up scraped markdown content by removing navigation, ads, 
     subscription prompts, job listings, and other website chrome.
+    Site-specific rules come from cleaning_rules.json; pass the page url to
+    apply only the packs for its domain (all packs apply without one).
     """
     if not content:
         return ""
     
-    lines = content.split('\n')
+    domain = extract_domain_from_url(url) if url else ""
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    rules = _rules_for(domain)
+    
+    # Everything from the first line with an end pattern onwards is dropped
+    end = rules.end.search(content) if rules.end else None
+    if end:
+        lines = content[:content.rfind('\n', 0, end.start()) + 1].split('\n')[:-1]
+        content = '\n'.join(lines)
+    else:
+        lines = content.split('\n')
+    
+    # Start offsets of lines containing any skip pattern - one scan of the whole text
+    skip_starts = set()
+    if rules.skip:
+        for match in rules.skip.finditer(content):
+            skip_starts.add(content.rfind('\n', 0, match.start()) + 1)
+    
     cleaned_lines = []
-    skip_section = False
     article_started = False
-    
-    # Patterns to skip (navigation, ads, etc.)
-    skip_patterns = [
-        '- [Premium]',
-        '- [Visuals]',
-        '- [News]',
-        '- [Paid Partnership]',
-        '- [Press Releases]',
-        '- More',
-        '[Free newsletter]',
-        '[Subscribe]',
-        'Tired of ads?',
-        'signing up',
-        'Premium Content',
-        'It takes our newsroom',
-        "You can't find them",
-        'anywhere else',
-        'This is premium content',
-        'Subscribe to read',
-        'We know this is not ideal',
-        'Sign up in 20 seconds',
-        'Cancel anytime',
-        'For learners',
-        'For professionals',
-        'Best value',
-        'Billed annually',
-        'Get instant access',
-        'premium content',
-        'Unlimited news content',
-        'Unlimited company database',
-        'Ad-free reading',
-        'Just US$',
-        '[Compare]',
-        '[Subscribe now',
-        'Already a subscriber',
-        '[Log in Here]',
-        'Our subscriber community',
-        '### [🏆 Premium',
-        '### [💼 Latest Jobs',
-        '📅 Upcoming Events',
-        'More articles ↓',
-        'NextPrev',
-        'Featured',
-        'TIA Writer',
-        '· 2d ago ·',
-        '· 1d ago ·',
-        '· 3d ago ·',
-        'min read',
-    ]
-    
-    # Patterns that indicate end of article content
-    end_patterns = [
-        '## Stay ahead in Asia',
-        'This is premium content. Subscribe',
-        '### [🏆 Premium Content]',
-        '### [💼 Latest Jobs]',
-    ]
+    offset = 0
     
     for line in lines:
+        line_start = offset
+        offset += len(line) + 1
         stripped = line.strip()
         
-        # Check if we've hit end of article
-        if any(pattern in line for pattern in end_patterns):
-            break
-        
         # Skip empty lines at the start
         if not article_started and not stripped:
             continue
         
-        # Skip navigation and chrome
-        if any(pattern in line for pattern in skip_patterns):
+        # Skip navigation, chrome and site-specific junk
+        if line_start in skip_starts:
             continue
         
-        # Skip image-only lines (markdown images without text)
-        if stripped.startswith('![') and stripped.endswith(')') and len(stripped) < 200:
-            # Allow images with captions (longer lines)
-            if '/' not in stripped[3:50]:  # Skip if it looks like a nav image
-                continue
-        
-        # Skip lines that are just links
-        if stripped.startswith('[') and stripped.endswith(')') and '](' in stripped:
-            link_text = stripped.split('](')[0][1:]
-            if len(link_text) < 50:  # Short link text = likely navigation
+        if stripped:
+            # Skip image-only lines (markdown images without text), unless they look like captions
+            if stripped.startswith('![') and stripped.endswith(')') and len(stripped) < 200:
+                if '/' not in stripped[3:50]:
+                    continue
+            
+            # Skip lines that are just short links (likely navigation)
+            if stripped.startswith('[') and stripped.endswith(')') and '](' in stripped:
+                if len(stripped.split('](', 1)[0]) - 1 < 50:
+                    continue
+            
+            # Skip lines with multiple navigation-style links
+            if stripped.count('](http') > 2:
                 continue
-        
-        # Skip lines with multiple navigation-style links
-        if stripped.count('](http') > 2:
-            continue
-        
-        # Skip job listings
-        if '**Mandarin Teacher**' in line or '**Online Sales' in line or 'IDR ' in line:
-            continue
-        
-        # Detect article start (headline)
-        if stripped.startswith('# ') and not article_started:
+            
             article_started = True
         
-        # Add valid content
-        if stripped or article_started:
-            cleaned_lines.append(line)
-            if stripped:
-                article_started = True
+        cleaned_lines.append(line)
     
-    # Join and clean up extra whitespace
     result = '\n'.join(cleaned_lines)
     
-    # Remove multiple consecutive blank lines
-    while '\n\n\n' in result:
-        result = result.replace('\n\n\n', '\n\n')
-    
-    # Remove markdown link syntax, keep just the text
-    # [text](url) -> text
-    result = re.sub(r'\[([^\]]+)\]\([^)]+\)', r'\1', result)
+    # Remove markdown link syntax, keep just the text: [text](url) -> text
+    result = MARKDOWN_LINK_PATTERN.sub(r'\1', result)
     
     # Remove image references
-    result = re.sub(r'!\[[^\]]*\]\([^)]+\)', '', result)
+    result = MARKDOWN_IMAGE_PATTERN.sub('', result)
     
     # Clean up any remaining Base64 image references
-    result = re.sub(r'<Base64-Image-Removed>', '', result)
+    result = result.replace('<Base64-Image-Removed>', '')
     
     # Remove duplicate title (non-heading version before the # heading)
     lines = result.split('\n')
     if len(lines) > 2:
-        # Find the main headline
         for i, line in enumerate(lines):
-            if line.strip().startswith('# '):
-                headline = line.strip()[2:].strip()
-                # Check if previous non-empty lines match the headline
-                new_lines = []
-                for j, l in enumerate(lines):
-                    if j < i and l.strip() == headline:
-                        continue  # Skip duplicate title
-                    new_lines.append(l)
-                result = '\n'.join(new_lines)
+            stripped = line.strip()
+            if stripped.startswith('# '):
+                headline = stripped[2:].strip()
+                before = [l for l in lines[:i] if l.strip() != headline]
+                if len(before) != i:
+                    result = '\n'.join(before + lines[i:])
                 break
     
-    # Remove multiple consecutive blank lines again
-    while '\n\n\n' in result:
-        result = result.replace('\n\n\n', '\n\n')
+    # Collapse runs of blank lines once, at the end
+    result = BLANK_LINES_PATTERN.sub('\n\n', result)
     
     return result.strip()
 
+def _firecrawl_result(raw: dict, url: str = "") -> dict:
+    """Clean a raw Firecrawl result into content/title/publish_date, or None if empty"""
+    if not raw:
+        return None
+    
+    # Clean up the content
+    content = clean_markdown_content(raw['markdown'], url)
+    
+    title = raw['title'] or ''
+    publish_date = datetime.now().strftime('%Y-%m-%d')
+    
+    pub_time = raw['published_time']
+    if pub_time:
+        try:
+            parsed_date = dateutil.parser.parse(pub_time)
+            publish_date = parsed_date.strftime('%Y-%m-%d')
+        except:
+            pass
+    
+    if publish_date == datetime.now().strftime('%Y-%m-%d'):
+        mod_time = raw['modified_time']
+        if mod_time:
+            try:
+                parsed_date = dateutil.parser.parse(mod_time)
+                publish_date = parsed_date.strftime('%Y-%m-%d')
+            except:
+                pass
+    
+    if content:
+        return {
+            'content': truncate_content(content),
+            'title': title,
+            'publish_date': publish_date
+        }
+    return None
+
 def scrape_with_firecrawl(url: str) -> dict:
     """
     Use Firecrawl API to scrape paywalled content.
     Returns dict with 'content', 'title', 'publish_date' or None on failure.
+    Results are cached, and a URL is sent to Firecrawl at most once per run.
     """
     if not FIRECRAWL_API_KEY:
         _warn("Firecrawl API key not configured")
@@ -231,111 +267,261 @@ def scrape_with_firecrawl(url: str) -> dict:
         return None
     
     try:
-        app = FirecrawlApp(api_key=FIRECRAWL_API_KEY)
-        
-        result = app.scrape(url, formats=['markdown'])
-        
-        if result:
-            raw_content = result.markdown if hasattr(result, 'markdown') else ''
-            metadata = result.metadata if hasattr(result, 'metadata') else None
-            
-            # Clean up the content
-            content = clean_markdown_content(raw_content)
-            
-            title = ''
-            publish_date = datetime.now().strftime('%Y-%m-%d')
-            
-            if metadata:
-                title = metadata.title or getattr(metadata, 'og_title', '') or ''
-                pub_time = getattr(metadata, 'published_time', None) or getattr(metadata, 'publishedTime', None) or getattr(metadata, 'og_published_time', None) or getattr(metadata, 'article:published_time', None)
-                if pub_time:
-                    try:
-                        parsed_date = dateutil.parser.parse(pub_time)
-                        publish_date = parsed_date.strftime('%Y-%m-%d')
-                    except:
-                        pass
-                
-                if publish_date == datetime.now().strftime('%Y-%m-%d'):
-                    mod_time = getattr(metadata, 'modified_time', None) or getattr(metadata, 'modifiedTime', None)
-                    if mod_time:
-                        try:
-                            parsed_date = dateutil.parser.parse(mod_time)
-                            publish_date = parsed_date.strftime('%Y-%m-%d')
-                        except:
-                            pass
-            
-            if content:
-                return {
-                    'content': truncate_content(content),
-                    'title': title,
-                    'publish_date': publish_date
-                }
-        
-        return None
-        
+        return _firecrawl_result(firecrawl_client.scrape_raw(url), url)
     except Exception as e:
         _warn(f"Firecrawl error: {str(e)}")
         return None
 
-def get_website_text_content(url: str) -> str:
+def scrape_many_with_firecrawl(urls) -> dict:
     """
-    This function takes a url and returns the main text content of the website.
-    Uses Firecrawl for paywalled sites, trafilatura for others.
+    Batch version of scrape_with_firecrawl: one Firecrawl batch job for all
+    uncached URLs. Returns {url: result or None}.
     """
+    urls = list(urls)
+    if not urls or not firecrawl_client.is_configured():
+        return {url: None for url in urls}
+    
     try:
-        # Check if this is a paywalled domain - use Firecrawl
-        if is_paywall_domain(url) and FIRECRAWL_API_KEY:
-            result = scrape_with_firecrawl(url)
-            if result and result.get('content'):
-                return result['content']
-        
-        # Standard scraping with trafilatura
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        
-        response = session.get(url, timeout=8)
-        response.raise_for_status()
-        
-        text = trafilatura.extract(response.text)
-        
-        # If content is too short and we have Firecrawl, try it as fallback
-        if (not text or len(text) < 100) and FIRECRAWL_API_KEY:
-            result = scrape_with_firecrawl(url)
-            if result and result.get('content') and len(result['content']) > len(text or ''):
-                return result['content']
-        
-        return text if text else ""
+        raw_results = firecrawl_client.scrape_raw_many(urls)
     except Exception as e:
-        # If standard scraping fails and we have Firecrawl, try it
-        if FIRECRAWL_API_KEY:
-            result = scrape_with_firecrawl(url)
-            if result and result.get('content'):
-                return result['content']
-        _warn(f"Could not scrape content from URL: {str(e)}")
-        return ""
+        _warn(f"Firecrawl batch error: {str(e)}")
+        return {url: None for url in urls}
+    return {url: _firecrawl_result(raw, url) for url, raw in raw_results.items()}
+
+class ParsedPage:
+    """
+    A downloaded page parsed exactly once.
+    Title, publish date, content, snippet and domain are all read from the
+    same lxml tree and cached on first access.
+    """
+
+    error = None
+
+    def __init__(self, html, url: str = "", encoding: str = None):
+        self.html = html
+        self.url = url
+        self.encoding = encoding
+
+    @classmethod
+    def from_response(cls, response, url: str = ""):
+        """Wrap the raw response bytes; they are decoded once, with the declared charset if any"""
+        return cls(response.content, url or response.url, declared_encoding(response))
+
+    @cached_property
+    def text(self) -> str:
+        """The page decoded once - shared by the lxml tree and the regex date probes"""
+        if not isinstance(self.html, bytes):
+            return self.html or ""
+        if self.encoding:
+            try:
+                return self.html.decode(self.encoding)
+            except (LookupError, UnicodeDecodeError):
+                pass
+        # UTF-8 fast path, then charset detection
+        return decode_file(self.html)
+
+    @cached_property
+    def tree(self):
+        try:
+            return trafilatura.load_html(self.text)
+        except Exception:
+            return None
+
+    @cached_property
+    def metadata(self):
+        if self.tree is None:
+            return None
+        try:
+            return trafilatura.extract_metadata(self.tree, default_url=self.url or None)
+        except Exception:
+            return None
+
+    @cached_property
+    def content(self) -> str:
+        if self.tree is None:
+            return ""
+        # extract() works on its own copy of the tree, so metadata stays intact
+        return trafilatura.extract(self.tree) or ""
+
+    @cached_property
+    def title(self) -> str:
+        return self.metadata.title if self.metadata and self.metadata.title else ""
+
+    @cached_property
+    def publish_date(self) -> str:
+        """Publish date, or today's date if the page has none"""
+        return self.found_publish_date or datetime.now().strftime('%Y-%m-%d')
+
+    @cached_property
+    def found_publish_date(self):
+        """Publish date, or None if the page has none"""
+        return _find_publish_date(self)
+
+    @cached_property
+    def domain(self) -> str:
+        return extract_domain_from_url(self.url)
+
+    def snippet(self, brand: str = "") -> str:
+        """Sentences mentioning Antler/brand, cached per brand"""
+        cache = self.__dict__.setdefault('_snippets', {})
+        if brand not in cache:
+            cache[brand] = build_snippet(self.content, brand)
+        return cache[brand]
+
+class ExtractedPage:
+    """
+    Result of an out-of-process extraction (see extraction_pool), exposing
+    the same fields as ParsedPage. error is set when extraction timed out or failed.
+    """
+
+    def __init__(self, result: dict, url: str = ""):
+        self.url = url
+        self.title = result.get('title') or ""
+        self.content = result.get('content') or ""
+        self.publish_date = result.get('publish_date') or datetime.now().strftime('%Y-%m-%d')
+        self.error = result.get('error')
+        self._snippets = {}
+
+    @property
+    def domain(self) -> str:
+        return extract_domain_from_url(self.url)
+
+    def snippet(self, brand: str = "") -> str:
+        if brand not in self._snippets:
+            self._snippets[brand] = build_snippet(self.content, brand)
+        return self._snippets[brand]
+
+def parse_html(html: bytes, url: str, encoding: str = None, extractor=None):
+    """
+    Parse page bytes in-thread (ParsedPage), or hand them to extractor -
+    e.g. extraction_pool.get_pool().extract - and wrap the result
+    """
+    if extractor is None:
+        return ParsedPage(html, url, encoding)
+    page = ExtractedPage(extractor(html, url, encoding), url)
+    if page.error:
+        _warn(f"Extraction failed for {url}: {page.error}")
+    return page
+
+def parse_response(response, url: str, extractor=None):
+    """parse_html for a fetched response, using its declared charset"""
+    return parse_html(response.content, url or response.url, declared_encoding(response), extractor)
+
+def render_page(url: str, extractor=None):
+    """
+    Render url in the headless browser (render_tier) and parse the resulting
+    HTML. None for error pages (non-2xx status) and pages where no article
+    container filled in, so their text is never taken for the article.
+    """
+    rendered = render_tier.render_html(url)
+    status = rendered.get('status')
+    if not rendered.get('rendered') or status is None or not 200 <= status < 300:
+        return None
+    return parse_html(rendered['html'].encode('utf-8'), url, 'utf-8', extractor)
+
+def _firecrawl_available() -> bool:
+    return bool(FIRECRAWL_API_KEY) and HAS_FIRECRAWL
+
+def _render_offered(url: str) -> bool:
+    """Render is opt-in: for RENDER_DOMAINS and domains where it has worked before"""
+    if not (render_tier.ENABLED and render_tier.HAS_PLAYWRIGHT):
+        return False
+    domain = extract_domain_from_url(url)
+    return render_tier.is_render_domain(domain) or routing.succeeded(domain, routing.RENDER)
+
+def _run_routed(url: str, attempts: dict, deferred=None):
+    """
+    Try scrape strategies in the order routing picks for this URL's domain.
+    attempts maps strategy name -> fn() returning (result, content, used_network).
+    Returns the first result with enough content, else the best partial result.
+    Outcomes that cost a network call are recorded for future routing.
+    While the domain's circuit breaker is open no strategy is tried (render
+    and Firecrawl included); the deferral is recorded and deferred(reason)
+    is returned instead, if given.
+    """
+    domain = extract_domain_from_url(url)
+    best, best_length, last_error = None, -1, None
+    
+    reason = circuit_breaker.deferral_reason(url)
+    strategies = [] if reason else routing.plan(url, available=list(attempts))
+    for strategy in strategies:
+        started = time.monotonic()
+        try:
+            result, content, used_network = attempts[strategy]()
+        except CircuitOpenError as e:
+            # The domain just tripped - don't spend fallbacks on it
+            reason = str(e)
+            break
+        except Exception as e:
+            result, content, used_network, last_error = None, None, True, e
+        length = len(content or '')
+        if used_network:
+            routing.record(domain, strategy, length >= routing.MIN_CONTENT_LENGTH,
+                           time.monotonic() - started, length)
+        if length >= routing.MIN_CONTENT_LENGTH:
+            return result
+        if result is not None and length > best_length:
+            best, best_length = result, length
+    
+    if best is None and reason:
+        circuit_breaker.record_deferral(url, reason)
+        return deferred(reason) if deferred else None
+    if best is None and last_error is not None:
+        _warn(f"Could not scrape content from URL: {str(last_error)}")
+    return best
+
+def _firecrawl_attempt(url: str):
+    """Routing attempt for Firecrawl: (result, content, used_network)"""
+    used_network = not firecrawl_client.is_known(url)
+    result = scrape_with_firecrawl(url)
+    return result, (result or {}).get('content'), used_network
+
+def get_website_text_content(url: str, extractor=None) -> str:
+    """
+    This function takes a url and returns the main text content of the website.
+    Uses trafilatura, the headless render tier or Firecrawl, whichever routing
+    expects to work for the domain.
+    """
+    def direct():
+        response = fetch(url, timeout=8)
+        text = parse_response(response, url, extractor).content
+        return text, text, not response.from_cache
+    
+    def render():
+        # The browser only starts once routing actually picks render
+        if not render_tier.is_available():
+            return None, None, False
+        page = render_page(url, extractor)
+        text = page.content if page is not None else None
+        return text, text, True
+    
+    def firecrawl():
+        _, content, used_network = _firecrawl_attempt(url)
+        return content, content, used_network
+    
+    attempts = {routing.DIRECT: direct}
+    if _render_offered(url):
+        attempts[routing.RENDER] = render
+    if _firecrawl_available():
+        attempts[routing.FIRECRAWL] = firecrawl
+    
+    text = _run_routed(url, attempts)
+    return text if text else ""
 
 def get_article_title(url: str) -> str:
     """
     Extract the title/headline from the article URL - optimized single request
     """
     try:
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        response = fetch(url, timeout=8)
+        page = ParsedPage.from_response(response, url)
         
-        response = session.get(url, timeout=8)
-        response.raise_for_status()
+        # Metadata title first
+        if page.title:
+            return page.title
         
-        # Extract metadata first (faster)
-        metadata = trafilatura.extract_metadata(response.text)
-        if metadata and metadata.title:
-            return metadata.title
-        
-        # Fallback: extract content and use first line
-        text = trafilatura.extract(response.text)
+        # Fallback: use first line of content
+        text = page.content
         if text:
             lines = text.split('\n')
             return lines[0] if lines else ""
@@ -361,102 +547,67 @@ def extract_publish_date(html_content: str, url: str) -> str:
     """
     Extract publish date from HTML content using multiple methods
     """
-    try:
-        # Method 1: Try trafilatura's date extraction
-        date = trafilatura.extract_metadata(html_content)
-        if date and hasattr(date, 'date') and date.date:
-            try:
-                # Parse and format the date
-                parsed_date = dateutil.parser.parse(date.date)
-                return parsed_date.strftime('%Y-%m-%d')
-            except:
-                pass
-        
-        # Method 2: Extract with full metadata context
-        extracted_data = trafilatura.extract(html_content, include_comments=False, 
-                                           include_tables=False, include_formatting=False,
-                                           include_links=False, favor_precision=True,
-                                           with_metadata=True, output_format='python')
-        
-        if extracted_data and isinstance(extracted_data, dict):
-            # Check for date in metadata
-            date_value = extracted_data.get('date') if hasattr(extracted_data, 'get') else None
-            if date_value and isinstance(date_value, str):
-                try:
-                    parsed_date = dateutil.parser.parse(date_value)
-                    return parsed_date.strftime('%Y-%m-%d')
-                except:
-                    pass
-        
-        # Method 3: Search for common date patterns in HTML
-        import re
-        # Look for JSON-LD structured data
-        json_ld_pattern = r'"datePublished"\s*:\s*"([^"]+)"'
-        match = re.search(json_ld_pattern, html_content)
-        if match:
-            try:
-                parsed_date = dateutil.parser.parse(match.group(1))
-                return parsed_date.strftime('%Y-%m-%d')
-            except:
-                pass
-        
-        # Look for meta tags
-        meta_patterns = [
-            r'<meta[^>]*property=["\']article:published_time["\'][^>]*content=["\']([^"\'>]+)["\']',
-            r'<meta[^>]*name=["\']pubdate["\'][^>]*content=["\']([^"\'>]+)["\']',
-            r'<meta[^>]*name=["\']date["\'][^>]*content=["\']([^"\'>]+)["\']',
-            r'<time[^>]*datetime=["\']([^"\'>]+)["\']'
-        ]
-        
-        for pattern in meta_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match:
-                try:
-                    parsed_date = dateutil.parser.parse(match.group(1))
-                    return parsed_date.strftime('%Y-%m-%d')
-                except:
-                    continue
-        
-        # Return today's date as fallback
-        return datetime.now().strftime('%Y-%m-%d')
+    return ParsedPage(html_content, url).publish_date
+
+def _find_publish_date(page: ParsedPage):
+    """
+    Publish date found in the page as YYYY-MM-DD, or None if there is none.
+    Cheap markup probes run first (see date_extraction); trafilatura's
+    date search only runs when they all miss.
+    """
+    def trafilatura_date():
+        metadata = page.metadata
+        return metadata.date if metadata and hasattr(metadata, 'date') else None
     
-    except Exception as e:
-        return datetime.now().strftime('%Y-%m-%d')
+    return find_publish_date(page.text, fallback=trafilatura_date)
+
+def build_snippet(content: str, brand: str = "") -> str:
+    """
+    Pick the sentences mentioning Antler/brand (with one sentence of context
+    either side) from extracted content, ending at a sentence boundary
+    """
+    if not content:
+        return ""
+    
+    # Split into sentences
+    sentences = SENTENCE_SPLIT.split(content)
+    
+    # Build list of keywords to search for
+    keywords = ['antler']
+    if brand and len(brand) > 0 and brand.lower() != 'antler':
+        keywords.append(brand.lower())
+    
+    # Find sentences containing keywords
+    hits = (i for i, sentence in enumerate(sentences)
+            if any(keyword in sentence.lower() for keyword in keywords))
+    return select_snippet(sentences, hits)
 
 def scrape_metadata_only(url: str):
     """
     FAST metadata-only scraping - extracts domain, title, publish_date WITHOUT full text content
-    Use this for quick URL processing, then scrape full content later
+    Use this for quick URL processing, then scrape full content later.
+    Only the <head> is downloaded; the full page is fetched only if title or date isn't there.
     """
     try:
         if not url:
             return None
         
-        # Single optimized request with short timeout (3 seconds for speed)
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        
-        response = session.get(url, timeout=3)
-        response.raise_for_status()
-        
-        # Extract metadata for title (fast - no full content extraction)
-        metadata = trafilatura.extract_metadata(response.text)
-        title = metadata.title if metadata and metadata.title else "No title"
+        # Stream just the <head> (title, og tags, JSON-LD, article:published_time)
+        # with a short timeout (3 seconds for speed)
+        response = fetch_head(url, timeout=3)
+        page = ParsedPage.from_response(response, url)
         
-        # Extract publish date (fast)
-        publish_date = extract_publish_date(response.text, url)
-        
-        # Extract domain (instant)
-        domain = extract_domain_from_url(url)
+        if response.partial and not (page.title and page.found_publish_date):
+            # Metadata isn't all in <head> - fall back to the whole page
+            response = fetch(url, timeout=3)
+            page = ParsedPage.from_response(response, url)
         
         return {
             'url': url,
-            'domain': domain,
+            'domain': page.domain,
             'content': None,  # No content - will scrape later
-            'title': title,
-            'publish_date': publish_date
+            'title': page.title or "No title",
+            'publish_date': page.publish_date
         }
     
     except Exception as e:
@@ -469,90 +620,42 @@ def scrape_metadata_only(url: str):
             'publish_date': datetime.now().strftime('%Y-%m-%d')
         }
 
-def scrape_light(url: str, brand: str = ""):
+def scrape_light(url: str, brand: str = "", extractor=None, matcher=None):
     """
     LIGHT scraping - extracts domain, title, publish_date + sentences mentioning Antler/brand
-    Used for data ingestion - procedure fills in the rest
+    Used for data ingestion - procedure fills in the rest.
+    'snippets' maps every tracked brand mentioned on the page to its snippet
+    (see brand_snippets; pass matcher to include the portcos table).
+    'fingerprint' is the SimHash of the full page text (see near_duplicates).
     """
     try:
         if not url:
             return None
         
         # Single optimized request with short timeout (5 seconds)
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        
-        response = session.get(url, timeout=5)
-        response.raise_for_status()
-        
-        # Extract metadata for title
-        metadata = trafilatura.extract_metadata(response.text)
-        title = metadata.title if metadata and metadata.title else ""
-        
-        # Extract publish date
-        publish_date = extract_publish_date(response.text, url)
-        
-        # Extract domain
-        domain = extract_domain_from_url(url)
-        
-        # Extract full content for searching
-        full_content = trafilatura.extract(response.text)
-        snippet = ""
-        
-        if full_content:
-            # Split into sentences
-            import re
-            sentences = re.split(r'(?<=[.!?])\s+', full_content)
-            
-            # Build list of keywords to search for
-            keywords = ['antler']
-            if brand and len(brand) > 0 and brand.lower() != 'antler':
-                keywords.append(brand.lower())
-            
-            # Find sentences containing keywords
-            relevant_sentences = []
-            for i, sentence in enumerate(sentences):
-                sentence_lower = sentence.lower()
-                if any(keyword in sentence_lower for keyword in keywords):
-                    # Include the sentence before (context) if available
-                    if i > 0 and sentences[i-1] not in relevant_sentences:
-                        relevant_sentences.append(sentences[i-1])
-                    relevant_sentences.append(sentence)
-                    # Include sentence after (context) if available
-                    if i + 1 < len(sentences) and len(relevant_sentences) < 5:
-                        relevant_sentences.append(sentences[i+1])
-                    
-                    # Limit to ~5 sentences for context
-                    if len(relevant_sentences) >= 5:
-                        break
-            
-            if relevant_sentences:
-                # Join relevant sentences
-                snippet = ' '.join(relevant_sentences)
-                # Limit to ~500 chars max, end at sentence boundary
-                if len(snippet) > 500:
-                    # Find last sentence end within 500 chars
-                    cut_point = 500
-                    for punct in ['. ', '! ', '? ']:
-                        last_punct = snippet[:500].rfind(punct)
-                        if last_punct > 200:
-                            cut_point = last_punct + 1
-                            break
-                    snippet = snippet[:cut_point]
-            else:
-                # Fallback: no keyword found, use first 2-3 sentences
-                snippet = ' '.join(sentences[:3])
-                # End at sentence boundary within 300 chars
-                if len(snippet) > 300:
-                    cut_point = 300
-                    for punct in ['. ', '! ', '? ']:
-                        last_punct = snippet[:300].rfind(punct)
-                        if last_punct > 100:
-                            cut_point = last_punct + 1
-                            break
-                    snippet = snippet[:cut_point]
+        response = fetch(url, timeout=5)
+        
+        # Parse once, then read title, date and snippet from the same tree
+        page = parse_response(response, url, extractor)
+        if page.error:
+            return {
+                'url': url,
+                'domain': page.domain,
+                'content': None,
+                'title': "",
+                'publish_date': datetime.now().strftime('%Y-%m-%d'),
+                'snippets': {},
+                'error': page.error
+            }
+        title = page.title
+        # One pass over the text for this row's brand and every tracked brand;
+        # build_snippet only for a brand the matcher doesn't know
+        matcher = matcher or get_matcher()
+        if brand and brand not in matcher:
+            snippet = page.snippet(brand)
+            snippets = matcher.snippets(page.content)
+        else:
+            snippet, snippets = matcher.scan(page.content, brand)
         
         # If no title from metadata, use first part of content
         if not title and snippet:
@@ -560,10 +663,12 @@ def scrape_light(url: str, brand: str = ""):
         
         return {
             'url': url,
-            'domain': domain,
+            'domain': page.domain,
             'content': snippet,  # Sentences mentioning Antler/brand
+            'snippets': snippets,  # Per tracked brand
+            'fingerprint': fingerprint(page.content),
             'title': title,
-            'publish_date': publish_date
+            'publish_date': page.publish_date
         }
     
     except Exception as e:
@@ -574,110 +679,111 @@ def scrape_light(url: str, brand: str = ""):
             'content': None,
             'title': "",
             'publish_date': datetime.now().strftime('%Y-%m-%d'),
+            'snippets': {},
             'error': str(e)
         }
 
-def scrape_article_data_fast(url: str):
+def scrape_article_data_fast(url: str, extractor=None):
     """
     Fast scraping - downloads page once and extracts content, title, and publish date.
-    Uses Firecrawl for paywalled sites.
+    Goes direct, through the render tier or via Firecrawl depending on what has
+    worked for the domain (see routing); PAYWALL_DOMAINS start out on Firecrawl.
+    Pass extractor to run extraction out of process (see extraction_pool).
     """
-    try:
-        if not url:
-            return None
-        
-        domain = extract_domain_from_url(url)
-        
-        # For paywalled sites, use Firecrawl directly
-        if is_paywall_domain(url) and FIRECRAWL_API_KEY:
-            result = scrape_with_firecrawl(url)
-            if result and result.get('content'):
-                publish_date = result.get('publish_date', datetime.now().strftime('%Y-%m-%d'))
-                if publish_date == datetime.now().strftime('%Y-%m-%d'):
-                    try:
-                        response = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-                        publish_date = extract_publish_date(response.text, url)
-                    except:
-                        pass
-                return {
-                    'url': url,
-                    'domain': domain,
-                    'content': result['content'],
-                    'title': result.get('title', ''),
-                    'publish_date': publish_date
-                }
-        
-        # Standard scraping with trafilatura
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
-        
-        response = session.get(url, timeout=8)
-        response.raise_for_status()
-        
-        # Extract metadata for title (fast)
-        metadata = trafilatura.extract_metadata(response.text)
-        title = metadata.title if metadata and metadata.title else ""
-        
-        # Extract content
-        content = trafilatura.extract(response.text)
-        
-        # If content is too short and we have Firecrawl, try it as fallback
-        if (not content or len(content) < 100) and FIRECRAWL_API_KEY:
-            result = scrape_with_firecrawl(url)
-            if result and result.get('content') and len(result['content']) > len(content or ''):
-                fc_date = result.get('publish_date', datetime.now().strftime('%Y-%m-%d'))
-                if fc_date == datetime.now().strftime('%Y-%m-%d'):
-                    fc_date = extract_publish_date(response.text, url)
-                return {
-                    'url': url,
-                    'domain': domain,
-                    'content': truncate_content(result['content']),
-                    'title': result.get('title', title),
-                    'publish_date': fc_date
-                }
+    if not url:
+        return None
+    
+    domain = extract_domain_from_url(url)
+    direct_page = {}
+    
+    def from_page(page, used_network):
+        # One parse shared by all fields
+        title = page.title
+        content = page.content
+        
+        if page.error:
+            # Keep the reason (e.g. extraction_timeout) so batch scripts can report it
+            return {
+                'url': url,
+                'domain': domain,
+                'content': None,
+                'title': title,
+                'error': page.error
+            }, None, used_network
         
         if not content:
-            return None
+            return None, None, used_network
         
         # If no title from metadata, use first line of content
         if not title:
             lines = content.split('\n')
             title = lines[0] if lines else ""
         
-        # Extract publish date
-        publish_date = extract_publish_date(response.text, url)
-        
         return {
             'url': url,
             'domain': domain,
             'content': truncate_content(content),
             'title': title,
+            'publish_date': page.publish_date
+        }, content, used_network
+    
+    def direct():
+        # Standard scraping with trafilatura
+        response = fetch(url, timeout=8)
+        page = parse_response(response, url, extractor)
+        direct_page['page'] = page
+        return from_page(page, not response.from_cache)
+    
+    def render():
+        # JavaScript-built pages: same extraction on the rendered DOM.
+        # The browser only starts once routing actually picks render
+        if not render_tier.is_available():
+            return None, None, False
+        page = render_page(url, extractor)
+        if page is None:
+            return None, None, True
+        return from_page(page, True)
+    
+    def firecrawl():
+        result, content, used_network = _firecrawl_attempt(url)
+        if not content:
+            return None, None, used_network
+        
+        publish_date = result.get('publish_date', datetime.now().strftime('%Y-%m-%d'))
+        if publish_date == datetime.now().strftime('%Y-%m-%d'):
+            # Firecrawl had no date - read it from the page itself
+            try:
+                page = direct_page.get('page')
+                if page is None:
+                    response = fetch(url, timeout=5)
+                    page = ParsedPage.from_response(response, url)
+                publish_date = page.publish_date
+            except:
+                pass
+        fallback_title = direct_page['page'].title if 'page' in direct_page else ''
+        return {
+            'url': url,
+            'domain': domain,
+            'content': truncate_content(result['content']),
+            'title': result.get('title') or fallback_title,
             'publish_date': publish_date
+        }, content, used_network
+    
+    def deferred(reason):
+        return {
+            'url': url,
+            'domain': domain,
+            'content': None,
+            'title': '',
+            'error': f"deferred: {reason}"
         }
     
-    except Exception as e:
-        # If standard scraping fails and we have Firecrawl, try it
-        if FIRECRAWL_API_KEY:
-            result = scrape_with_firecrawl(url)
-            if result and result.get('content'):
-                fc_date = result.get('publish_date', datetime.now().strftime('%Y-%m-%d'))
-                if fc_date == datetime.now().strftime('%Y-%m-%d'):
-                    try:
-                        resp = requests.get(url, headers={'User-Agent': 'Mozilla/5.0'}, timeout=5)
-                        fc_date = extract_publish_date(resp.text, url)
-                    except:
-                        pass
-                return {
-                    'url': url,
-                    'domain': extract_domain_from_url(url),
-                    'content': truncate_content(result['content']),
-                    'title': result.get('title', ''),
-                    'publish_date': fc_date
-                }
-        _warn(f"Could not scrape content from URL: {str(e)}")
-        return None
+    attempts = {routing.DIRECT: direct}
+    if _render_offered(url):
+        attempts[routing.RENDER] = render
+    if _firecrawl_available():
+        attempts[routing.FIRECRAWL] = firecrawl
+    return _run_routed(url, attempts, deferred)
 
 def scrape_article_data(url: str):
     """
@@ -1,217 +1,238 @@
 import os
 import time
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+import asyncio
+from browser_pool import get_pool, HAS_PLAYWRIGHT, PlaywrightTimeout
 
 WSJ_EMAIL = os.environ.get('WSJ_EMAIL')
 WSJ_PASSWORD = os.environ.get('WSJ_PASSWORD')
 
-def scrape_wsj_article(url: str, max_retries: int = 2) -> dict:
-    """
-    Scrape a WSJ article using Playwright with login.
-    Returns dict with 'title', 'content', 'success', 'error'
-    """
-    if not WSJ_EMAIL or not WSJ_PASSWORD:
-        return {
-            'success': False,
-            'error': 'WSJ credentials not configured',
-            'title': None,
-            'content': None
-        }
-    
+# Browser profile holding the logged-in WSJ session (state saved in .cache/browser_state)
+PROFILE = 'wsj'
+
+LOGIN_URL = 'https://sso.accounts.dowjones.com/login'
+
+PAYWALL_SELECTOR = '[class*="paywall"], [class*="snippet"], .wsj-snippet-login'
+ARTICLE_SELECTOR = 'article, [class*="article-content"]'
+TITLE_SELECTORS = ['h1', 'article h1', '.wsj-article-headline', '[class*="headline"]']
+CONTENT_SELECTORS = [
+    'article p',
+    '.article-content p',
+    '[class*="article-body"] p',
+    '.wsj-snippet-body p',
+    'main p'
+]
+
+# Milliseconds to wait for the article (or paywall) markup after navigation
+RENDER_TIMEOUT = 10000
+
+# Don't log in again within this many seconds of a successful login - a page
+# still matching the paywall selector right after one is a false positive
+LOGIN_COOLDOWN = int(os.environ.get('WSJ_LOGIN_COOLDOWN', '600'))
+
+# One login at a time (created on the pool's loop)
+_login_lock = None
+_last_login = 0.0
+
+
+def _error(message, title=None, content=None):
+    return {
+        'success': False,
+        'error': message,
+        'title': title,
+        'content': content
+    }
+
+
+async def _open(page, url):
+    """Navigate and wait for the article or paywall markup instead of a fixed sleep"""
+    await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+    try:
+        await page.wait_for_selector(f"{ARTICLE_SELECTOR}, {PAYWALL_SELECTOR}", timeout=RENDER_TIMEOUT)
+    except PlaywrightTimeout:
+        pass
+
+
+async def _is_paywalled(page) -> bool:
+    try:
+        if await page.query_selector(PAYWALL_SELECTOR):
+            return True
+    except:
+        pass
+    # Also check if content is truncated
+    return await page.query_selector(ARTICLE_SELECTOR) is None
+
+
+async def _login(page):
+    """Log in through Dow Jones SSO and save the session for later runs"""
+    await page.goto(LOGIN_URL, wait_until='domcontentloaded', timeout=30000)
+
+    # Enter email
+    email_input = await page.wait_for_selector('input[name="username"], input[type="email"], #username', timeout=10000)
+    await email_input.fill(WSJ_EMAIL)
+
+    # Click continue/next button
+    continue_btn = await page.query_selector('button[type="submit"], .sign-in-submit, button:has-text("Continue"), button:has-text("Sign In")')
+    if continue_btn:
+        await continue_btn.click()
+
+    # Enter password
+    password_input = await page.wait_for_selector('input[name="password"], input[type="password"], #password', timeout=10000)
+    await password_input.fill(WSJ_PASSWORD)
+
+    # Click sign in and wait to be sent back off the SSO host
+    signin_btn = await page.query_selector('button[type="submit"], .sign-in-submit, button:has-text("Sign In")')
+    if signin_btn:
+        await signin_btn.click()
+        try:
+            await page.wait_for_url(lambda current: 'login' not in current.lower(), timeout=30000)
+        except PlaywrightTimeout:
+            pass
+
+    logged_in = 'login' not in page.url.lower()
+    if logged_in:
+        await get_pool().save_state(PROFILE)
+    return logged_in
+
+
+async def _ensure_logged_in(page) -> bool:
+    """Log in, unless another page did so in the last LOGIN_COOLDOWN seconds"""
+    global _login_lock, _last_login
+    if _login_lock is None:
+        _login_lock = asyncio.Lock()
+    async with _login_lock:
+        if time.time() - _last_login < LOGIN_COOLDOWN:
+            return True
+        logged_in = await _login(page)
+        if logged_in:
+            _last_login = time.time()
+        return logged_in
+
+
+async def _extract(page):
+    """(title, content) from the rendered article"""
+    title = None
+    for sel in TITLE_SELECTORS:
+        try:
+            title_el = await page.query_selector(sel)
+            if title_el:
+                title = (await title_el.inner_text()).strip()
+                if title:
+                    break
+        except:
+            pass
+
+    content = None
+    for sel in CONTENT_SELECTORS:
+        try:
+            texts = [text.strip() for text in await page.locator(sel).all_inner_texts()]
+            texts = [text for text in texts if text and len(text) > 20]
+            if texts:
+                content = '\n\n'.join(texts)
+                break
+        except:
+            pass
+    return title, content
+
+
+async def _scrape(url: str, max_retries: int = 2) -> dict:
+    pool = get_pool()
+    last_error = 'Max retries exceeded'
     for attempt in range(max_retries):
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                context = browser.new_context(
-                    user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    viewport={'width': 1920, 'height': 1080}
-                )
-                page = context.new_page()
-                
-                # Go to article first
-                page.goto(url, wait_until='domcontentloaded', timeout=30000)
-                time.sleep(2)
-                
-                # Check if we need to log in (look for paywall)
-                needs_login = False
-                try:
-                    paywall = page.query_selector('[class*="paywall"], [class*="snippet"], .wsj-snippet-login')
-                    if paywall:
-                        needs_login = True
-                except:
-                    pass
-                
-                # Also check if content is truncated
-                content_check = page.query_selector('article, [class*="article-content"]')
-                if not content_check:
-                    needs_login = True
-                
-                if needs_login:
-                    # Navigate to login
-                    page.goto('https://sso.accounts.dowjones.com/login', wait_until='domcontentloaded', timeout=30000)
-                    time.sleep(2)
-                    
-                    # Enter email
-                    email_input = page.wait_for_selector('input[name="username"], input[type="email"], #username', timeout=10000)
-                    email_input.fill(WSJ_EMAIL)
-                    
-                    # Click continue/next button
-                    continue_btn = page.query_selector('button[type="submit"], .sign-in-submit, button:has-text("Continue"), button:has-text("Sign In")')
-                    if continue_btn:
-                        continue_btn.click()
-                        time.sleep(2)
-                    
-                    # Enter password
-                    password_input = page.wait_for_selector('input[name="password"], input[type="password"], #password', timeout=10000)
-                    password_input.fill(WSJ_PASSWORD)
-                    
-                    # Click sign in
-                    signin_btn = page.query_selector('button[type="submit"], .sign-in-submit, button:has-text("Sign In")')
-                    if signin_btn:
-                        signin_btn.click()
-                        time.sleep(5)
-                    
-                    # Navigate back to article
-                    page.goto(url, wait_until='domcontentloaded', timeout=30000)
-                    time.sleep(3)
-                
-                # Extract title
-                title = None
-                title_selectors = ['h1', 'article h1', '.wsj-article-headline', '[class*="headline"]']
-                for sel in title_selectors:
-                    try:
-                        title_el = page.query_selector(sel)
-                        if title_el:
-                            title = title_el.inner_text().strip()
-                            if title:
-                                break
-                    except:
-                        pass
-                
-                # Extract content
-                content = None
-                content_selectors = [
-                    'article p',
-                    '.article-content p',
-                    '[class*="article-body"] p',
-                    '.wsj-snippet-body p',
-                    'main p'
-                ]
-                
-                for sel in content_selectors:
-                    try:
-                        paragraphs = page.query_selector_all(sel)
-                        if paragraphs:
-                            texts = []
-                            for p in paragraphs:
-                                text = p.inner_text().strip()
-                                if text and len(text) > 20:
-                                    texts.append(text)
-                            if texts:
-                                content = '\n\n'.join(texts)
-                                break
-                    except:
-                        pass
-                
-                browser.close()
-                
-                if content and len(content) >= 100:
-                    return {
-                        'success': True,
-                        'title': title,
-                        'content': content,
-                        'error': None
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'title': title,
-                        'content': content,
-                        'error': f'Content too short or not found ({len(content) if content else 0} chars)'
-                    }
-                    
+            async with pool.page(PROFILE) as page:
+                await _open(page, url)
+
+                # Only log in when the saved session didn't get us past the paywall
+                if await _is_paywalled(page):
+                    if not await _ensure_logged_in(page):
+                        # Pages still rendering keep the old context until they finish
+                        await pool.reset_profile(PROFILE)
+                        return _error('WSJ login failed')
+                    await _open(page, url)
+
+                title, content = await _extract(page)
+
+            if content and len(content) >= 100:
+                return {
+                    'success': True,
+                    'title': title,
+                    'content': content,
+                    'error': None
+                }
+            return _error(f'Content too short or not found ({len(content) if content else 0} chars)', title, content)
+
         except PlaywrightTimeout as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return {
-                'success': False,
-                'error': f'Timeout: {str(e)}',
-                'title': None,
-                'content': None
-            }
+            last_error = f'Timeout: {str(e)}'
         except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return {
-                'success': False,
-                'error': str(e),
-                'title': None,
-                'content': None
-            }
-    
-    return {
-        'success': False,
-        'error': 'Max retries exceeded',
-        'title': None,
-        'content': None
-    }
+            last_error = str(e)
+    return _error(last_error)
 
 
-def test_wsj_login():
-    """Test if WSJ login works"""
+def _check_configured():
+    if not HAS_PLAYWRIGHT:
+        return _error('Playwright not installed')
     if not WSJ_EMAIL or not WSJ_PASSWORD:
-        print('WSJ credentials not configured')
+        return _error('WSJ credentials not configured')
+    return None
+
+
+def scrape_wsj_article(url: str, max_retries: int = 2) -> dict:
+    """
+    Scrape a WSJ article in the shared browser (see browser_pool), logging
+    in only when the saved session hits the paywall.
+    Returns dict with 'title', 'content', 'success', 'error'
+    """
+    not_ready = _check_configured()
+    if not_ready:
+        return not_ready
+    try:
+        return get_pool().run(_scrape(url, max_retries))
+    except Exception as e:
+        return _error(str(e))
+
+
+def scrape_wsj_articles(urls, max_retries: int = 2) -> list:
+    """
+    scrape_wsj_article for many URLs, rendered in parallel (up to
+    BROWSER_MAX_PAGES pages at once). Results are in input order.
+    """
+    urls = list(urls)
+    not_ready = _check_configured()
+    if not_ready:
+        return [dict(not_ready) for _ in urls]
+
+    async def scrape_all():
+        results = await asyncio.gather(*(_scrape(url, max_retries) for url in urls), return_exceptions=True)
+        return [_error(str(r)) if isinstance(r, BaseException) else r for r in results]
+
+    try:
+        return get_pool().run(scrape_all())
+    except Exception as e:
+        return [_error(str(e)) for _ in urls]
+
+
+def test_wsj_login():
+    """Test if WSJ login works (logs in fresh, then saves the session)"""
+    not_ready = _check_configured()
+    if not_ready:
+        print(not_ready['error'])
         return False
-    
+
+    async def login():
+        pool = get_pool()
+        await pool.reset_profile(PROFILE)
+        async with pool.page(PROFILE) as page:
+            logged_in = await _login(page)
+            print(f'Current URL after login: {page.url}')
+            return logged_in
+
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            )
-            page = context.new_page()
-            
-            # Go to login page
-            page.goto('https://sso.accounts.dowjones.com/login', wait_until='domcontentloaded', timeout=30000)
-            time.sleep(2)
-            
-            # Enter email
-            email_input = page.wait_for_selector('input[name="username"], input[type="email"], #username', timeout=10000)
-            email_input.fill(WSJ_EMAIL)
-            print(f'Entered email: {WSJ_EMAIL}')
-            
-            # Click continue
-            continue_btn = page.query_selector('button[type="submit"]')
-            if continue_btn:
-                continue_btn.click()
-                time.sleep(2)
-            
-            # Enter password
-            password_input = page.wait_for_selector('input[name="password"], input[type="password"]', timeout=10000)
-            password_input.fill(WSJ_PASSWORD)
-            print('Entered password')
-            
-            # Click sign in
-            signin_btn = page.query_selector('button[type="submit"]')
-            if signin_btn:
-                signin_btn.click()
-                time.sleep(5)
-            
-            # Check if logged in
-            current_url = page.url
-            print(f'Current URL after login: {current_url}')
-            
-            browser.close()
-            
-            if 'login' not in current_url.lower():
-                print('Login appears successful!')
-                return True
-            else:
-                print('Login may have failed - still on login page')
-                return False
-                
+        if get_pool().run(login()):
+            print('Login appears successful!')
+            return True
+        else:
+            print('Login may have failed - still on login page')
+            return False
     except Exception as e:
         print(f'Login test failed: {e}')
         return False